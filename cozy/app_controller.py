@@ -4,6 +4,7 @@ from peewee import SqliteDatabase
 
 from cozy.architecture.singleton import Singleton
 from cozy.control.db import get_db
+from cozy.control.db_maintenance import DatabaseMaintenance
 from cozy.control.filesystem_monitor import FilesystemMonitor
 from cozy.control.offline_cache import OfflineCache
 from cozy.enums import OpenView, View
@@ -59,6 +60,7 @@ class AppController(metaclass=Singleton):
         self.headerbar_view_model = inject.instance(HeaderbarViewModel)
         self.settings_view_model = inject.instance(SettingsViewModel)
         self.player = inject.instance(Player)
+        self.db_maintenance = inject.instance(DatabaseMaintenance)
 
         self._connect_search_button()
 
@@ -98,6 +100,7 @@ class AppController(metaclass=Singleton):
         binder.bind_to_constructor(AppViewModel, lambda: AppViewModel())
         binder.bind_to_constructor(SettingsViewModel, lambda: SettingsViewModel())
         binder.bind_to_constructor(StoragesViewModel, lambda: StoragesViewModel())
+        binder.bind_to_constructor(DatabaseMaintenance, lambda: DatabaseMaintenance())
 
     def open_author(self, author: str):
         self.library_view_model.library_view_mode = LibraryViewMode.AUTHOR
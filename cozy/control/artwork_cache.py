@@ -1,156 +1,226 @@
 import io
 import logging
-import os
-import shutil
-from pathlib import Path
-from uuid import uuid4
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import inject
-from gi.repository import Gdk
+from gi.repository import Gdk, GLib
 from PIL import Image
 
-from cozy.control.application_directories import get_artwork_cache_dir
-from cozy.db.artwork_cache import ArtworkCache as ArtworkCacheModel
+from cozy.control.thumbnail_pack import ThumbnailPack
+from cozy.control.thumbnails import (
+    CoverSource,
+    ThumbnailFormat,
+    encode_thumbnail,
+    get_cover_sources,
+)
 from cozy.media.importer import Importer, ScanStatus
 from cozy.report import reporter
 from cozy.settings import ApplicationSettings
 
 log = logging.getLogger("artwork_cache")
 
+ARTWORK_WORKERS = 2
+TEXTURE_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class TextureCache:
+    """Keeps the most recently used textures up to a total size in bytes."""
+
+    def __init__(self, max_size: int):
+        self._max_size: int = max_size
+        self._size: int = 0
+        self._textures: OrderedDict[tuple, Gdk.Texture] = OrderedDict()
+
+    def get(self, key: tuple) -> Gdk.Texture | None:
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+
+        return texture
+
+    def put(self, key: tuple, texture: Gdk.Texture):
+        self.remove(key)
+        self._textures[key] = texture
+        self._size += self._texture_size(texture)
+
+        while self._size > self._max_size and len(self._textures) > 1:
+            _, removed = self._textures.popitem(last=False)
+            self._size -= self._texture_size(removed)
+
+    def remove(self, key: tuple):
+        texture = self._textures.pop(key, None)
+        if texture is not None:
+            self._size -= self._texture_size(texture)
+
+    def remove_book(self, book_id: int):
+        for key in [key for key in self._textures if key[0] == book_id]:
+            self.remove(key)
+
+    def clear(self):
+        self._textures.clear()
+        self._size = 0
+
+    @staticmethod
+    def _texture_size(texture: Gdk.Texture) -> int:
+        return texture.get_width() * texture.get_height() * 4
+
 
 class ArtworkCache:
     _importer = inject.attr(Importer)
     _app_settings = inject.attr(ApplicationSettings)
+    _thumbnails: ThumbnailPack = inject.attr(ThumbnailPack)
 
     def __init__(self):
+        self._textures: TextureCache = TextureCache(TEXTURE_CACHE_SIZE)
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(ARTWORK_WORKERS, thread_name_prefix="ArtworkThread")
+        self._pending: dict[tuple, list[Callable[[Gdk.Texture | None], None]]] = {}
+        self._generation: int = 0
+
         self._importer.add_listener(self._on_importer_event)
         self._app_settings.add_listener(self._on_app_setting_changed)
 
-    def get_cover_paintable(self, book, scale, size) -> Gdk.Texture | None:
-        texture = None
-        size *= scale
+    def get_cover_paintable_async(self, book, scale, size, callback: Callable[[Gdk.Texture | None], None]):
+        """Calls callback on the main thread with the cover of the book or None if it has no cover.
 
-        # First try the cache
-        texture = self._load_texture_from_cache(book, size)
+        Covers in memory are passed to callback right away. All others are loaded on a worker thread,
+        so the caller should show a placeholder until callback is called. The worker only gets
+        the cover hash and the path of the first chapter of the book, never the book itself."""
+        key = (book.id, size * scale)
+        texture = self._textures.get(key)
+        if texture:
+            callback(texture)
+            return
 
-        if not texture:
-            image = self._load_cover_image(book)
+        pending_key = (self._generation, *key)
+        if pending_key in self._pending:
+            self._pending[pending_key].append(callback)
+            return
 
-            if image:
-                self._cache_cover(book, image, size)
-                texture = self._load_texture_from_cache(book, size)
+        self._pending[pending_key] = [callback]
+        self._executor.submit(self._load_in_background, book.id, book.cover_hash, book.first_file, pending_key)
 
-        return texture
+    def _load_in_background(self, book_id: int, cover_hash: str | None, file: str | None, pending_key: tuple):
+        texture = None
+        try:
+            texture = self._render_texture(book_id, cover_hash, file, pending_key[-1])
+        except (OSError, ValueError, GLib.Error, Image.DecompressionBombError) as e:
+            log.warning("Failed to load cover for book %r: %s", book_id, e)
+        finally:
+            # The callbacks are called even if the cover could not be loaded
+            GLib.MainContext.default().invoke_full(
+                GLib.PRIORITY_DEFAULT_IDLE, self._deliver_texture, (pending_key, texture)
+            )
 
-    def delete_artwork_cache(self):
-        shutil.rmtree(get_artwork_cache_dir(), ignore_errors=True)
-        ArtworkCacheModel.delete().execute()
+    def _deliver_texture(self, data):
+        pending_key, texture = data
+        generation, *key = pending_key
 
-    def get_album_art_path(self, book, size) -> str:
-        query = ArtworkCacheModel.select().where(ArtworkCacheModel.book == book.id)
-        if not query.exists():
-            return None
+        if texture and generation == self._generation:
+            self._textures.put(tuple(key), texture)
 
-        try:
-            uuid = query.first().uuid
-        except Exception:
-            reporter.error(
-                "artwork_cache",
-                "load_texture_from_cache: query exists but query.first().uuid crashed.",
-            )
-            return None
+        for callback in self._pending.pop(pending_key, []):
+            callback(texture)
 
-        cache_dir = get_artwork_cache_dir() / uuid
-        cache_dir.mkdir(exist_ok=True, parents=True)
-        file_path = (cache_dir / str(size)).with_suffix(".png")
+    def _render_texture(self, book_id: int, cover_hash: str | None, file: str | None, size) -> Gdk.Texture | None:
+        thumbnail_format = self._thumbnail_format
 
-        if file_path.exists():
-            return str(file_path)
+        for source in get_cover_sources(cover_hash, file, self._app_settings.prefer_external_cover):
+            self._thumbnails.set_cover_key(book_id, source.key)
+
+            # First try the cache
+            texture = self._load_texture_from_cache(source.key, size, thumbnail_format)
+            if texture:
+                return texture
+
+            image = self._load_cover_image(source)
+            if image:
+                # The source image is only needed to render the thumbnail; release it right away
+                with image:
+                    data = self._cache_cover(source.key, image, size, thumbnail_format)
+                return self._load_texture(data, thumbnail_format) if data else None
 
         return None
 
-    def _cache_cover(self, book, image, size):
-        query = ArtworkCacheModel.select().where(ArtworkCacheModel.book == book.id)
+    def invalidate_books(self, books):
+        """Drops the textures of the given books from memory. Their thumbnails on disk are keyed
+        by the source image, so they are only rendered again if the cover changed."""
+        for book in books:
+            self._textures.remove_book(book.id)
 
-        if query.exists():
-            uuid = str(query.first().uuid)
-        else:
-            uuid = str(uuid4())
-            ArtworkCacheModel.create(book=book.id, uuid=uuid)
+    def delete_artwork_cache(self):
+        self._generation += 1
+        self._textures.clear()
+        self._thumbnails.clear()
 
-        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    def get_album_art_path(self, book, size) -> str | None:
+        cover_key = self._thumbnails.get_cover_key(book.id)
+        if not cover_key:
+            return None
 
-        cache_dir = get_artwork_cache_dir() / uuid
-        cache_dir.mkdir(exist_ok=True, parents=True)
-        file_path = (cache_dir / str(size)).with_suffix(".png")
+        file_path = self._thumbnails.export(cover_key, size, self._thumbnail_format)
+        return str(file_path) if file_path else None
 
-        if not file_path.exists():
-            try:
-                image.save(str(file_path), format="PNG")
-            except Exception as e:
-                reporter.warning("artwork_cache", "Failed to save resized cache albumart")
-                log.warning("Failed to save resized cache albumart for uuid %r: %s", uuid, e)
+    def _cache_cover(self, cover_key: str, image, size, thumbnail_format: ThumbnailFormat) -> bytes | None:
+        try:
+            data = encode_thumbnail(image, size, thumbnail_format)
+            self._thumbnails.add(cover_key, thumbnail_format, {size: data})
+        except Exception as e:
+            reporter.warning("artwork_cache", "Failed to save resized cache albumart")
+            log.warning("Failed to save resized cache albumart for key %r: %s", cover_key, e)
+            return None
 
-    def _load_texture_from_cache(self, book, size):
-        path = self.get_album_art_path(book, size)
+        return data
+
+    def _load_texture_from_cache(self, cover_key: str, size, thumbnail_format: ThumbnailFormat):
+        data = self._thumbnails.get(cover_key, size, thumbnail_format)
+        if not data:
+            return None
 
         try:
-            texture = Gdk.Texture.new_from_filename(path) if path else None
+            texture = self._load_texture(data, thumbnail_format)
         except Exception as e:
-            log.warning("Failed to load texture from path: %s. Deleting file.", path)
+            log.warning("Failed to load texture of cover %s in size %d. Removing it.", cover_key, size)
             log.debug(e)
-            os.remove(path)
+            self._thumbnails.remove(cover_key, size, thumbnail_format)
             return None
 
         return texture
 
-    def _load_cover_image(self, book):
-        loading_order = [self._load_texture_from_db, self._load_texture_from_file]
+    @staticmethod
+    def _load_texture(data: bytes, thumbnail_format: ThumbnailFormat) -> Gdk.Texture:
+        if thumbnail_format.name != "webp":
+            return Gdk.Texture.new_from_bytes(GLib.Bytes.new(data))
 
-        if self._app_settings.prefer_external_cover:
-            loading_order.reverse()
+        # GTK can only load WebP with an optional gdk-pixbuf loader
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGBA")
+            return Gdk.MemoryTexture.new(image.width, image.height, Gdk.MemoryFormat.R8G8B8A8,
+                                         GLib.Bytes.new(image.tobytes()), image.width * 4)
 
-        for loader in loading_order:
-            texture = loader(book)
-            if texture:
-                return texture
-
-        return None
+    @property
+    def _thumbnail_format(self) -> ThumbnailFormat:
+        return ThumbnailFormat.from_settings(self._app_settings)
 
-    def _load_texture_from_db(self, book):
-        if not book or not book.cover:
+    def _load_cover_image(self, source: CoverSource):
+        data = source.read()
+        if not data:
             return None
 
         try:
-            texture = Image.open(io.BytesIO(book.cover))
+            return Image.open(io.BytesIO(data))
         except Exception as e:
-            reporter.warning("artwork_cache", "Could not get book cover from db.")
-            log.warning("Could not get cover for book %r: %s", book.name, e)
-        else:
-            return texture
-
-    def _load_texture_from_file(self, book) -> Gdk.Texture | None:
-        directory = Path(book.chapters[0].file).absolute().parent
-        cover_extensions = {".jpg", ".jpeg", ".png", ".gif"}
-
-        for path in directory.glob("cover.*"):
-            if path.suffix.lower() not in cover_extensions:
-                continue
-
-            try:
-                texture = Image.open(str(path))
-            except Exception as e:
-                log.debug(e)
-
-            if texture:
-                return texture
-
-        return None
+            if source.cover_hash:
+                reporter.warning("artwork_cache", "Could not get book cover from db.")
+            log.warning("Could not get cover %s: %s", source.key, e)
+            return None
 
     def _on_importer_event(self, event, data):
-        if event == "scan" and data == ScanStatus.STARTED:
-            self.delete_artwork_cache()
+        if event == "scan" and data == ScanStatus.SUCCESS:
+            self._executor.submit(self._thumbnails.delete_unused, self._thumbnail_format)
 
     def _on_app_setting_changed(self, event: str, data):
-        if event == "prefer-external-cover":
-            self.delete_artwork_cache()
+        if event in {"prefer-external-cover", "thumbnail-format", "thumbnail-quality"}:
+            self._generation += 1
+            self._textures.clear()
@@ -5,6 +5,8 @@ from cozy.control.db_updater import update_db
 from cozy.db.artwork_cache import ArtworkCache
 from cozy.db.book import Book
 from cozy.db.collation import collate_natural
+from cozy.db.cover import Cover
+from cozy.db.directory import Directory
 from cozy.db.file import File
 from cozy.db.model_base import get_sqlite_database
 from cozy.db.offline_cache import OfflineCache
@@ -13,6 +15,7 @@ from cozy.db.storage import Storage
 from cozy.db.storage_blacklist import StorageBlackList
 from cozy.db.track import Track
 from cozy.db.track_to_file import TrackToFile
+from cozy.model.cover_store import CoverStore
 from cozy.report import reporter
 
 log = logging.getLogger("db")
@@ -32,14 +35,16 @@ def init_db():
         _db.start()
     else:
         _db.create_tables(
-            [Track, Book, Settings, ArtworkCache, Storage, StorageBlackList, OfflineCache, TrackToFile, File])
+            [Track, Book, Settings, ArtworkCache, Storage, StorageBlackList, OfflineCache, TrackToFile, File,
+             Directory, Cover])
         _db.stop()
         _db.start()
 
     while not _db.table_exists("settings"):
         time.sleep(0.01)
 
-    _db.bind([Book, Track, Settings, ArtworkCache, StorageBlackList, OfflineCache, Storage, TrackToFile, File],
+    _db.bind([Book, Track, Settings, ArtworkCache, StorageBlackList, OfflineCache, Storage, TrackToFile, File,
+              Directory, Cover],
              bind_refs=False,
              bind_backrefs=False)
 
@@ -110,6 +115,8 @@ def clean_books():
                 Settings.update(last_played_book=None).execute()
             book.delete_instance()
 
+    CoverStore.delete_unused()
+
 
 def get_db():
     global _db
@@ -0,0 +1,54 @@
+import logging
+import sqlite3
+from threading import Thread
+
+import inject
+from gi.repository import GLib
+from peewee import DatabaseError, SqliteDatabase
+
+from cozy.db.maintenance import run_maintenance
+from cozy.media.importer import Importer, ScanStatus
+from cozy.media.player import Player
+from cozy.report import reporter
+
+log = logging.getLogger("db_maintenance")
+
+MAINTENANCE_INTERVAL = 15 * 60
+
+
+class DatabaseMaintenance:
+    """Runs the database maintenance periodically while Cozy neither plays nor imports."""
+
+    _db: SqliteDatabase = inject.attr(SqliteDatabase)
+    _importer: Importer = inject.attr(Importer)
+    _player: Player = inject.attr(Player)
+
+    def __init__(self):
+        self._scanning: bool = False
+        self._thread: Thread | None = None
+
+        self._importer.add_listener(self._on_importer_event)
+        GLib.timeout_add_seconds(MAINTENANCE_INTERVAL, self._on_maintenance_timeout)
+
+    @property
+    def idle(self) -> bool:
+        running = self._thread is not None and self._thread.is_alive()
+        return not (running or self._scanning or self._player.playing)
+
+    def _on_maintenance_timeout(self) -> bool:
+        if self.idle:
+            self._thread = Thread(target=self._run, name="DatabaseMaintenanceThread", daemon=True)
+            self._thread.start()
+
+        return True
+
+    def _run(self):
+        try:
+            run_maintenance(self._db)
+        except (DatabaseError, sqlite3.Error, OSError) as e:
+            reporter.exception("db_maintenance", e)
+            log.error("Database maintenance failed: %s", e)
+
+    def _on_importer_event(self, event: str, message):
+        if event == "scan":
+            self._scanning = message == ScanStatus.STARTED
@@ -1,14 +1,27 @@
 import logging
 import os
 import shutil
+import sys
 from datetime import datetime
 
-from peewee import BooleanField, FloatField, ForeignKeyField, IntegerField, fn
+from peewee import (
+    BooleanField,
+    CharField,
+    DatabaseError,
+    FloatField,
+    ForeignKeyField,
+    IntegerField,
+    fn,
+)
 from playhouse.migrate import SqliteMigrator, migrate
 from playhouse.reflection import generate_models
 
 from cozy.control.application_directories import get_cache_dir
 from cozy.control.application_directories import get_data_dir as get_data_dir_path
+from cozy.db.book import Book
+from cozy.db.collation import natural_sort_key
+from cozy.db.cover import Cover
+from cozy.db.directory import Directory
 from cozy.db.file import File
 from cozy.db.model_base import get_sqlite_database
 from cozy.db.offline_cache import OfflineCache
@@ -17,6 +30,7 @@ from cozy.db.storage import Storage
 from cozy.db.storage_blacklist import StorageBlackList
 from cozy.db.track import Track
 from cozy.db.track_to_file import TrackToFile
+from cozy.model.cover_store import CoverStore
 from cozy.report import reporter
 
 log = logging.getLogger("db_updater")
@@ -253,6 +267,86 @@ def _update_db_11(db):
     Settings.update(version=11).execute()
 
 
+def _update_db_12(db):
+    log.info("Migrating to DB Version 12...")
+
+    db.create_tables([Directory])
+
+    Settings.update(version=12).execute()
+
+
+def _update_db_13(db):
+    log.info("Migrating to DB Version 13...")
+
+    models = generate_models(db)
+    migrator: SqliteMigrator = SqliteMigrator(db)
+
+    db.create_tables([Cover])
+
+    if "cover" in models["book"]._meta.sorted_field_names:
+        log.info("Moving book covers into the cover table...")
+        migrate(
+            migrator.add_column("book", "cover_hash", CharField(null=True))
+        )
+        db.stop()
+        db.start()
+
+        book_model = models["book"]
+        book_ids = [book_id for book_id, in book_model.select(book_model.id)
+                    .where(book_model.cover.is_null(False)).tuples()]
+
+        for book_id in book_ids:
+            cover, = book_model.select(book_model.cover).where(book_model.id == book_id).tuples().get()
+            Book.update(cover_hash=CoverStore.store(cover)).where(Book.id == book_id).execute()
+
+        migrate(
+            migrator.drop_column("book", "cover")
+        )
+
+    db.stop()
+    db.start()
+
+    Settings.update(version=13).execute()
+
+
+def _update_db_14(db):
+    log.info("Migrating to DB Version 14...")
+
+    db.execute_sql('DROP INDEX IF EXISTS "track_book_id"')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "track_book_id_disk_number" '
+                   'ON "track" ("book_id", "disk", "number")')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "tracktofile_file_id" ON "tracktofile" ("file_id")')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "offlinecache_original_file_id" '
+                   'ON "offlinecache" ("original_file_id")')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "book_name_lower" ON "book" (lower("name"))')
+    db.execute_sql("ANALYZE")
+
+    Settings.update(version=14).execute()
+
+
+def _update_db_15(db):
+    log.info("Migrating to DB Version 15...")
+
+    migrator: SqliteMigrator = SqliteMigrator(db)
+
+    if "natural_sort_key" not in [column.name for column in db.get_columns("track")]:
+        migrate(
+            migrator.add_column("track", "natural_sort_key", CharField(null=True))
+        )
+
+    db.register_function(natural_sort_key, "natural_sort_key")
+    db.stop()
+    db.start()
+
+    db.execute_sql('UPDATE "track" SET "natural_sort_key" = natural_sort_key("name")')
+    db.execute_sql('DROP INDEX IF EXISTS "track_book_id_disk_number"')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "track_book_id_disk_number_natural_sort_key" '
+                   'ON "track" ("book_id", "disk", "number", "natural_sort_key")')
+    db.execute_sql("ANALYZE")
+
+    Settings.update(version=15).execute()
+
+
 def update_db():
     db = get_sqlite_database()
     # First test for version 1
@@ -332,6 +426,34 @@ def update_db():
             DBMigrationFailedView().present()
             exit(1)
 
+    if version < 12:
+        _migrate_with_backup(db, _update_db_12)
+
+    if version < 13:
+        _migrate_with_backup(db, _update_db_13)
+
+    if version < 14:
+        _migrate_with_backup(db, _update_db_14)
+
+    if version < 15:
+        _migrate_with_backup(db, _update_db_15)
+
+
+def _migrate_with_backup(db, migration):
+    """Runs a migration and restores the backup of the database if it fails."""
+    backup_dir_name = _backup_db(db)
+    try:
+        migration(db)
+    except (DatabaseError, OSError) as e:
+        log.exception("Database migration failed")
+        reporter.exception("db_updator", e)
+        db.stop()
+        _restore_db(backup_dir_name)
+
+        from cozy.ui.db_migration_failed_view import DBMigrationFailedView
+        DBMigrationFailedView().present()
+        sys.exit(1)
+
 
 def _backup_db(db) -> str:
     log.info("Backing up DB...")
@@ -358,7 +480,7 @@ def _backup_db(db) -> str:
 
     db.start()
 
-    return dt_string
+    return os.path.basename(backup_dir)
 
 
 def _restore_db(backup_dir_name: str):
@@ -384,4 +506,3 @@ def _restore_db(backup_dir_name: str):
     if os.path.exists(wal_path_backup):
         log.info("Copying wal file")
         shutil.copyfile(wal_path_backup, wal_path)
-
@@ -0,0 +1,330 @@
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+from cozy.control.application_directories import get_artwork_cache_dir
+from cozy.control.thumbnails import THUMBNAIL_FORMATS, ThumbnailFormat
+from cozy.db.artwork_cache import ArtworkCache as ArtworkCacheModel
+from cozy.db.book import Book as BookModel
+from cozy.db.model_base import transaction
+
+log = logging.getLogger("thumbnail_pack")
+
+PACK_FILE_NAME = "thumbnails.pack"
+EXPORT_DIR_NAME = "export"
+PACK_MAGIC = b"COZYTHM1"
+# Format, size, length of the cover key and length of the image data.
+# A record without image data removes the thumbnail from the pack.
+RECORD_HEADER = struct.Struct("<BHHI")
+COMPACTION_RATIO = 0.5
+COMPACTION_MIN_SIZE = 4 * 1024 * 1024
+COVER_KEYS_CHUNK_SIZE = 100
+
+_FORMAT_NAMES = list(THUMBNAIL_FORMATS)
+
+
+class ThumbnailPack:
+    """Stores the thumbnails of all covers in a single append-only file.
+
+    The file is memory-mapped for reading. The index in memory maps each cover key to the
+    position of its thumbnails per format and size; it is rebuilt from the record headers when
+    the pack is opened. Replaced and removed thumbnails stay in the file until it is compacted.
+
+    The pack also keeps the cover key of every book in memory, so that looking up the thumbnail
+    of a book does not need a database query."""
+
+    def __init__(self, path: Path | None = None):
+        self._path: Path | None = path
+        self._lock = threading.RLock()
+        self._cover_keys_lock = threading.Lock()
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self._index: dict[str, dict[tuple[str, int], tuple[int, int]]] = {}
+        self._end: int = 0
+        self._live_bytes: int = 0
+        self._cover_keys: dict[int, str] | None = None
+
+    @property
+    def path(self) -> Path:
+        if not self._path:
+            self._path = get_artwork_cache_dir() / PACK_FILE_NAME
+
+        return self._path
+
+    @property
+    def fragmentation(self) -> float:
+        with self._lock:
+            self._open()
+            records = self._end - len(PACK_MAGIC)
+            return 1 - self._live_bytes / records if records else 0.0
+
+    def contains(self, cover_key: str, size: int, thumbnail_format: ThumbnailFormat) -> bool:
+        with self._lock:
+            self._open()
+            return (thumbnail_format.name, size) in self._index.get(cover_key, {})
+
+    def get(self, cover_key: str, size: int, thumbnail_format: ThumbnailFormat) -> bytes | None:
+        with self._lock:
+            self._open()
+            position = self._index.get(cover_key, {}).get((thumbnail_format.name, size))
+            if not position:
+                return None
+
+            offset, length = position
+            if not self._map or len(self._map) < offset + length:
+                self._remap()
+
+            return self._map[offset:offset + length]
+
+    def add(self, cover_key: str, thumbnail_format: ThumbnailFormat, thumbnails: dict[int, bytes]):
+        """Appends the encoded thumbnails of a cover, replacing existing ones of the same sizes."""
+        records = [(thumbnail_format.name, size, data) for size, data in thumbnails.items() if data]
+        if records:
+            with self._lock:
+                self._open()
+                self._append(cover_key, records)
+
+    def remove(self, cover_key: str, size: int, thumbnail_format: ThumbnailFormat):
+        with self._lock:
+            self._open()
+            if self.contains(cover_key, size, thumbnail_format):
+                self._append(cover_key, [(thumbnail_format.name, size, b"")])
+
+    def export(self, cover_key: str, size: int, thumbnail_format: ThumbnailFormat) -> Path | None:
+        """Writes a thumbnail to its own file for consumers outside of Cozy like MPRIS.
+        Only the latest exported thumbnail is kept, the files of earlier ones are removed."""
+        directory = self.path.parent / EXPORT_DIR_NAME
+        file_path = directory / f"{cover_key}-{size}{thumbnail_format.extension}"
+
+        with self._lock:
+            if file_path.exists():
+                return file_path
+
+            data = self.get(cover_key, size, thumbnail_format)
+            if not data:
+                return None
+
+            directory.mkdir(parents=True, exist_ok=True)
+            temp_path = file_path.with_name(f"{file_path.name}.{uuid4().hex}")
+            try:
+                temp_path.write_bytes(data)
+                temp_path.replace(file_path)
+            except OSError as e:
+                log.warning("Could not export thumbnail of cover %s: %s", cover_key, e)
+                return None
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+            self._remove_stale_exports(file_path)
+
+        return file_path
+
+    def get_cover_key(self, book_id: int) -> str | None:
+        with self._cover_keys_lock:
+            return self._load_cover_keys().get(book_id)
+
+    def set_cover_key(self, book_id: int, cover_key: str):
+        """Stores the key of the current cover of a book, so that its thumbnails can be found without the book."""
+        self.set_cover_keys({book_id: cover_key})
+
+    def set_cover_keys(self, cover_keys: dict[int, str]):
+        """Stores the keys of the current covers of several books in a single transaction."""
+        with self._cover_keys_lock:
+            known_keys = self._load_cover_keys()
+            changed_keys = {book_id: key for book_id, key in cover_keys.items() if known_keys.get(book_id) != key}
+            if not changed_keys:
+                return
+
+            rows = [{"book": book_id, "uuid": key} for book_id, key in changed_keys.items()]
+            book_ids = list(changed_keys)
+            with transaction(ArtworkCacheModel._meta.database):
+                for index in range(0, len(book_ids), COVER_KEYS_CHUNK_SIZE):
+                    chunk = book_ids[index:index + COVER_KEYS_CHUNK_SIZE]
+                    ArtworkCacheModel.delete().where(ArtworkCacheModel.book << chunk).execute()
+
+                for index in range(0, len(rows), COVER_KEYS_CHUNK_SIZE):
+                    ArtworkCacheModel.insert_many(rows[index:index + COVER_KEYS_CHUNK_SIZE]).execute()
+
+            known_keys.update(changed_keys)
+
+    def delete_unused(self, thumbnail_format: ThumbnailFormat):
+        """Removes the cover keys of deleted books, all thumbnails no book refers to anymore
+        and thumbnails in another format than the current one. Compacts the pack afterwards if needed."""
+        with self._cover_keys_lock:
+            ArtworkCacheModel.delete().where(ArtworkCacheModel.book.not_in(BookModel.select(BookModel.id))).execute()
+            self._cover_keys = None
+            used_keys = set(self._load_cover_keys().values())
+
+            with self._lock:
+                self._open()
+                for cover_key, thumbnails in list(self._index.items()):
+                    unused = [(name, size, b"") for name, size in thumbnails
+                              if cover_key not in used_keys or name != thumbnail_format.name]
+                    if unused:
+                        self._append(cover_key, unused)
+
+                if self._needs_compaction():
+                    self.compact()
+
+    def compact(self):
+        """Rewrites the pack with the current thumbnails only."""
+        with self._lock:
+            self._open()
+            if len(self._map) < self._end:
+                self._remap()
+
+            temp_path = self.path.with_name(f"{self.path.name}.{uuid4().hex}")
+            try:
+                with open(temp_path, "wb") as file:
+                    file.write(PACK_MAGIC)
+                    for cover_key, thumbnails in self._index.items():
+                        key = cover_key.encode()
+                        for (name, size), (offset, length) in thumbnails.items():
+                            file.write(RECORD_HEADER.pack(_FORMAT_NAMES.index(name), size, len(key), length))
+                            file.write(key)
+                            file.write(self._map[offset:offset + length])
+                    file.flush()
+                    os.fsync(file.fileno())
+
+                self._close()
+                temp_path.replace(self.path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+            log.info("Compacted thumbnail pack to %d bytes", self.path.stat().st_size)
+            self._open()
+
+    def clear(self):
+        """Deletes all thumbnails and cover keys."""
+        with self._cover_keys_lock, self._lock:
+            self._close()
+            shutil.rmtree(self.path.parent, ignore_errors=True)
+            ArtworkCacheModel.delete().execute()
+            self._cover_keys = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _load_cover_keys(self) -> dict[int, str]:
+        if self._cover_keys is None:
+            query = ArtworkCacheModel.select(ArtworkCacheModel.book, ArtworkCacheModel.uuid).tuples()
+            self._cover_keys = dict(query)
+
+        return self._cover_keys
+
+    def _open(self):
+        if self._file:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._remove_legacy_thumbnails()
+            self.path.touch()
+
+        # The file stays open as long as the pack is memory-mapped and is closed in _close()
+        self._file = open(self.path, "r+b")  # noqa: SIM115
+        if self._file.read(len(PACK_MAGIC)) != PACK_MAGIC:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(PACK_MAGIC)
+            self._file.flush()
+
+        self._remap()
+        self._read_index()
+
+    def _close(self):
+        if self._map:
+            self._map.close()
+        if self._file:
+            self._file.close()
+
+        self._map = None
+        self._file = None
+        self._index = {}
+        self._end = 0
+        self._live_bytes = 0
+
+    def _remap(self):
+        if self._map:
+            self._map.close()
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_index(self):
+        self._index = {}
+        self._live_bytes = 0
+        offset = len(PACK_MAGIC)
+        end = len(self._map)
+
+        while offset + RECORD_HEADER.size <= end:
+            format_index, size, key_length, length = RECORD_HEADER.unpack_from(self._map, offset)
+            data_offset = offset + RECORD_HEADER.size + key_length
+            if format_index >= len(_FORMAT_NAMES) or data_offset + length > end:
+                break
+
+            cover_key = self._map[offset + RECORD_HEADER.size:data_offset].decode(errors="replace")
+            self._index_record(cover_key, _FORMAT_NAMES[format_index], size, data_offset, length)
+            offset = data_offset + length
+
+        if offset < end:
+            log.warning("Thumbnail pack is truncated at %d of %d bytes", offset, end)
+            self._file.truncate(offset)
+            self._remap()
+
+        self._end = offset
+
+    def _append(self, cover_key: str, records: list[tuple[str, int, bytes]]):
+        key = cover_key.encode()
+        chunks = []
+        offset = self._end
+
+        for name, size, data in records:
+            chunks += [RECORD_HEADER.pack(_FORMAT_NAMES.index(name), size, len(key), len(data)), key, data]
+            offset += RECORD_HEADER.size + len(key)
+            self._index_record(cover_key, name, size, offset, len(data))
+            offset += len(data)
+
+        self._file.seek(self._end)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        self._end = offset
+
+    def _index_record(self, cover_key: str, name: str, size: int, data_offset: int, length: int):
+        thumbnails = self._index.setdefault(cover_key, {})
+        replaced = thumbnails.pop((name, size), None)
+        if replaced:
+            self._live_bytes -= self._record_size(cover_key, replaced[1])
+
+        if length:
+            thumbnails[(name, size)] = (data_offset, length)
+            self._live_bytes += self._record_size(cover_key, length)
+        elif not thumbnails:
+            del self._index[cover_key]
+
+    def _needs_compaction(self) -> bool:
+        return self._end >= COMPACTION_MIN_SIZE and self.fragmentation >= COMPACTION_RATIO
+
+    def _remove_stale_exports(self, current_export: Path):
+        for path in current_export.parent.iterdir():
+            if path != current_export:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    log.debug(e)
+
+    def _remove_legacy_thumbnails(self):
+        # Earlier versions stored every thumbnail in its own file in a directory per cover.
+        # They are removed once, when the pack is created.
+        for path in self.path.parent.iterdir():
+            if path.is_dir() and path.name != EXPORT_DIR_NAME:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _record_size(cover_key: str, length: int) -> int:
+        return RECORD_HEADER.size + len(cover_key.encode()) + length
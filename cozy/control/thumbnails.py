@@ -0,0 +1,157 @@
+import hashlib
+import io
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from stat import S_ISREG
+
+from PIL import Image
+
+from cozy.model.cover_store import CoverStore
+
+log = logging.getLogger("thumbnails")
+
+# Covers of the media controller, book rows, book cards and the book details at all scale factors.
+# MPRIS uses the 256 pixel thumbnail.
+THUMBNAIL_SIZES = (46, 52, 200, 256)
+SCALE_FACTORS = (1, 2)
+COVER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+THUMBNAIL_FORMATS = {"png": ("PNG", ".png"), "jpeg": ("JPEG", ".jpg"), "webp": ("WEBP", ".webp")}
+
+
+class ThumbnailFormat:
+    """File format of the thumbnails on disk. The quality is used by JPEG and WebP."""
+
+    __slots__ = ("name", "quality")
+
+    def __init__(self, name: str = "png", quality: int = 90):
+        self.name: str = name if name in THUMBNAIL_FORMATS else "png"
+        self.quality: int = quality
+
+    @classmethod
+    def from_settings(cls, app_settings) -> "ThumbnailFormat":
+        return cls(app_settings.thumbnail_format, app_settings.thumbnail_quality)
+
+    @property
+    def extension(self) -> str:
+        return THUMBNAIL_FORMATS[self.name][1]
+
+    def encode(self, image: Image.Image) -> bytes:
+        pil_format = THUMBNAIL_FORMATS[self.name][0]
+        data = io.BytesIO()
+
+        if self.name == "png":
+            image.save(data, format=pil_format)
+            return data.getvalue()
+
+        if self.name == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        image.save(data, format=pil_format, quality=self.quality)
+        return data.getvalue()
+
+
+class CoverSource:
+    """An available cover image of a book.
+
+    Embedded covers are keyed by the hash of their content, cover files by their path, size and
+    modification time. Thumbnails are stored by this key, so they stay valid until the cover changes."""
+
+    __slots__ = ("cover_hash", "key", "path")
+
+    def __init__(self, key: str, cover_hash: str | None = None, path: Path | None = None):
+        self.key: str = key
+        self.cover_hash: str | None = cover_hash
+        self.path: Path | None = path
+
+    def read(self) -> bytes | None:
+        if self.cover_hash:
+            return CoverStore.load(self.cover_hash)
+
+        try:
+            return self.path.read_bytes()
+        except OSError as e:
+            log.debug(e)
+            return None
+
+
+def get_cover_sources(cover_hash: str | None, file: str | None, prefer_external_cover: bool) -> Iterator[CoverSource]:
+    """Yields the available covers of a book in the preferred order. `file` is the path of the first
+    chapter of the book. Its directory is only searched for a cover file when it is preferred
+    or when the embedded cover is missing or cannot be used."""
+    loading_order = [lambda: _get_embedded_cover_source(cover_hash), lambda: _get_cover_file_source(file)]
+
+    if prefer_external_cover:
+        loading_order.reverse()
+
+    for get_source in loading_order:
+        source = get_source()
+        if source:
+            yield source
+
+
+def _get_embedded_cover_source(cover_hash: str | None) -> CoverSource | None:
+    if not cover_hash:
+        return None
+
+    return CoverSource(cover_hash, cover_hash=cover_hash)
+
+
+def _get_cover_file_source(file: str | None) -> CoverSource | None:
+    if not file:
+        return None
+
+    directory = Path(file).absolute().parent
+
+    try:
+        paths = sorted(directory.glob("cover.*"))
+    except OSError as e:
+        log.debug(e)
+        return None
+
+    for path in paths:
+        if path.suffix.lower() not in COVER_EXTENSIONS:
+            continue
+
+        try:
+            stat = path.stat()
+        except OSError as e:
+            log.debug(e)
+            continue
+
+        if not S_ISREG(stat.st_mode):
+            continue
+
+        key = hashlib.sha256(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+        return CoverSource(key, path=path)
+
+    return None
+
+
+def get_thumbnail_sizes() -> list[int]:
+    return sorted({size * scale for size in THUMBNAIL_SIZES for scale in SCALE_FACTORS})
+
+
+def encode_thumbnail(image: Image.Image, size: int, thumbnail_format: ThumbnailFormat) -> bytes:
+    """Resizes the image in place and returns it encoded as thumbnail."""
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return thumbnail_format.encode(image)
+
+
+def render_thumbnails(job: tuple[str, bytes | None, list[int], ThumbnailFormat]) -> tuple[str, dict[int, bytes]] | None:
+    """Renders the thumbnails of one cover. Runs in the import worker processes,
+    the thumbnails are stored by the importer."""
+    cover_key, data, sizes, thumbnail_format = job
+    if not data:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            thumbnails = {size: encode_thumbnail(image, size, thumbnail_format)
+                          for size in sorted(sizes, reverse=True)}
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        log.warning("Could not render thumbnails of cover %s: %s", cover_key, e)
+        return None
+
+    return cover_key, thumbnails
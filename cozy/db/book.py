@@ -1,4 +1,4 @@
-from peewee import BlobField, BooleanField, CharField, FloatField, IntegerField
+from peewee import BooleanField, CharField, FloatField, IntegerField, fn
 
 from cozy.db.model_base import ModelBase
 
@@ -9,9 +9,13 @@ class Book(ModelBase):
     reader = CharField()
     position = IntegerField()
     rating = IntegerField()
-    cover = BlobField(null=True)
+    cover_hash = CharField(null=True)
     playback_speed = FloatField(default=1.0)
     last_played = IntegerField(default=0)
     offline = BooleanField(default=False)
     downloaded = BooleanField(default=False)
     hidden = BooleanField(default=False)
+
+
+# Books are matched case-insensitively by name while importing
+Book.add_index(Book.index(fn.lower(Book.name), name="book_name_lower"))
@@ -13,3 +13,20 @@ def collate_natural(s1, s2):
         return -1
     else:
         return 1
+
+
+def natural_sort_key(text: str) -> str:
+    """Returns a key that sorts like `collate_natural` using a plain binary comparison.
+
+    Text parts are lower cased and terminated by a control character,
+    numbers are stripped of leading zeros and prefixed with their length."""
+    key = []
+
+    for index, part in enumerate(re.split('([0-9]+)', text or "")):
+        if index % 2:
+            digits = part.lstrip("0") or "0"
+            key.append(f"{len(digits):03d}{digits}")
+        else:
+            key.append(part.lower() + "\x01")
+
+    return "".join(key)
@@ -0,0 +1,8 @@
+from peewee import BlobField, CharField
+
+from cozy.db.model_base import ModelBase
+
+
+class Cover(ModelBase):
+    hash = CharField(unique=True)
+    data = BlobField()
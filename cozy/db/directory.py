@@ -0,0 +1,9 @@
+from peewee import CharField, IntegerField
+
+from cozy.db.model_base import ModelBase
+
+
+class Directory(ModelBase):
+    path = CharField(unique=True)
+    modified = IntegerField()
+    child_count = IntegerField()
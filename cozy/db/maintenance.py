@@ -0,0 +1,76 @@
+import logging
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from peewee import Database
+
+from cozy.db.model_base import transaction
+
+log = logging.getLogger("db")
+
+INCREMENTAL_VACUUM_PAGES = 1000
+VACUUM_FRAGMENTATION = 0.2
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class DatabaseStats:
+    size: int  # in bytes, including the WAL and the shared memory file
+    page_count: int
+    free_pages: int
+
+    @property
+    def fragmentation(self) -> float:
+        return self.free_pages / self.page_count if self.page_count else 0.0
+
+
+def get_database_stats(db: Database) -> DatabaseStats:
+    """Reads the stats through a separate read-only connection, so that they neither wait for
+    the write queue nor for the connection of the calling thread. Databases in memory have no stats."""
+    path = Path(db.database)
+    if not path.is_file():
+        return DatabaseStats(size=0, page_count=0, free_pages=0)
+
+    files = [path.with_name(path.name + suffix) for suffix in ("", "-wal", "-shm")]
+
+    with closing(sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)) as connection:
+        return DatabaseStats(
+            size=sum(file.stat().st_size for file in files if file.is_file()),
+            page_count=connection.execute("PRAGMA page_count").fetchone()[0],
+            free_pages=connection.execute("PRAGMA freelist_count").fetchone()[0],
+        )
+
+
+def run_maintenance(db: Database):
+    """Updates the statistics of the query planner, returns free pages to the file system
+    and truncates the WAL."""
+    db.execute_sql("PRAGMA optimize").fetchall()
+
+    stats = get_database_stats(db)
+    if _pragma(db, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+        _incremental_vacuum(db, min(stats.free_pages, INCREMENTAL_VACUUM_PAGES))
+    elif stats.fragmentation >= VACUUM_FRAGMENTATION:
+        log.info("Vacuuming database with %d of %d pages free", stats.free_pages, stats.page_count)
+        # Databases created before auto_vacuum was enabled are converted by the VACUUM
+        db.execute_sql("PRAGMA auto_vacuum = INCREMENTAL").fetchall()
+        db.execute_sql("VACUUM").fetchall()
+
+    db.execute_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def _incremental_vacuum(db: Database, pages: int):
+    if pages <= 0:
+        return
+
+    # Python's sqlite3 steps a statement without result columns only once,
+    # which frees a single page per PRAGMA incremental_vacuum. On the queue database,
+    # transaction() keeps the writes of other threads out until the vacuum is committed.
+    with transaction(db):
+        for _ in range(pages):
+            db.execute_sql("PRAGMA incremental_vacuum(1)").fetchall()
+
+
+def _pragma(db: Database, name: str) -> int:
+    return db.execute_sql(f"PRAGMA {name}").fetchone()[0]
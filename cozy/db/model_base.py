@@ -1,13 +1,228 @@
+import heapq
+import itertools
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
 
-from peewee import Model
-from playhouse.sqliteq import SqliteQueueDatabase
+from peewee import Database, Model, OperationalError, SqliteDatabase
+from playhouse.sqliteq import QUERY, AsyncCursor, SqliteQueueDatabase
 
 from cozy.control.application_directories import get_data_dir
 
 log = logging.getLogger("db")
 
+SLOW_WRITE_WAIT = 1.0
+DATABASE_BACKENDS = ("queue", "direct")
+SYNCHRONOUS_MODES = ("off", "normal", "full")
+TEMP_STORE_MODES = ("default", "file", "memory")
+
 _db = None
+_batches = threading.local()
+_write_priorities = threading.local()
+
+
+class WritePriority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+
+
+class WriteStats:
+    """Counts the writes to the database and how long they waited before they were executed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+        self.max_depth: int = 0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.count if self.count else 0.0
+
+    def record(self, wait: float, depth: int):
+        with self._lock:
+            self.count += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.max_depth = max(self.max_depth, depth)
+
+        if wait >= SLOW_WRITE_WAIT:
+            log.warning("Database write waited %.2fs, %d writes pending", wait, depth)
+
+    def log_summary(self):
+        with self._lock:
+            log.info("Database writes: %d, average wait %.1fms, max wait %.1fms, max queue depth %d",
+                     self.count, self.average_wait * 1000, self.max_wait * 1000, self.max_depth)
+
+
+class PriorityWriteQueue:
+    """Write queue of the database writer thread.
+
+    Entries are returned by priority and in insertion order within a priority. Only normal priority
+    entries count against max_size, so high priority writes never wait for space behind an import."""
+
+    def __init__(self, max_size: int, stats: WriteStats):
+        self._max_size: int = max_size or 0
+        self._stats: WriteStats = stats
+        self._heap = []
+        self._counter = itertools.count()
+        self._normal_entries: int = 0
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+
+    def put(self, item, priority: WritePriority = WritePriority.NORMAL):
+        with self._not_full:
+            if priority == WritePriority.NORMAL:
+                while self._max_size and self._normal_entries >= self._max_size:
+                    self._not_full.wait()
+                self._normal_entries += 1
+
+            heapq.heappush(self._heap, (priority, next(self._counter), time.monotonic(), item))
+            self._not_empty.notify()
+
+    def get(self):
+        with self._not_empty:
+            while not self._heap:
+                self._not_empty.wait()
+
+            priority, _, queued_at, item = heapq.heappop(self._heap)
+            if priority == WritePriority.NORMAL:
+                self._normal_entries -= 1
+                self._not_full.notify()
+            depth = len(self._heap)
+
+        if item[0] is QUERY:
+            self._stats.record(time.monotonic() - queued_at, depth)
+
+        return item
+
+    def qsize(self) -> int:
+        with self._mutex:
+            return len(self._heap)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+
+class CozyQueueDatabase(SqliteQueueDatabase):
+    """Reads run on the connection of the calling thread, writes are executed in order of their
+    priority by a single writer thread.
+
+    All threads share the connection of the writer thread, so a transaction holds a lock until it is
+    committed or rolled back. Writes of other threads are queued only after that and can neither
+    end up in the transaction nor be rolled back with it, regardless of their priority."""
+
+    def __init__(self, *args, **kwargs):
+        self.write_stats = WriteStats()
+        self._transaction_lock = threading.RLock()
+        self._transaction_owner: int | None = None
+        self._transaction_priority: WritePriority = WritePriority.NORMAL
+        super().__init__(*args, **kwargs)
+
+    def _create_write_queue(self):
+        self._write_queue = PriorityWriteQueue(self._thread_helper.queue_max_size, self.write_stats)
+
+    def execute_sql(self, sql, params=None, timeout=None):
+        if sql.lower().startswith("select"):
+            return self._execute(sql, params)
+
+        cursor = AsyncCursor(
+            event=self._thread_helper.event(),
+            sql=sql,
+            params=params,
+            timeout=self._results_timeout if timeout is None else timeout)
+
+        with self._transaction_lock:
+            # The writes of a transaction keep the priority of its BEGIN, so that they stay in order
+            if self._transaction_owner == threading.get_ident():
+                priority = self._transaction_priority
+            else:
+                priority = _current_write_priority()
+
+            self._write_queue.put((QUERY, cursor), priority)
+
+        return cursor
+
+    @contextmanager
+    def serialized_transaction(self):
+        """Runs the writes of the enclosed block in one transaction. Nested blocks join the outer one."""
+        with self._transaction_lock:
+            if self._transaction_owner == threading.get_ident():
+                yield
+                return
+
+            self._transaction_owner = threading.get_ident()
+            self._transaction_priority = _current_write_priority()
+            try:
+                self.execute_sql("BEGIN").fetchall()
+                try:
+                    yield
+                except BaseException:
+                    self._rollback()
+                    raise
+
+                try:
+                    self.execute_sql("COMMIT").fetchall()
+                except OperationalError:
+                    self._rollback()
+                    raise
+            finally:
+                self._transaction_owner = None
+
+    def _rollback(self):
+        # Some errors already roll back the transaction in SQLite
+        try:
+            self.execute_sql("ROLLBACK").fetchall()
+        except OperationalError as e:
+            log.warning("Could not roll back the transaction: %s", e)
+
+    def stop(self):
+        stopped = super().stop()
+        if stopped:
+            self.write_stats.log_summary()
+        return stopped
+
+
+class CozyDirectDatabase(SqliteDatabase):
+    """Every thread reads and writes on its own connection. Writers wait for the SQLite write lock
+    instead of a queue, so write priorities have no effect: a position save waits until a running
+    import transaction is committed. Transactions take the write lock when they begin, which avoids
+    busy errors when a read transaction is upgraded to a write."""
+
+    def __init__(self, *args, **kwargs):
+        self.write_stats = WriteStats()
+        super().__init__(*args, **kwargs)
+
+    def begin(self, lock_type=None):
+        # Older peewee versions do not take a default lock type in the constructor
+        super().begin(lock_type or "IMMEDIATE")
+
+    def execute_sql(self, sql, params=None):
+        if sql.lower().startswith("select"):
+            return super().execute_sql(sql, params)
+
+        start = time.monotonic()
+        cursor = super().execute_sql(sql, params)
+        self.write_stats.record(time.monotonic() - start, 0)
+        return cursor
+
+    def queue_size(self) -> int:
+        return 0
+
+    def start(self):
+        return True
+
+    def stop(self):
+        self.close()
+        self.write_stats.log_summary()
+        return True
+
+    def is_stopped(self) -> bool:
+        return False
 
 
 def get_sqlite_database():
@@ -19,16 +234,138 @@ def database_file_exists():
     return (get_data_dir() / "cozy.db").is_file()
 
 
+def _load_settings():
+    """Returns the settings of Cozy or None when its schema is not installed."""
+    try:
+        from gi.repository import Gio
+    except ImportError as e:
+        log.warning("Could not read the database settings: %s", e)
+        return None
+
+    schema_id = "com.github.geigi.cozy"
+    source = Gio.SettingsSchemaSource.get_default()
+    if not source or not source.lookup(schema_id, True):
+        return None
+
+    return Gio.Settings.new(schema_id)
+
+
+def _get_database_backend(settings) -> str:
+    backend = settings.get_string("database-backend") if settings else None
+    return backend if backend in DATABASE_BACKENDS else "queue"
+
+
+def _get_pragmas(settings) -> list[tuple[str, object]]:
+    # auto_vacuum has to be set before journal_mode, otherwise a new database is created without it
+    pragmas = [('auto_vacuum', 'incremental'), ('cache_size', -1024 * 32), ('journal_mode', 'wal')]
+    if not settings:
+        return pragmas
+
+    mmap_size = settings.get_int("database-mmap-size")
+    if isinstance(mmap_size, int) and mmap_size >= 0:
+        pragmas.append(('mmap_size', mmap_size * 1024 * 1024))
+
+    synchronous = settings.get_string("database-synchronous")
+    if synchronous in SYNCHRONOUS_MODES:
+        pragmas.append(('synchronous', synchronous))
+
+    temp_store = settings.get_string("database-temp-store")
+    if temp_store in TEMP_STORE_MODES:
+        pragmas.append(('temp_store', temp_store))
+
+    return pragmas
+
+
 def __open_database():
     global _db
 
-    _db = SqliteQueueDatabase(str(get_data_dir() / "cozy.db"), queue_max_size=128, results_timeout=15.0,
-                              timeout=15.0, pragmas=[('cache_size', -1024 * 32), ('journal_mode', 'wal')])
+    path = str(get_data_dir() / "cozy.db")
+    settings = _load_settings()
+    pragmas = _get_pragmas(settings)
+
+    if _get_database_backend(settings) == "direct":
+        _db = CozyDirectDatabase(path, timeout=15.0, pragmas=pragmas)
+    else:
+        _db = CozyQueueDatabase(path, queue_max_size=128, results_timeout=15.0, timeout=15.0, pragmas=pragmas)
+
+    log.info("Using the %s database backend with %s", type(_db).__name__, pragmas)
 
 
 __open_database()
 
 
+@contextmanager
+def transaction(db: Database):
+    """Runs all writes of the enclosed block in a single transaction.
+
+    SqliteQueueDatabase does not support atomic(). Its writer thread executes all writes on one
+    connection, so CozyQueueDatabase opens and closes the transaction with queued statements and
+    holds back the writes of other threads meanwhile. Reads inside of the block use another
+    connection and do not see the uncommitted writes."""
+    if isinstance(db, CozyQueueDatabase):
+        with db.serialized_transaction():
+            yield
+        return
+
+    with db.atomic():
+        yield
+
+
+@contextmanager
+def write_priority(priority: WritePriority):
+    """Queues the writes of the enclosed block of the current thread with the given priority.
+    High priority writes are executed before queued normal priority writes of other threads,
+    but never inside of a transaction of another thread."""
+    previous = _current_write_priority()
+    _write_priorities.priority = priority
+    try:
+        yield
+    finally:
+        _write_priorities.priority = previous
+
+
+def _current_write_priority() -> WritePriority:
+    return getattr(_write_priorities, "priority", WritePriority.NORMAL)
+
+
+@contextmanager
+def batch(db: Database):
+    """Defers the writes of `save_dirty_fields` in the enclosed block of the current thread
+    and saves all changed objects at the end of the block in a single transaction.
+    Nested batches are merged into the outermost one."""
+    if getattr(_batches, "objects", None) is not None:
+        yield
+        return
+
+    _batches.objects = {}
+    try:
+        yield
+    finally:
+        objects = _batches.objects
+        _batches.objects = None
+        _save_all(db, objects.values())
+
+
+def save_dirty_fields(db_object: Model):
+    """Saves the changed fields of a database object or defers it to the end of the active batch."""
+    objects = getattr(_batches, "objects", None)
+
+    if objects is None:
+        db_object.save(only=db_object.dirty_fields)
+    else:
+        objects[id(db_object)] = db_object
+
+
+def _save_all(db: Database, db_objects):
+    db_objects = [db_object for db_object in db_objects if db_object.dirty_fields]
+    if not db_objects:
+        return
+
+    with transaction(db):
+        for db_object in db_objects:
+            db_object.save(only=db_object.dirty_fields)
+
+
 class ModelBase(Model):
     class Meta:
         database = _db
@@ -3,7 +3,7 @@ from peewee import BooleanField, CharField, ForeignKeyField, IntegerField
 from cozy.db.book import Book
 from cozy.db.model_base import ModelBase
 
-DB_VERSION = 10
+DB_VERSION = 15
 
 
 class Settings(ModelBase):
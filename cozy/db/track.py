@@ -9,5 +9,11 @@ class Track(ModelBase):
     number = IntegerField()
     disk = IntegerField()
     position = IntegerField()
-    book = ForeignKeyField(Book)
+    book = ForeignKeyField(Book, index=False)
     length = FloatField()
+    natural_sort_key = CharField(null=True)
+
+    class Meta:
+        indexes = (
+            (("book", "disk", "number", "natural_sort_key"), False),
+        )
@@ -1,28 +1,54 @@
-import itertools
 import logging
 import os
+import threading
 import time
+from collections.abc import Iterable
 from enum import Enum, auto
 from multiprocessing.pool import Pool as Pool
-from pathlib import Path
+from queue import Queue
 from urllib.parse import unquote, urlparse
 
 import inject
+from peewee import DatabaseError
 
 from cozy.architecture.event_sender import EventSender
 from cozy.architecture.profiler import timing
 from cozy.control.filesystem_monitor import FilesystemMonitor, StorageNotFound
-from cozy.media.media_detector import AudioFileCouldNotBeDiscovered, MediaDetector, NotAnAudioFile
+from cozy.control.thumbnail_pack import ThumbnailPack
+from cozy.control.thumbnails import (
+    CoverSource,
+    ThumbnailFormat,
+    get_cover_sources,
+    get_thumbnail_sizes,
+    render_thumbnails,
+)
+from cozy.db.file import File
+from cozy.db.track_to_file import TrackToFile
+from cozy.media.media_detector import (
+    AudioFileCouldNotBeDiscovered,
+    MediaDetector,
+    NotAnAudioFile,
+    init_discoverer,
+)
 from cozy.media.media_file import MediaFile
+from cozy.model.cover_store import CoverStore
 from cozy.model.database_importer import DatabaseImporter
-from cozy.model.library import Library
+from cozy.model.directory_index import DirectoryIndex
+from cozy.model.library import ChangedBook, Library
 from cozy.model.settings import Settings
 from cozy.report import reporter
+from cozy.settings import ApplicationSettings
 from cozy.ui.toaster import ToastNotifier
 
 log = logging.getLogger("importer")
 
 CHUNK_SIZE = 100
+DISCOVERY_CHUNK_SIZE = 4
+FILES_IN_FLIGHT_PER_WORKER = 16
+QUEUED_BATCHES = 4
+PROGRESS_INTERVAL = 0.1
+IMPORT_PROGRESS_END = 0.85
+THUMBNAILS_PROGRESS_END = 0.95
 
 AUDIO_EXTENSIONS = {".mp3", ".ogg", ".flac", ".m4a", ".m4b", ".mp4", ".wav", ".opus"}
 
@@ -59,12 +85,18 @@ class Importer(EventSender):
     _library = inject.attr(Library)
     _database_importer = inject.attr(DatabaseImporter)
     _toast: ToastNotifier = inject.attr(ToastNotifier)
+    _app_settings: ApplicationSettings = inject.attr(ApplicationSettings)
+    _thumbnails: ThumbnailPack = inject.attr(ThumbnailPack)
 
     def __init__(self):
         super().__init__()
 
         self._files_count: int = 0
         self._progress: int = 0
+        self._insert_failed: bool = False
+        self._directory_index: DirectoryIndex = DirectoryIndex()
+        self._pool: Pool | None = None
+        self._pool_size: int = 0
 
     @timing
     def scan(self):
@@ -75,7 +107,12 @@ class Importer(EventSender):
 
         self.emit_event_main_thread("scan-progress", 0.025)
         new_or_changed_files, undetected_files = self._execute_import(files_to_scan)
-        self._library.invalidate()
+        if not self._insert_failed:
+            self._directory_index.commit(set(files_to_scan) - new_or_changed_files)
+        CoverStore.delete_unused()
+        changed_books = self._library.apply_changed_files(new_or_changed_files)
+        if self._app_settings.pregenerate_thumbnails:
+            self._generate_thumbnails(changed_books)
 
         self.emit_event_main_thread("scan-progress", 1)
 
@@ -89,69 +126,199 @@ class Importer(EventSender):
             self.emit_event_main_thread("import-failed", undetected_files)
 
     def _execute_import(self, files_to_scan: list[str]) -> tuple[set[str], set[str]]:
+        """Discovers the files in the worker pool and hands the results over in batches
+        to a database writer thread, so that discovery and database inserts overlap."""
         new_or_changed_files = set()
         undetected_files = set()
 
-        self._files_count = self._count_files_to_scan()
+        self._files_count = max(1, len(files_to_scan))
         self.emit_event_main_thread("scan-progress", 0.05)
         self._progress = 0
+        self._insert_failed = False
 
-        pool = Pool()
-        while True:
-            try:
-                job = pool.map_async(import_file, itertools.islice(files_to_scan, CHUNK_SIZE))
-            except StopIteration as e:
-                log.warning("importer", e, "_execute_import raised a stop iteration.")
-                break
+        if not files_to_scan:
+            return new_or_changed_files, undetected_files
+
+        pool = self._get_pool()
+        files_in_flight = threading.Semaphore(self._pool_size * FILES_IN_FLIGHT_PER_WORKER)
+        feeding = threading.Event()
+        feeding.set()
 
-            self._wait_for_job_to_complete(job)
-            import_result = job.get()
+        def feed_files():
+            for file in files_to_scan:
+                files_in_flight.acquire()
+                if not feeding.is_set():
+                    return
 
-            undetected_files.update({file for file in import_result if isinstance(file, str)})
-            media_files = {file for file in import_result if isinstance(file, MediaFile)}
-            new_or_changed_files.update(file.path for file in media_files)
+                yield file
 
-            self._progress += CHUNK_SIZE
+        batches: Queue[set[MediaFile] | None] = Queue(maxsize=QUEUED_BATCHES)
+        writer = threading.Thread(
+            target=self._insert_batches, args=(batches,), name="ImportDatabaseWriterThread"
+        )
+        writer.start()
+
+        media_files = set()
+        last_progress_event = 0.0
+        try:
+            results = pool.imap_unordered(import_file, feed_files(), chunksize=DISCOVERY_CHUNK_SIZE)
+            for result in results:
+                files_in_flight.release()
+                self._progress += 1
+
+                if isinstance(result, MediaFile):
+                    media_files.add(result)
+                    new_or_changed_files.add(result.path)
+                elif isinstance(result, str):
+                    undetected_files.add(result)
+
+                if len(media_files) >= CHUNK_SIZE:
+                    batches.put(media_files)
+                    media_files = set()
+
+                if time.monotonic() - last_progress_event > PROGRESS_INTERVAL:
+                    last_progress_event = time.monotonic()
+                    self._emit_import_progress()
+        finally:
+            feeding.clear()
+            files_in_flight.release()
 
             if media_files:
+                batches.put(media_files)
+            batches.put(None)
+            writer.join()
+
+        return new_or_changed_files, undetected_files
+
+    def _insert_batches(self, batches: Queue):
+        while (media_files := batches.get()) is not None:
+            try:
+                self._database_importer.insert_many(media_files)
+            # The writer has to keep taking batches whatever fails, or the discovery would block on the queue
+            except Exception as e:
+                self._insert_failed = True
+                log.exception("Error while inserting new tracks to the database")
+                reporter.exception("importer", e)
+                self._toast.show(
+                    "{}: {}".format(_("Error while importing new files"), str(e.__class__))
+                )
+
+    def _emit_import_progress(self):
+        progress = 0.05 + (min(self._progress, self._files_count) / self._files_count) * (IMPORT_PROGRESS_END - 0.05)
+        self.emit_event_main_thread("scan-progress", progress)
+
+    def _generate_thumbnails(self, books: list[ChangedBook]):
+        """Renders the missing cover thumbnails of the given books in the worker processes,
+        so that the library does not have to render them when it shows the books for the first time."""
+        if not books:
+            return
+
+        thumbnail_format = ThumbnailFormat.from_settings(self._app_settings)
+        sources = self._get_cover_sources(books)
+        self._thumbnails.set_cover_keys({book_id: source.key for book_id, source in sources.items()})
+        jobs = self._get_thumbnail_jobs(sources.values(), thumbnail_format)
+        # Books without a cover or with all thumbnails count as done right away
+        done = len(books) - len(jobs)
+        if not jobs:
+            return
+
+        pool = self._get_pool()
+        covers_in_flight = threading.Semaphore(self._pool_size * FILES_IN_FLIGHT_PER_WORKER)
+        feeding = threading.Event()
+        feeding.set()
+
+        def feed_jobs():
+            for source, sizes in jobs:
+                covers_in_flight.acquire()
+                if not feeding.is_set():
+                    return
+
                 try:
-                    self._database_importer.insert_many(media_files)
-                except Exception as e:
-                    log.exception("Error while inserting new tracks to the database")
-                    reporter.exception("importer", e)
-                    self._toast.show(
-                        "{}: {}".format(_("Error while importing new files"), str(e.__class__))
+                    data = source.read()
+                except (DatabaseError, OSError) as e:
+                    # Raised here, the error would end the whole pass in the task thread of the pool
+                    log.warning("Could not read cover %s: %s", source.key, e)
+                    data = None
+
+                yield source.key, data, sizes, thumbnail_format
+
+        last_progress_event = 0.0
+        rendered = 0
+        try:
+            for result in pool.imap_unordered(render_thumbnails, feed_jobs()):
+                covers_in_flight.release()
+                if result:
+                    cover_key, thumbnails = result
+                    self._thumbnails.add(cover_key, thumbnail_format, thumbnails)
+                    rendered += 1
+                done += 1
+
+                if time.monotonic() - last_progress_event > PROGRESS_INTERVAL:
+                    last_progress_event = time.monotonic()
+                    progress = min(done / len(books), 1)
+                    self.emit_event_main_thread(
+                        "scan-progress",
+                        IMPORT_PROGRESS_END + progress * (THUMBNAILS_PROGRESS_END - IMPORT_PROGRESS_END)
                     )
+        finally:
+            feeding.clear()
+            covers_in_flight.release()
 
-            if self._progress >= self._files_count:
-                break
-        pool.close()
+        log.info("Rendered thumbnails of %d covers", rendered)
 
-        return new_or_changed_files, undetected_files
+    def _get_cover_sources(self, books: list[ChangedBook]) -> dict[int, CoverSource]:
+        """Returns the preferred cover of every book that has one, keyed by the book id."""
+        sources = {}
 
-    def _wait_for_job_to_complete(self, job):
-        while not job.ready():
-            jobs_finished = max(0, CHUNK_SIZE - job._number_left * job._chunksize)
-            progress = 0.05 + ((self._progress + jobs_finished) / self._files_count) * 0.9
-            self.emit_event_main_thread("scan-progress", progress)
-            time.sleep(0.1)
+        for book in books:
+            source = next(get_cover_sources(book.cover_hash, book.first_file, self._app_settings.prefer_external_cover),
+                          None)
+            if source:
+                sources[book.id] = source
 
-    @timing
-    def _count_files_to_scan(self) -> int:
-        files_to_scan = self._get_files_to_scan()
+        return sources
 
-        try:
-            return max(1, len(list(files_to_scan)))
-        except StopIteration as e:
-            reporter.exception("importer", e, "_count_files_to_scan raised a stop iteration.")
-            return 1
+    def _get_thumbnail_jobs(self, sources: Iterable[CoverSource],
+                            thumbnail_format: ThumbnailFormat) -> list[tuple[CoverSource, list[int]]]:
+        """Returns each cover with its missing thumbnail sizes. Covers shared by several books are rendered once."""
+        jobs = {}
 
+        for source in sources:
+            sizes = [size for size in get_thumbnail_sizes()
+                     if not self._thumbnails.contains(source.key, size, thumbnail_format)]
+            if sizes and source.key not in jobs:
+                jobs[source.key] = (source, sizes)
+
+        return list(jobs.values())
+
+    def close(self):
+        if self._pool:
+            self._pool.terminate()
+            self._pool = None
+
+    def _get_pool(self) -> Pool:
+        """The worker processes live across scans so that GStreamer and the
+        discoverer are initialized only once per process."""
+        pool_size = self._app_settings.import_workers or os.cpu_count() or 1
+
+        if self._pool and self._pool_size != pool_size:
+            self._pool.close()
+            self._pool = None
+
+        if not self._pool:
+            log.info("Starting %d import worker processes", pool_size)
+            self._pool = Pool(processes=pool_size, initializer=init_discoverer)
+            self._pool_size = pool_size
+
+        return self._pool
+
+    @timing
     def _get_files_to_scan(self) -> list[str]:
         paths_to_scan = self._get_configured_storage_paths()
         files_in_media_folders = self._walk_paths_to_scan(paths_to_scan)
         files_to_scan = self._filter_unchanged_files(files_in_media_folders)
 
-        return files_to_scan
+        return list(files_to_scan)
 
     def _get_configured_storage_paths(self) -> list[str]:
         """From all storage path configured by the user,
@@ -170,37 +337,36 @@ class Importer(EventSender):
         return [path for path in paths if os.path.exists(path)]
 
     def _walk_paths_to_scan(self, directories: list[str]) -> list[str]:
-        """Get all files recursive inside a directory. Returns absolute paths."""
-        for dir in directories:
-            for path in Path(dir).rglob("**/*"):
-                if path.suffix.lower() in AUDIO_EXTENSIONS:
-                    yield str(path)
+        """Get all files recursive inside a directory, skipping directories
+        that did not change since the last scan. Returns absolute paths."""
+        yield from self._directory_index.walk(directories, AUDIO_EXTENSIONS)
 
     def _filter_unchanged_files(self, files: list[str]) -> list[str]:
         """Filter all files that are already imported and that have not changed from a list of paths."""
-        imported_files = self._library.files
+        imported_files = self._get_imported_files()
 
         for file in files:
-            if file in imported_files:
-                try:
-                    chapter = next(
-                        chapter for chapter in self._library.chapters if chapter.file == file
-                    )
-                except StopIteration as e:
-                    log.warning("_filter_unchanged_files raised a stop iteration.")
-                    log.debug(e)
-                    yield file
-                    continue
-
-                try:
-                    mtime = os.path.getmtime(file)
-                    if mtime > chapter.modified:
-                        yield file
-                except Exception as e:
-                    log.debug(e)
-                    log.info("Could not get modified timestamp for file %s", file)
-                    continue
+            modified = imported_files.get(file)
 
+            if modified is None:
+                yield file
                 continue
 
-            yield file
+            try:
+                if os.path.getmtime(file) > modified:
+                    yield file
+            except OSError as e:
+                log.debug(e)
+                log.info("Could not get modified timestamp for file %s", file)
+
+    @staticmethod
+    def _get_imported_files() -> dict[str, int]:
+        """Returns the modified timestamp of all files that have chapters, keyed by path."""
+        query = (
+            File.select(File.path, File.modified)
+            .join(TrackToFile, on=(TrackToFile.file == File.id))
+            .distinct()
+            .tuples()
+        )
+
+        return dict(query)
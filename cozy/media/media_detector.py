@@ -2,13 +2,20 @@ import logging
 import pathlib
 
 from gi.repository import Gst, GstPbutils
+from mutagen import File, FileType, MutagenError
 
 from cozy.architecture.event_sender import EventSender
 from cozy.media.media_file import MediaFile
+from cozy.media.mutagen_tag_reader import MutagenTagReader
 from cozy.media.tag_reader import TagReader
 
 log = logging.getLogger("media_detector")
 
+_discoverer: GstPbutils.Discoverer | None = None
+
+# Unexpected or broken tags the mutagen tag reader can fail on. These files are read with GStreamer instead.
+TAG_READER_ERRORS = (AttributeError, KeyError, IndexError, TypeError, ValueError, MutagenError)
+
 
 class NotAnAudioFile(Exception):
     pass
@@ -18,15 +25,37 @@ class AudioFileCouldNotBeDiscovered(Exception):
     pass
 
 
+def init_discoverer() -> GstPbutils.Discoverer:
+    """Initializes GStreamer and a discoverer once per process.
+    This is used as initializer for the import worker processes."""
+    global _discoverer
+
+    if not _discoverer:
+        Gst.init(None)
+        _discoverer = GstPbutils.Discoverer()
+
+    return _discoverer
+
+
 class MediaDetector(EventSender):
     def __init__(self, path: str):
         super().__init__()
+        self.path = str(pathlib.Path(path).absolute())
         self.uri = pathlib.Path(path).absolute().as_uri()
 
-        Gst.init(None)
-        self.discoverer: GstPbutils.Discoverer = GstPbutils.Discoverer()
+        self.discoverer: GstPbutils.Discoverer = init_discoverer()
 
     def get_media_data(self) -> MediaFile:
+        """Reads supported formats with mutagen alone, which opens and parses the file only once.
+        All other files are handed to the GStreamer discoverer."""
+        mutagen_file = self._open_with_mutagen()
+
+        if MutagenTagReader.supports(mutagen_file):
+            try:
+                return MutagenTagReader(self.uri, mutagen_file).get_tags()
+            except TAG_READER_ERRORS as e:
+                log.info("Falling back to GStreamer for file %s: %s", self.uri, e)
+
         try:
             discoverer_info = self.discoverer.discover_uri(self.uri)
         except Exception:
@@ -34,9 +63,16 @@ class MediaDetector(EventSender):
             raise AudioFileCouldNotBeDiscovered(self.uri) from None
 
         if self._is_valid_audio_file(discoverer_info):
-            return TagReader(self.uri, discoverer_info).get_tags()
+            return TagReader(self.uri, discoverer_info, mutagen_file).get_tags()
         else:
             raise AudioFileCouldNotBeDiscovered(self.uri)
 
+    def _open_with_mutagen(self) -> FileType | None:
+        try:
+            return File(self.path)
+        except (MutagenError, OSError) as e:
+            log.debug("Mutagen could not open file %s: %s", self.uri, e)
+            return None
+
     def _is_valid_audio_file(self, info: GstPbutils.DiscovererInfo):
         return len(info.get_audio_streams()) == 1 and not info.get_video_streams()
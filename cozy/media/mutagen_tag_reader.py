@@ -0,0 +1,155 @@
+import base64
+import logging
+import struct
+
+from mutagen import FileType, MutagenError
+from mutagen.flac import FLAC, Picture
+from mutagen.mp3 import MP3
+from mutagen.mp4 import MP4
+from mutagen.ogg import OggFileType
+from mutagen.oggopus import OggOpus
+from mutagen.oggvorbis import OggVorbis
+
+from cozy.media.tag_reader import BaseTagReader
+
+log = logging.getLogger("mutagen_tag_reader")
+
+MP4_AUDIO_EXTENSIONS = (".m4a", ".m4b")
+FRONT_COVER = 3
+
+
+class MutagenTagReader(BaseTagReader):
+    """Reads the tags of a file using mutagen only, without a GStreamer discovery."""
+
+    def __init__(self, uri: str, mutagen_file: FileType):
+        super().__init__(uri, mutagen_file)
+
+        if not self.supports(mutagen_file):
+            raise ValueError("mutagen_file is not supported")
+
+        self.tags = mutagen_file.tags
+
+    @staticmethod
+    def supports(mutagen_file: FileType | None) -> bool:
+        """Formats that may contain video streams are left to the GStreamer discoverer."""
+        if mutagen_file is None or not mutagen_file.info or not mutagen_file.info.length:
+            return False
+
+        if isinstance(mutagen_file, MP4):
+            return mutagen_file.filename.lower().endswith(MP4_AUDIO_EXTENSIONS)
+
+        return isinstance(mutagen_file, (MP3, FLAC, OggVorbis, OggOpus))
+
+    def _get_book_name(self):
+        book_name = self._get_first(self._get_string_list("TALB", "\xa9alb", "album"))
+
+        return book_name or self._get_book_name_fallback()
+
+    def _get_author(self):
+        if self._has_vorbis_comments():
+            authors = self._get_string_list(None, None, "artist")
+        else:
+            authors = self._get_string_list("TCOM", "\xa9wrt", "composer")
+
+        if authors and authors[0]:
+            return "; ".join(authors)
+        else:
+            return _("Unknown")
+
+    def _get_reader(self):
+        if self._has_vorbis_comments():
+            readers = self._get_string_list(None, None, "performer")
+        else:
+            readers = self._get_string_list("TPE1", "\xa9ART", "artist")
+
+        if readers and readers[0]:
+            return "; ".join(readers)
+        else:
+            return _("Unknown")
+
+    def _get_disk(self):
+        return self._get_number("TPOS", "disk", "discnumber") or 1
+
+    def _get_track_number(self):
+        return self._get_number("TRCK", "trkn", "tracknumber") or 0
+
+    def _get_track_name(self):
+        track_name = self._get_first(self._get_string_list("TIT2", "\xa9nam", "title"))
+
+        return track_name or self._get_track_name_fallback()
+
+    def _get_cover(self):
+        if not self.tags and not isinstance(self.mutagen_file, FLAC):
+            return None
+
+        try:
+            if isinstance(self.mutagen_file, MP3):
+                pictures = [(frame.type, frame.data) for frame in self.tags.getall("APIC")]
+            elif isinstance(self.mutagen_file, MP4):
+                return bytes(self.tags["covr"][0]) if self.tags.get("covr") else None
+            elif isinstance(self.mutagen_file, FLAC):
+                pictures = [(picture.type, picture.data) for picture in self.mutagen_file.pictures]
+            else:
+                pictures = [
+                    (picture.type, picture.data)
+                    for picture in map(self._decode_vorbis_picture,
+                                       self.tags.get("metadata_block_picture", []))
+                    if picture
+                ]
+        except (KeyError, IndexError, TypeError, ValueError, MutagenError) as e:
+            log.debug("Could not read cover of %s: %s", self.uri, e)
+            return None
+
+        if not pictures:
+            return None
+
+        front_covers = [data for picture_type, data in pictures if picture_type == FRONT_COVER]
+        return front_covers[0] if front_covers else pictures[0][1]
+
+    def _get_length_in_seconds(self):
+        return self.mutagen_file.info.length
+
+    def _has_vorbis_comments(self):
+        return isinstance(self.mutagen_file, OggFileType)
+
+    def _get_chapter_comments(self):
+        return [f"{key}={value}" for key, value in self.tags] if self.tags else []
+
+    def _get_string_list(self, id3_key: str | None, mp4_key: str | None, vorbis_key: str | None):
+        if not self.tags:
+            return []
+
+        if isinstance(self.mutagen_file, MP3):
+            frames = self.tags.getall(id3_key) if id3_key else []
+            values = [str(text) for frame in frames for text in frame.text]
+        elif isinstance(self.mutagen_file, MP4):
+            values = [str(value) for value in self.tags.get(mp4_key, [])] if mp4_key else []
+        else:
+            values = self.tags.get(vorbis_key, []) if vorbis_key else []
+
+        return [value.strip() for value in values if value.strip()]
+
+    def _get_number(self, id3_key: str, mp4_key: str, vorbis_key: str) -> int | None:
+        if isinstance(self.mutagen_file, MP4):
+            values = self.tags.get(mp4_key) if self.tags else None
+            return values[0][0] if values else None
+
+        value = self._get_first(self._get_string_list(id3_key, None, vorbis_key))
+        if not value:
+            return None
+
+        try:
+            return int(value.split("/", 1)[0])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _get_first(values: list[str]) -> str | None:
+        return values[0] if values else None
+
+    @staticmethod
+    def _decode_vorbis_picture(value: str) -> Picture | None:
+        try:
+            return Picture(base64.b64decode(value))
+        except (ValueError, struct.error, MutagenError):
+            return None
@@ -13,6 +13,7 @@ from cozy.media.importer import Importer, ScanStatus
 from cozy.model.book import Book
 from cozy.model.chapter import Chapter
 from cozy.model.library import Library
+from cozy.model.position_store import PositionStore
 from cozy.report import reporter
 from cozy.settings import ApplicationSettings
 from cozy.tools import IntervalTimer
@@ -355,6 +356,7 @@ class Player(EventSender):
         self._gst_player.add_listener(self._on_gst_player_event)
 
         self.play_status_updater: IntervalTimer = IntervalTimer(1, self._emit_tick)
+        self._position_store = PositionStore(self._app_settings.position_save_interval)
 
         self.volume = self._app_settings.volume
 
@@ -484,6 +486,7 @@ class Player(EventSender):
 
     def destroy(self):
         self._stop_tick_thread()
+        self._position_store.flush()
         self._gst_player.stop()
 
     def _load_book(self, book: Book):
@@ -529,6 +532,7 @@ class Player(EventSender):
             self._gst_player.position = chapter.position
 
         if file_changed or self._book.position != chapter.id:
+            self._position_store.flush()
             self._book.position = chapter.id
             self.emit_event_main_thread("chapter-changed", self._book)
 
@@ -549,7 +553,7 @@ class Player(EventSender):
 
         current_position = self._gst_player.position
         current_position_relative = max(current_position - self.loaded_chapter.start_position, 0)
-        chapter_number = self._book.chapters.index(self._book.current_chapter)
+        chapter_number = self._book.current_chapter_index
         rewind_nanoseconds = self._app_settings.rewind_duration * Gst.SECOND * self.playback_speed
 
         if current_position_relative - rewind_nanoseconds > 0:
@@ -572,10 +576,10 @@ class Player(EventSender):
         current_position = self._gst_player.position
         current_position_relative = max(current_position - self.loaded_chapter.start_position, 0)
         old_chapter = self._book.current_chapter
-        chapter_number = self._book.chapters.index(self._book.current_chapter)
+        chapter_number = self._book.current_chapter_index
         forward_nanoseconds = self._app_settings.forward_duration * Gst.SECOND * self.playback_speed
 
-        if current_position_relative + forward_nanoseconds < self._book.current_chapter.length:
+        if current_position_relative + forward_nanoseconds < old_chapter.length:
             self._gst_player.position = current_position + forward_nanoseconds
         elif chapter_number < len(self._book.chapters) - 1:
             next_chapter = self._book.chapters[chapter_number + 1]
@@ -599,17 +603,19 @@ class Player(EventSender):
             )
             return
 
-        index_current_chapter = self._book.chapters.index(self._book.current_chapter)
+        index_current_chapter = self._book.current_chapter_index
+        current_chapter = self._book.chapters[index_current_chapter]
 
-        self._book.current_chapter.position = self._book.current_chapter.start_position
-        if len(self._book.chapters) <= index_current_chapter + 1:
-            log.info("Book finished, stopping playback.")
-            self._finish_book()
-            self._gst_player.stop()
-        else:
-            chapter = self._book.chapters[index_current_chapter + 1]
-            chapter.position = chapter.start_position
-            self.play_pause_chapter(self._book, chapter)
+        with self._library.batch():
+            current_chapter.position = current_chapter.start_position
+            if len(self._book.chapters) <= index_current_chapter + 1:
+                log.info("Book finished, stopping playback.")
+                self._finish_book()
+                self._gst_player.stop()
+            else:
+                chapter = self._book.chapters[index_current_chapter + 1]
+                chapter.position = chapter.start_position
+                self.play_pause_chapter(self._book, chapter)
 
     def _previous_chapter(self):
         if not self._book:
@@ -619,21 +625,24 @@ class Player(EventSender):
             )
             return
 
-        index_current_chapter = self._book.chapters.index(self._book.current_chapter)
-        self._book.current_chapter.position = self._book.current_chapter.start_position
+        index_current_chapter = self._book.current_chapter_index
+        current_chapter = self._book.chapters[index_current_chapter]
 
-        if index_current_chapter - 1 < 0:
-            log.info("Book reached start, cannot rewind further.")
-            chapter = self._book.chapters[0]
-            chapter.position = chapter.start_position
+        with self._library.batch():
+            current_chapter.position = current_chapter.start_position
 
-            self._load_chapter(chapter)
-            self.pause()
-            self._emit_tick()
-        else:
-            chapter = self._book.chapters[index_current_chapter - 1]
-            chapter.position = chapter.start_position
-            self.play_pause_chapter(self._book, chapter)
+            if index_current_chapter - 1 < 0:
+                log.info("Book reached start, cannot rewind further.")
+                chapter = self._book.chapters[0]
+                chapter.position = chapter.start_position
+
+                self._load_chapter(chapter)
+                self.pause()
+                self._emit_tick()
+            else:
+                chapter = self._book.chapters[index_current_chapter - 1]
+                chapter.position = chapter.start_position
+                self.play_pause_chapter(self._book, chapter)
 
     def _on_importer_event(self, event: str, message):
         if event == "scan" and message == ScanStatus.SUCCESS:
@@ -661,6 +670,7 @@ class Player(EventSender):
             self.emit_event_main_thread("play", self._book)
         elif event == "state" and message == Gst.State.PAUSED:
             self._stop_tick_thread()
+            self._position_store.flush()
             self.emit_event_main_thread("pause")
         elif event == "state" and message == Gst.State.READY:
             self._stop_playback()
@@ -683,11 +693,14 @@ class Player(EventSender):
 
     def _stop_playback(self):
         self._stop_tick_thread()
+        self._position_store.flush()
         self._book = None
         self.emit_event_main_thread("pause")
         self.emit_event_main_thread("stop")
 
     def _finish_book(self):
+        self._position_store.flush()
+
         if self._book:
             self._book.position = -1
             self._library.last_played_book = None
@@ -711,13 +724,15 @@ class Player(EventSender):
             log.info("Not emitting tick because no book/chapter is loaded.")
             return
 
-        if self.position > self.loaded_chapter.end_position and self._play_next_chapter:
+        position = self.position
+        if position > self.loaded_chapter.end_position and self._play_next_chapter:
             self._next_chapter()
+            position = self.position
 
         try:
-            self.loaded_chapter.position = self.position
-            position_for_ui = self.position - self.loaded_chapter.start_position
-            self.emit_event_main_thread("position", position_for_ui)
+            chapter = self.loaded_chapter
+            self._position_store.update(chapter, position)
+            self.emit_event_main_thread("position", position - chapter.start_position)
         except Exception as e:
             log.warning("Could not emit position event: %s", e)
 
@@ -1,8 +1,9 @@
 import os
+from abc import ABC, abstractmethod
 from urllib.parse import unquote, urlparse
 
 from gi.repository import GLib, Gst, GstPbutils
-from mutagen import File
+from mutagen import File, FileType
 from mutagen.mp3 import MP3
 from mutagen.mp4 import MP4
 
@@ -10,23 +11,13 @@ from cozy.media.chapter import Chapter
 from cozy.media.media_file import MediaFile
 
 
-class TagReader:
-    def __init__(self, uri: str, discoverer_info: GstPbutils.DiscovererInfo):
+class BaseTagReader(ABC):
+    def __init__(self, uri: str, mutagen_file: FileType | None = None):
         if not uri:
             raise ValueError("URI must not be None or empty")
 
-        if not discoverer_info:
-            raise ValueError("discoverer_info must not be None")
-
         self.uri: str = uri
-        self.discoverer_info = discoverer_info
-
-        self.tags: Gst.TagList = discoverer_info.get_tags()
-        result, tag_format = self.tags.get_string_index("container-format", 0)
-        self.tag_format = tag_format.lower() if result else None
-
-        if not self.tags:
-            raise ValueError("Failed to retrieve tags from discoverer_info")
+        self.mutagen_file: FileType | None = mutagen_file
 
     def get_tags(self) -> MediaFile:
         media_file = MediaFile(
@@ -42,55 +33,51 @@ class TagReader:
 
         return media_file
 
-    def _get_book_name(self):
-        success, value = self.tags.get_string_index(Gst.TAG_ALBUM, 0)
-
-        return value.strip() if success else self._get_book_name_fallback()
+    @abstractmethod
+    def _get_book_name(self) -> str:
+        pass
 
-    def _get_book_name_fallback(self):
-        path = os.path.normpath(self.uri)
-        directory_path = os.path.dirname(path)
-        directory = os.path.basename(directory_path)
-        return unquote(directory)
-
-    def _get_author(self):
-        authors = (
-            self._get_string_list(Gst.TAG_ARTIST)
-            if self.tag_format == "ogg"
-            else self._get_string_list(Gst.TAG_COMPOSER)
-        )
+    @abstractmethod
+    def _get_author(self) -> str:
+        pass
 
-        if authors and authors[0]:
-            return "; ".join(authors)
-        else:
-            return _("Unknown")
+    @abstractmethod
+    def _get_reader(self) -> str:
+        pass
 
-    def _get_reader(self):
-        readers = (
-            self._get_string_list(Gst.TAG_PERFORMER)
-            if self.tag_format == "ogg"
-            else self._get_string_list(Gst.TAG_ARTIST)
-        )
+    @abstractmethod
+    def _get_disk(self) -> int:
+        pass
 
-        if readers and readers[0]:
-            return "; ".join(readers)
-        else:
-            return _("Unknown")
+    @abstractmethod
+    def _get_track_number(self) -> int:
+        pass
 
-    def _get_disk(self):
-        success, value = self.tags.get_uint_index(Gst.TAG_ALBUM_VOLUME_NUMBER, 0)
+    @abstractmethod
+    def _get_track_name(self) -> str:
+        pass
 
-        return value if success else 1
+    @abstractmethod
+    def _get_cover(self) -> bytes | None:
+        pass
 
-    def _get_track_number(self):
-        success, value = self.tags.get_uint_index(Gst.TAG_TRACK_NUMBER, 0)
+    @abstractmethod
+    def _get_length_in_seconds(self) -> float:
+        pass
 
-        return value if success else 0
+    @abstractmethod
+    def _has_vorbis_comments(self) -> bool:
+        pass
 
-    def _get_track_name(self):
-        success, value = self.tags.get_string_index(Gst.TAG_TITLE, 0)
+    @abstractmethod
+    def _get_chapter_comments(self) -> list[str]:
+        """Returns the vorbis comments of the file in the form KEY=value."""
 
-        return value.strip() if success else self._get_track_name_fallback()
+    def _get_book_name_fallback(self):
+        path = os.path.normpath(self.uri)
+        directory_path = os.path.dirname(path)
+        directory = os.path.basename(directory_path)
+        return unquote(directory)
 
     def _get_track_name_fallback(self):
         filename = os.path.basename(self.uri)
@@ -98,51 +85,23 @@ class TagReader:
         return unquote(filename_without_extension)
 
     def _get_chapters(self):
-        path = unquote(urlparse(self.uri).path)
-        mutagen_file = File(path)
+        mutagen_file = self.mutagen_file
+        if mutagen_file is None:
+            mutagen_file = File(unquote(urlparse(self.uri).path))
 
         if isinstance(mutagen_file, MP4):
             return self._get_mp4_chapters(mutagen_file)
         elif isinstance(mutagen_file, MP3):
             return self._get_mp3_chapters(mutagen_file)
-        elif self.tag_format == "ogg":
+        elif self._has_vorbis_comments():
             return self._get_ogg_chapters()
         else:
             return self._get_single_file_chapter()
 
-    def _get_cover(self):
-        success, sample = self.tags.get_sample_index(Gst.TAG_IMAGE, 0)
-
-        if not success:
-            success, sample = self.tags.get_sample_index(Gst.TAG_PREVIEW_IMAGE, 0)
-        if not success:
-            return None
-
-        success, mapflags = sample.get_buffer().map(Gst.MapFlags.READ)
-        if not success:
-            return None
-
-        cover_bytes = GLib.Bytes(mapflags.data).get_data()
-        return cover_bytes
-
-    def _get_length_in_seconds(self):
-        return self.discoverer_info.get_duration() / Gst.SECOND
-
     def _get_modified(self):
         path = unquote(urlparse(self.uri).path)
         return int(os.path.getmtime(path))
 
-    def _get_string_list(self, tag: str):
-        success, value = self.tags.get_string_index(tag, 0)
-
-        values = []
-        for i in range(self.tags.get_tag_size(tag)):
-            success, value = self.tags.get_string_index(tag, i)
-            if success:
-                values.append(value.strip())
-
-        return values
-
     def _get_single_file_chapter(self):
         chapter = Chapter(
             name=self._get_track_name(),
@@ -203,7 +162,7 @@ class TagReader:
         return chapters
 
     def _get_ogg_chapters(self) -> list[Chapter]:
-        comment_list: list[str] = self._get_string_list("extended-comment")
+        comment_list: list[str] = self._get_chapter_comments()
         chapter_dict: dict[int, Chapter] = {}
         chapter_list: list[Chapter] = []
 
@@ -258,3 +217,103 @@ class TagReader:
             return (int(parts[0], 10) * 3600 + int(parts[1], 10) * 60 + float(parts[2])) * Gst.SECOND
         except ValueError:
             return None
+
+
+class TagReader(BaseTagReader):
+    """Reads the tags of a file from the GStreamer discoverer information."""
+
+    def __init__(
+        self, uri: str, discoverer_info: GstPbutils.DiscovererInfo, mutagen_file: FileType = None
+    ):
+        super().__init__(uri, mutagen_file)
+
+        if not discoverer_info:
+            raise ValueError("discoverer_info must not be None")
+
+        self.discoverer_info = discoverer_info
+
+        self.tags: Gst.TagList = discoverer_info.get_tags()
+        result, tag_format = self.tags.get_string_index("container-format", 0)
+        self.tag_format = tag_format.lower() if result else None
+
+        if not self.tags:
+            raise ValueError("Failed to retrieve tags from discoverer_info")
+
+    def _get_book_name(self):
+        success, value = self.tags.get_string_index(Gst.TAG_ALBUM, 0)
+
+        return value.strip() if success else self._get_book_name_fallback()
+
+    def _get_author(self):
+        authors = (
+            self._get_string_list(Gst.TAG_ARTIST)
+            if self.tag_format == "ogg"
+            else self._get_string_list(Gst.TAG_COMPOSER)
+        )
+
+        if authors and authors[0]:
+            return "; ".join(authors)
+        else:
+            return _("Unknown")
+
+    def _get_reader(self):
+        readers = (
+            self._get_string_list(Gst.TAG_PERFORMER)
+            if self.tag_format == "ogg"
+            else self._get_string_list(Gst.TAG_ARTIST)
+        )
+
+        if readers and readers[0]:
+            return "; ".join(readers)
+        else:
+            return _("Unknown")
+
+    def _get_disk(self):
+        success, value = self.tags.get_uint_index(Gst.TAG_ALBUM_VOLUME_NUMBER, 0)
+
+        return value if success else 1
+
+    def _get_track_number(self):
+        success, value = self.tags.get_uint_index(Gst.TAG_TRACK_NUMBER, 0)
+
+        return value if success else 0
+
+    def _get_track_name(self):
+        success, value = self.tags.get_string_index(Gst.TAG_TITLE, 0)
+
+        return value.strip() if success else self._get_track_name_fallback()
+
+    def _get_cover(self):
+        success, sample = self.tags.get_sample_index(Gst.TAG_IMAGE, 0)
+
+        if not success:
+            success, sample = self.tags.get_sample_index(Gst.TAG_PREVIEW_IMAGE, 0)
+        if not success:
+            return None
+
+        success, mapflags = sample.get_buffer().map(Gst.MapFlags.READ)
+        if not success:
+            return None
+
+        cover_bytes = GLib.Bytes(mapflags.data).get_data()
+        return cover_bytes
+
+    def _get_length_in_seconds(self):
+        return self.discoverer_info.get_duration() / Gst.SECOND
+
+    def _has_vorbis_comments(self):
+        return self.tag_format == "ogg"
+
+    def _get_chapter_comments(self):
+        return self._get_string_list("extended-comment")
+
+    def _get_string_list(self, tag: str):
+        success, value = self.tags.get_string_index(tag, 0)
+
+        values = []
+        for i in range(self.tags.get_tag_size(tag)):
+            success, value = self.tags.get_string_index(tag, i)
+            if success:
+                values.append(value.strip())
+
+        return values
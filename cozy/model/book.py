@@ -1,5 +1,7 @@
 import logging
+from bisect import bisect_right
 from contextlib import suppress
+from itertools import accumulate
 
 import inject
 from peewee import DoesNotExist, SqliteDatabase
@@ -7,12 +9,18 @@ from peewee import DoesNotExist, SqliteDatabase
 from cozy.architecture.event_sender import EventSender
 from cozy.architecture.observable import Observable
 from cozy.db.book import Book as BookModel
-from cozy.db.collation import collate_natural
+from cozy.db.model_base import WritePriority, save_dirty_fields, write_priority
 from cozy.db.track import Track as TrackModel
 from cozy.db.track_to_file import TrackToFile
 from cozy.model.chapter import Chapter
+from cozy.model.cover_store import CoverStore
 from cozy.model.settings import Settings
-from cozy.model.track import Track, TrackInconsistentData
+from cozy.model.track import (
+    Track,
+    TrackInconsistentData,
+    select_tracks_with_files,
+    track_sort_order,
+)
 from cozy.settings import ApplicationSettings
 
 log = logging.getLogger("BookModel")
@@ -24,10 +32,14 @@ class BookIsEmpty(Exception):
 
 class Book(Observable, EventSender):
     _chapters: list[Chapter] = None
+    _chapter_offsets: list[int] | None = None
+    _chapter_indices: dict[int, int] | None = None
     _settings: Settings = inject.attr(Settings)
     _app_settings: ApplicationSettings = inject.attr(ApplicationSettings)
 
-    def __init__(self, db: SqliteDatabase, book: BookModel):
+    def __init__(self, db: SqliteDatabase, book: BookModel, chapter_records: list | None = None):
+        """`chapter_records` are the records of this book from the library chapter index.
+        With them, the book and its duration and progress are available without chapter objects."""
         super().__init__()
         super(Observable, self).__init__()
 
@@ -35,8 +47,12 @@ class Book(Observable, EventSender):
         self.id: int = book.id
 
         self._db_object: BookModel = book
+        self._chapter_records: list | None = chapter_records
 
-        if TrackModel.select().where(TrackModel.book == self._db_object).count() < 1:
+        if chapter_records is not None:
+            if not chapter_records:
+                raise BookIsEmpty
+        elif TrackModel.select().where(TrackModel.book == self._db_object).count() < 1:
             raise BookIsEmpty
 
     @property
@@ -46,7 +62,7 @@ class Book(Observable, EventSender):
     @name.setter
     def name(self, new_name: str):
         self._db_object.name = new_name
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def author(self):
@@ -62,7 +78,7 @@ class Book(Observable, EventSender):
         else:
             self._db_object.reader = new_author
 
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def reader(self):
@@ -78,7 +94,7 @@ class Book(Observable, EventSender):
         else:
             self._db_object.author = new_reader
 
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def hidden(self):
@@ -88,7 +104,7 @@ class Book(Observable, EventSender):
     def hidden(self, value: bool):
         self._db_object.hidden = value
 
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def position(self) -> int:
@@ -97,7 +113,8 @@ class Book(Observable, EventSender):
     @position.setter
     def position(self, new_position: int):
         self._db_object.position = new_position
-        self._db_object.save(only=self._db_object.dirty_fields)
+        with write_priority(WritePriority.HIGH):
+            save_dirty_fields(self._db_object)
         self._notify("position")
         self._notify("current_chapter")
 
@@ -108,16 +125,20 @@ class Book(Observable, EventSender):
     @rating.setter
     def rating(self, new_rating: int):
         self._db_object.rating = new_rating
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
+
+    @property
+    def cover_hash(self):
+        return self._db_object.cover_hash
 
     @property
     def cover(self):
-        return self._db_object.cover
+        return CoverStore.load(self._db_object.cover_hash)
 
     @cover.setter
     def cover(self, new_cover: bytes):
-        self._db_object.cover = new_cover
-        self._db_object.save(only=self._db_object.dirty_fields)
+        self._db_object.cover_hash = CoverStore.store(new_cover)
+        save_dirty_fields(self._db_object)
 
     @property
     def playback_speed(self):
@@ -126,7 +147,7 @@ class Book(Observable, EventSender):
     @playback_speed.setter
     def playback_speed(self, new_playback_speed: float):
         self._db_object.playback_speed = new_playback_speed
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
         self._notify("playback_speed")
 
     @property
@@ -136,7 +157,7 @@ class Book(Observable, EventSender):
     @last_played.setter
     def last_played(self, new_last_played: int):
         self._db_object.last_played = new_last_played
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
         self._notify("last_played")
 
     @property
@@ -146,7 +167,7 @@ class Book(Observable, EventSender):
     @offline.setter
     def offline(self, new_offline: bool):
         self._db_object.offline = new_offline
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def downloaded(self):
@@ -155,7 +176,7 @@ class Book(Observable, EventSender):
     @downloaded.setter
     def downloaded(self, new_downloaded: bool):
         self._db_object.downloaded = new_downloaded
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def chapters(self):
@@ -164,34 +185,97 @@ class Book(Observable, EventSender):
 
         return self._chapters
 
+    @property
+    def first_file(self) -> str | None:
+        """Path of the file of the first chapter. It is taken from the chapter records if the
+        chapters are not loaded, so that it does not create the chapter objects."""
+        if self._chapters:
+            return self._chapters[0].file
+
+        if self._chapter_records:
+            return self._chapter_records[0].file
+
+        chapters = self.chapters
+        return chapters[0].file if chapters else None
+
     @property
     def current_chapter(self):
-        return next(
-            (chapter for chapter in self.chapters if chapter.id == self.position), self.chapters[0]
-        )
+        chapters = self.chapters
+        return chapters[self.current_chapter_index]
+
+    @property
+    def current_chapter_index(self) -> int:
+        """Index of the current chapter in `chapters`. Defaults to the first chapter."""
+        self._get_chapter_offsets()
+        return self._chapter_indices.get(self.position, 0)
 
     @property
     def duration(self):
-        return sum(chapter.length for chapter in self.chapters)
+        return self._get_chapter_offsets()[-1]
 
     @property
     def progress(self):
-        progress = 0
-
         if self.position == 0:
             return 0
         elif self.position == -1:
             return self.duration
 
-        for chapter in self.chapters:
-            if chapter.id == self.position:
-                relative_position = max(chapter.position - chapter.start_position, 0)
-                progress += relative_position
-                return progress
-
-            progress += chapter.length
+        offsets = self._get_chapter_offsets()
+        index = self._chapter_indices.get(self.position)
+        if index is None:
+            return offsets[-1]
 
-        return progress
+        if self._chapters:
+            chapter = self._chapters[index]
+            position, start_position = chapter.position, chapter.start_position
+        else:
+            record = self._chapter_records[index]
+            position = TrackModel.select(TrackModel.position).where(TrackModel.id == record.id).scalar()
+            start_position = record.start_position
+
+        return offsets[index] + max((position or 0) - start_position, 0)
+
+    def chapter_at(self, progress: int) -> tuple[Chapter, int] | None:
+        """Returns the chapter at the given progress of the book and the progress inside of it
+        or None if the progress is beyond the end of the book."""
+        offsets = self._get_chapter_offsets()
+        if progress < 0 or progress >= offsets[-1]:
+            return None
+
+        index = bisect_right(offsets, progress) - 1
+        return self.chapters[index], progress - offsets[index]
+
+    def _get_chapter_offsets(self) -> list[int]:
+        """Start offsets of all chapters in the book followed by the book duration.
+        They are cached until the chapters of the book change."""
+        if self._chapter_offsets is None:
+            chapters = self._chapters or self._chapter_records or self.chapters
+            self._chapter_offsets = list(accumulate((c.length for c in chapters), initial=0))
+            self._chapter_indices = {chapter.id: index for index, chapter in enumerate(chapters)}
+
+        return self._chapter_offsets
+
+    def _invalidate_chapter_offsets(self):
+        self._chapter_offsets = None
+        self._chapter_indices = None
+
+    def reload(self, book: BookModel, chapter_records: list):
+        """Replaces the book data after its chapters changed in the database.
+        Chapters are recreated the next time they are accessed."""
+        self._db_object = book
+
+        for chapter in self._chapters or []:
+            chapter.destroy_listeners()
+
+        self._chapters = None
+        self._chapter_records = chapter_records
+        self._invalidate_chapter_offsets()
+
+    def prefetch_chapters(self, tracks: list[TrackModel]):
+        """Creates the chapters from already fetched rows of `select_tracks_with_files`,
+        unless they are loaded already."""
+        if not self._chapters:
+            self._fetch_chapters(tracks)
 
     def reset(self) -> None:
         self.last_played = 0
@@ -231,19 +315,21 @@ class Book(Observable, EventSender):
         self.destroy_listeners()
         self._destroy_observers()
 
-    def _fetch_chapters(self):
-        tracks = (
-            TrackModel.select()
-            .where(TrackModel.book == self._db_object)
-            .order_by(
-                TrackModel.disk, TrackModel.number, collate_natural.collation(TrackModel.name)
+    def _fetch_chapters(self, tracks: list[TrackModel] | None = None):
+        self._chapter_records = None
+        self._invalidate_chapter_offsets()
+
+        if tracks is None:
+            tracks = (
+                select_tracks_with_files()
+                .where(TrackModel.book == self._db_object)
+                .order_by(*track_sort_order())
             )
-        )
 
         self._chapters = []
         for track in tracks:
             try:
-                track_model = Track(self._db, track)
+                track_model = Track(self._db, track, prefetched=True)
                 self._chapters.append(track_model)
             except TrackInconsistentData:
                 log.warning("Skipping inconsistent model")
@@ -254,9 +340,12 @@ class Book(Observable, EventSender):
             chapter.add_listener(self._on_chapter_event)
 
     def _on_chapter_event(self, event: str, chapter: Chapter):
-        if event == "chapter-deleted":
+        if event == "chapter-length-changed":
+            self._invalidate_chapter_offsets()
+        elif event == "chapter-deleted":
             with suppress(ValueError):
                 self.chapters.remove(chapter)
+            self._invalidate_chapter_offsets()
 
             if len(self._chapters) < 1:
                 if (
@@ -50,6 +50,14 @@ class Chapter(ABC, EventSender):
     def position(self, new_position: int):
         pass
 
+    @abstractmethod
+    def update_position(self, new_position: int):
+        """Updates the position without writing it to the database."""
+
+    @abstractmethod
+    def save_position(self):
+        pass
+
     @property
     @abstractmethod
     def file(self) -> str:
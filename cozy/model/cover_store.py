@@ -0,0 +1,55 @@
+import hashlib
+
+from cozy.db.book import Book
+from cozy.db.cover import Cover
+
+QUERY_CHUNK_SIZE = 500
+
+
+class CoverStore:
+    """Embedded cover images are stored once per distinct image, keyed by a hash of their content.
+    Books only reference the hash of their cover."""
+
+    @staticmethod
+    def get_hash(cover: bytes | None) -> str | None:
+        if not cover:
+            return None
+
+        return hashlib.sha256(cover).hexdigest()
+
+    @staticmethod
+    def load(cover_hash: str | None) -> bytes | None:
+        if not cover_hash:
+            return None
+
+        cover = Cover.select(Cover.data).where(Cover.hash == cover_hash).tuples().first()
+        return bytes(cover[0]) if cover else None
+
+    @staticmethod
+    def store(cover: bytes | None) -> str | None:
+        """Stores the image if it is not present yet and returns its hash."""
+        cover_hash = CoverStore.get_hash(cover)
+
+        if cover_hash and not Cover.select().where(Cover.hash == cover_hash).exists():
+            Cover.insert(hash=cover_hash, data=cover).on_conflict_ignore().execute()
+
+        return cover_hash
+
+    @staticmethod
+    def store_many(covers: dict[str, bytes]):
+        """Stores all images of a hash to image mapping which are not present yet."""
+        hashes = list(covers.keys())
+        missing_hashes = set(hashes)
+
+        for index in range(0, len(hashes), QUERY_CHUNK_SIZE):
+            chunk = hashes[index:index + QUERY_CHUNK_SIZE]
+            query = Cover.select(Cover.hash).where(Cover.hash << chunk).tuples()
+            missing_hashes.difference_update(cover_hash for cover_hash, in query)
+
+        for cover_hash in missing_hashes:
+            Cover.insert(hash=cover_hash, data=covers[cover_hash]).on_conflict_ignore().execute()
+
+    @staticmethod
+    def delete_unused():
+        used_hashes = Book.select(Book.cover_hash).where(Book.cover_hash.is_null(False))
+        Cover.delete().where(Cover.hash.not_in(used_hashes)).execute()
@@ -1,31 +1,35 @@
 import logging
+import threading
+from collections.abc import Iterable
 
 import inject
 from peewee import SqliteDatabase, fn
 
 from cozy.db.book import Book as BookModel
+from cozy.db.collation import natural_sort_key
 from cozy.db.file import File
+from cozy.db.model_base import batch, transaction
 from cozy.db.track import Track
 from cozy.db.track_to_file import TrackToFile
 from cozy.media.media_file import MediaFile
 from cozy.model.book import Book, BookIsEmpty
+from cozy.model.cover_store import CoverStore
 
 log = logging.getLogger("db_importer")
 
+QUERY_CHUNK_SIZE = 500
+INSERT_CHUNK_SIZE = 100
+# Media files imported in one transaction
+TRANSACTION_CHUNK_SIZE = 100
 
-def is_same_book(book_a: str, book_b: str) -> bool:
-    return book_a.casefold() == book_b.casefold()
 
+def _chunks(items: list, size: int):
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
 
-class TrackInsertRequest:
-    track_data: object
-    file: File
-    start_at: int
 
-    def __init__(self, track_data: object, file: File, start_at: int):
-        self.track_data = track_data
-        self.file = file
-        self.start_at = start_at
+def _get_next_id(model) -> int:
+    return (model.select(fn.Max(model.id)).scalar() or 0) + 1
 
 
 class BookUpdatePositionRequest:
@@ -39,92 +43,200 @@ class BookUpdatePositionRequest:
 
 class DatabaseImporter:
     _db = inject.attr(SqliteDatabase)
+    _insert_lock = threading.Lock()
 
     def __init__(self):
         self._book_update_positions: list[BookUpdatePositionRequest] = []
 
-    def insert_many(self, media_files: set[MediaFile]):
+    def insert_many(self, media_files: Iterable[MediaFile]):
+        """Imports a batch of media files with a constant number of queries per chunk.
+
+        Existing files, books and tracks are looked up and the rows of a chunk are prepared before its
+        transaction, which only contains the inserts and updates. So the transaction is short and
+        writes of other threads, like saving the playback position, do not wait for the reads.
+
+        Only the importer inserts files, books and tracks. The ids of new rows are taken from the
+        committed rows and `_insert_lock` keeps them free until the chunk is committed."""
         self._book_update_positions = []
 
-        files = self._prepare_files_db_objects(media_files)
-        File.insert_many(files).execute()
-        tracks = self._prepare_track_db_objects(media_files)
-        self._insert_tracks(tracks)
+        media_files = self._get_unique_media_files(media_files)
+        if not media_files:
+            return
+
+        with self._insert_lock:
+            # Positions are remembered before any chunk recreates the tracks they refer to
+            books = self._get_books(media_files)
+            self._book_update_positions = self._get_book_update_positions(books.values())
+
+            for chunk in _chunks(media_files, TRANSACTION_CHUNK_SIZE):
+                self._insert_chunk(chunk)
+
         self._update_book_positions()
 
-    def _prepare_files_db_objects(self, media_files: set[MediaFile]) -> list[object]:
-        files = []
+    def _insert_chunk(self, media_files: list[MediaFile]):
+        file_ids = self._get_file_ids(media_files)
+        books = self._get_books(media_files)
+        track_ids_to_delete = self._get_track_ids(file_ids.values())
 
-        for media_file in media_files:
-            query = File.select().where(File.path == media_file.path)
+        files = self._prepare_files_db_objects(media_files, file_ids)
+        book_rows, book_ids, covers = self._prepare_book_db_objects(media_files, books)
+        tracks, track_to_files = self._prepare_track_db_objects(media_files, file_ids, book_ids)
+        # Covers are shared by their hash and covers without a book are deleted after the scan
+        CoverStore.store_many(covers)
 
-            if query.exists():
-                self._update_files_in_db(query.get(), media_file)
-                continue
+        with transaction(self._db):
+            self._upsert_files(files)
+            self._upsert_books(book_rows)
+            self._delete_tracks_from_db(track_ids_to_delete)
+            self._insert_tracks(tracks, track_to_files)
 
-            file_already_in_list = any(f["path"] == media_file.path for f in files)
+    @staticmethod
+    def _get_unique_media_files(media_files: Iterable[MediaFile]) -> list[MediaFile]:
+        unique_media_files = {
+            media_file.path: media_file for media_file in media_files if media_file
+        }
 
-            if not file_already_in_list:
-                files.append({"path": media_file.path, "modified": media_file.modified})
+        return list(unique_media_files.values())
 
-        return files
+    @staticmethod
+    def _get_file_ids(media_files: list[MediaFile]) -> dict[str, int]:
+        paths = [media_file.path for media_file in media_files]
+        file_ids = {}
 
-    def _update_files_in_db(self, file: File, media_file: MediaFile):
-        file.modified = media_file.modified
-        file.save(only=file.dirty_fields)
+        for chunk in _chunks(paths, QUERY_CHUNK_SIZE):
+            file_ids.update(File.select(File.path, File.id).where(File.path << chunk).tuples())
 
-    def _prepare_track_db_objects(self, media_files: set[MediaFile]) -> set[TrackInsertRequest]:
-        book_db_objects: set[BookModel] = set()
+        return file_ids
 
-        for media_file in media_files:
-            if not media_file:
-                continue
+    def _get_books(self, media_files: list[MediaFile]) -> dict[str, BookModel]:
+        book_names = list({media_file.book_name.lower() for media_file in media_files})
+        books = {}
 
-            book = next((book for book in book_db_objects if is_same_book(book.name, media_file.book_name)), None)
-            file_query = File.select().where(File.path == media_file.path)
-            if not file_query.exists():
-                log.error("No file object with path present: %s", media_file.path)
-                continue
+        for chunk in _chunks(book_names, QUERY_CHUNK_SIZE):
+            query = BookModel.select().where(fn.Lower(BookModel.name) << chunk)
+            for book in query.order_by(BookModel.id):
+                books.setdefault(book.name.lower(), book)
 
-            file = file_query.get()
+        return books
 
-            if not book:
-                book = self._import_or_update_book(media_file)
-                book_db_objects.add(book)
+    @staticmethod
+    def _get_track_ids(file_ids: Iterable[int]) -> list[int]:
+        track_ids = []
+
+        for chunk in _chunks(list(file_ids), QUERY_CHUNK_SIZE):
+            query = TrackToFile.select(TrackToFile.track).where(TrackToFile.file << chunk).tuples()
+            track_ids.extend(track_id for track_id, in query)
+
+        return track_ids
+
+    def _get_book_update_positions(
+        self, books: Iterable[BookModel]
+    ) -> list[BookUpdatePositionRequest]:
+        """The position of a book references a track, which is recreated during the import.
+        Remember the progress of all started books, so that it can be restored afterwards."""
+        requests = []
+
+        for book in books:
+            if book.position == 0:
+                continue
 
             try:
-                book_model = Book(self._db, book)
-                progress = book_model.progress
+                progress = Book(self._db, book).progress
             except BookIsEmpty:
-                progress = 0
+                continue
 
-            self._delete_tracks_from_db(media_file)
-            tracks = self._get_track_list_for_db(media_file, book)
+            if progress > 0:
+                requests.append(BookUpdatePositionRequest(book.id, progress))
 
-            for track in tracks:
-                start_at = track.pop("startAt")
-                yield TrackInsertRequest(track, file, start_at)
+        return requests
 
-            update_position_request_present = any(b.book_id == book.id for b in self._book_update_positions)
-            if progress > 0 and not update_position_request_present:
-                self._book_update_positions.append(BookUpdatePositionRequest(book.id, progress))
+    @staticmethod
+    def _prepare_files_db_objects(
+        media_files: list[MediaFile], file_ids: dict[str, int]
+    ) -> list[dict]:
+        next_id = _get_next_id(File)
+        files = []
 
-    def _import_or_update_book(self, media_file):
-        if BookModel.select(BookModel.name).where(self._matches_db_book(media_file.book_name)).count() < 1:
-            book = self._create_book_db_object(media_file)
-        else:
-            book = self._update_book_db_object(media_file)
-        return book
+        for media_file in media_files:
+            file_id = file_ids.get(media_file.path)
+            if file_id is None:
+                file_id = file_ids[media_file.path] = next_id
+                next_id += 1
+
+            files.append({"id": file_id, "path": media_file.path, "modified": media_file.modified})
+
+        return files
+
+    def _prepare_book_db_objects(
+        self, media_files: list[MediaFile], books: dict[str, BookModel]
+    ) -> tuple[list[dict], dict[str, int], dict[str, bytes]]:
+        """The first media file of a book in the batch provides the book metadata.
+        Covers are returned separately, keyed by their hash."""
+        next_id = _get_next_id(BookModel)
+        book_rows = {}
+        covers = {}
 
-    def _matches_db_book(self, book_name: str) -> bool:
-        return fn.Lower(BookModel.name) == book_name.lower()
+        for media_file in media_files:
+            key = media_file.book_name.lower()
+            if key in book_rows:
+                continue
 
-    def _get_track_list_for_db(self, media_file: MediaFile, book: BookModel):
+            if book := books.get(key):
+                book_rows[key] = self._get_book_db_object(
+                    media_file, book.id, book.position, book.rating
+                )
+            else:
+                book_rows[key] = self._get_book_db_object(media_file, next_id, 0, -1)
+                next_id += 1
+
+            if cover_hash := book_rows[key]["cover_hash"]:
+                covers[cover_hash] = media_file.cover
+
+        book_ids = {key: row["id"] for key, row in book_rows.items()}
+        return list(book_rows.values()), book_ids, covers
+
+    @staticmethod
+    def _get_book_db_object(
+        media_file: MediaFile, book_id: int, position: int, rating: int
+    ) -> dict:
+        return {
+            "id": book_id,
+            "name": media_file.book_name,
+            "author": media_file.author,
+            "reader": media_file.reader,
+            "cover_hash": CoverStore.get_hash(media_file.cover),
+            "position": position,
+            "rating": rating,
+        }
+
+    def _prepare_track_db_objects(
+        self, media_files: list[MediaFile], file_ids: dict[str, int], book_ids: dict[str, int]
+    ) -> tuple[list[dict], list[dict]]:
+        next_id = _get_next_id(Track)
+        tracks = []
+        track_to_files = []
+
+        for media_file in media_files:
+            book_id = book_ids[media_file.book_name.lower()]
+
+            for track in self._get_track_list_for_db(media_file, book_id):
+                start_at = track.pop("startAt")
+                track["id"] = next_id
+                tracks.append(track)
+                track_to_files.append(
+                    {"track": next_id, "file": file_ids[media_file.path], "start_at": start_at}
+                )
+                next_id += 1
+
+        return tracks, track_to_files
+
+    def _get_track_list_for_db(self, media_file: MediaFile, book: BookModel | int):
         tracks = []
 
         for chapter in media_file.chapters:
             tracks.append({
                 "name": chapter.name,
+                "natural_sort_key": natural_sort_key(chapter.name),
                 "number": chapter.number,
                 "disk": media_file.disk,
                 "book": book,
@@ -135,57 +247,49 @@ class DatabaseImporter:
 
         return tracks
 
-    def _update_book_db_object(self, media_file: MediaFile) -> BookModel:
-        BookModel.update(name=media_file.book_name,
-                         author=media_file.author,
-                         reader=media_file.reader,
-                         cover=media_file.cover) \
-            .where(self._matches_db_book(media_file.book_name)) \
-            .execute()
-        return BookModel.select().where(self._matches_db_book(media_file.book_name)).get()
-
-    def _create_book_db_object(self, media_file: MediaFile) -> BookModel:
-        return BookModel.create(name=media_file.book_name,
-                                author=media_file.author,
-                                reader=media_file.reader,
-                                cover=media_file.cover,
-                                position=0,
-                                rating=-1)
-
-    def _get_track_db_objects_for_media_file(self, media_file: MediaFile) -> list[Track]:
-        all_track_mappings = TrackToFile.select().join(File).where(TrackToFile.file.path == media_file.path)
-
-        for item in all_track_mappings:
-            yield item.track
-
-    def _delete_tracks_from_db(self, media_file: MediaFile):
-        for track in self._get_track_db_objects_for_media_file(media_file):
-            track.delete_instance(recursive=True)
-
-    def _is_chapter_count_in_db_different(self, media_file: MediaFile) -> bool:
-        all_track_mappings = self._get_chapter_count_in_db(media_file)
-
-        return all_track_mappings != len(media_file.chapters)
-
-    def _get_chapter_count_in_db(self, media_file: MediaFile) -> int:
-        all_track_mappings = TrackToFile.select().join(File).where(TrackToFile.file.path == media_file.path)
-
-        return all_track_mappings.count()
-
-    def _insert_tracks(self, tracks: set[TrackInsertRequest]):
-        for track in tracks:
-            track_db = Track.insert(track.track_data).execute()
-            TrackToFile.create(track=track_db, file=track.file, start_at=track.start_at)
+    @staticmethod
+    def _upsert_files(files: list[dict]):
+        for chunk in _chunks(files, INSERT_CHUNK_SIZE):
+            File.insert_many(chunk) \
+                .on_conflict(conflict_target=[File.path], preserve=[File.modified]) \
+                .execute()
+
+    @staticmethod
+    def _upsert_books(books: list[dict]):
+        for chunk in _chunks(books, INSERT_CHUNK_SIZE):
+            BookModel.insert_many(chunk) \
+                .on_conflict(conflict_target=[BookModel.id],
+                             preserve=[BookModel.name, BookModel.author, BookModel.reader,
+                                       BookModel.cover_hash]) \
+                .execute()
+
+    @staticmethod
+    def _delete_tracks_from_db(track_ids: list[int]):
+        for chunk in _chunks(track_ids, QUERY_CHUNK_SIZE):
+            TrackToFile.delete().where(TrackToFile.track << chunk).execute()
+            Track.delete().where(Track.id << chunk).execute()
+
+    @staticmethod
+    def _insert_tracks(tracks: list[dict], track_to_files: list[dict]):
+        for chunk in _chunks(tracks, INSERT_CHUNK_SIZE):
+            Track.insert_many(chunk).execute()
+
+        for chunk in _chunks(track_to_files, INSERT_CHUNK_SIZE):
+            TrackToFile.insert_many(chunk) \
+                .on_conflict(conflict_target=[TrackToFile.track],
+                             preserve=[TrackToFile.file, TrackToFile.start_at]) \
+                .execute()
 
     def _update_book_positions(self):
-        for book_position in self._book_update_positions:
-            book = BookModel.get_or_none(book_position.book_id)
+        with batch(self._db):
+            for book_position in self._book_update_positions:
+                book = BookModel.get_or_none(book_position.book_id)
 
-            if not book:
-                log.error("Could not restore book position because book is not present")
-                continue
+                if not book:
+                    log.error("Could not restore book position because book is not present")
+                    continue
 
-            self._update_book_position(book, book_position.progress)
+                self._update_book_position(book, book_position.progress)
 
         self._book_update_positions = []
 
@@ -196,14 +300,9 @@ class DatabaseImporter:
             log.error("Could not restore book position because book is empty")
             return
 
-        completed_chapter_length = 0
-        for chapter in book_model.chapters:
-            old_position = progress
-            if completed_chapter_length + chapter.length > old_position:
-                chapter.position = chapter.start_position + (old_position - completed_chapter_length)
-                book_model.position = chapter.id
-                return
-            else:
-                completed_chapter_length += chapter.length
-
-        book_model.position = 0
+        if chapter_at := book_model.chapter_at(progress):
+            chapter, chapter_progress = chapter_at
+            chapter.position = chapter.start_position + chapter_progress
+            book_model.position = chapter.id
+        else:
+            book_model.position = 0
@@ -0,0 +1,142 @@
+import logging
+import os
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from peewee import fn
+
+from cozy.db.directory import Directory
+from cozy.db.file import File
+
+log = logging.getLogger("directory_index")
+
+
+class DirectoryIndex:
+    """Persisted per-directory modification times used to skip unchanged folders while scanning.
+
+    Adding, removing or renaming an entry changes the modification time of its parent directory.
+    A directory whose modification time and number of subdirectories are unchanged since the last
+    committed scan therefore contains the same files and only its known subdirectories need to be visited.
+
+    Editing a file in place does not change its directory, so the imported files of an unchanged
+    directory are still returned and compared with their modification time by the importer.
+    Directories with files that could not be imported are not stored, so that these files are
+    tried again on the next scan.
+    """
+
+    def __init__(self):
+        self._updates: dict[str, tuple[int, int]] = {}
+        self._visited: set[str] = set()
+        self._roots: list[str] = []
+
+    def walk(self, roots: Iterable[str], extensions: set[str]) -> Iterator[str]:
+        """Yields all files with one of the given extensions inside of directories that changed since
+        the last commit and the imported files of all other directories. Returns absolute paths."""
+        self._updates = {}
+        self._visited = set()
+        self._roots = [str(Path(root)) for root in roots]
+
+        index, children = self._load()
+        imported_files = self._load_imported_files()
+
+        stack = list(reversed(self._roots))
+        while stack:
+            directory = stack.pop()
+
+            try:
+                modified = os.stat(directory).st_mtime_ns
+            except OSError as e:
+                log.debug(e)
+                continue
+
+            self._visited.add(directory)
+            known_children = children.get(directory, [])
+
+            if index.get(directory) == (modified, len(known_children)):
+                yield from imported_files.get(directory, [])
+                stack.extend(known_children)
+                continue
+
+            subdirectories = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in extensions:
+                            yield entry.path
+            except OSError as e:
+                log.info("Could not read directory %s", directory)
+                log.debug(e)
+                continue
+
+            self._updates[directory] = (modified, len(subdirectories))
+            stack.extend(sorted(subdirectories, reverse=True))
+
+    def commit(self, failed_files: Iterable[str] = ()):
+        """Persists the state of the last walk except for the directories of the files that failed to import.
+        Call this only after all yielded files were imported."""
+        failed_directories = {os.path.dirname(path) for path in failed_files}
+        rows = [
+            {"path": path, "modified": modified, "child_count": child_count}
+            for path, (modified, child_count) in self._updates.items()
+            if path not in failed_directories
+        ]
+
+        if rows:
+            for index in range(0, len(rows), 500):
+                Directory.replace_many(rows[index:index + 500]).execute()
+
+        stale_ids = [
+            directory.id
+            for directory in Directory.select(Directory.id, Directory.path)
+            if directory.path not in self._visited and self._is_below_roots(directory.path)
+        ]
+        for index in range(0, len(stale_ids), 500):
+            Directory.delete().where(Directory.id << stale_ids[index:index + 500]).execute()
+
+        self._updates = {}
+        self._visited = set()
+
+    @staticmethod
+    def forget(path: str):
+        """Removes a directory and all of its subdirectories from the index,
+        so that the next scan visits them again."""
+        path = str(Path(path))
+        prefix = path.rstrip(os.sep) + os.sep
+
+        Directory.delete().where(
+            (Directory.path == path) | (fn.substr(Directory.path, 1, len(prefix)) == prefix)
+        ).execute()
+
+    @staticmethod
+    def clear():
+        Directory.delete().execute()
+
+    @staticmethod
+    def _load() -> tuple[dict[str, tuple[int, int]], dict[str, list[str]]]:
+        index = {}
+        children = defaultdict(list)
+
+        for path, modified, child_count in Directory.select(
+            Directory.path, Directory.modified, Directory.child_count
+        ).tuples():
+            index[path] = (modified, child_count)
+            children[os.path.dirname(path)].append(path)
+
+        return index, children
+
+    @staticmethod
+    def _load_imported_files() -> dict[str, list[str]]:
+        files = defaultdict(list)
+
+        for path, in File.select(File.path).tuples():
+            files[os.path.dirname(path)].append(path)
+
+        return files
+
+    def _is_below_roots(self, path: str) -> bool:
+        return any(
+            path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self._roots
+        )
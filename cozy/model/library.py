@@ -1,25 +1,142 @@
 import logging
+import os
 import re
+from collections import defaultdict
+from contextlib import contextmanager
 from typing import Optional
+from uuid import uuid4
 
 import inject
-from peewee import SqliteDatabase
+from gi.repository import GLib, Gst
+from peewee import SqliteDatabase, Value, fn
 
 from cozy.architecture.event_sender import EventSender
 from cozy.architecture.profiler import timing
 from cozy.db.book import Book as BookModel
 from cozy.db.file import File
+from cozy.db.model_base import batch, transaction
+from cozy.db.offline_cache import OfflineCache
+from cozy.db.track import Track as TrackModel
+from cozy.db.track_to_file import TrackToFile
 from cozy.model.book import Book, BookIsEmpty
 from cozy.model.chapter import Chapter
+from cozy.model.directory_index import DirectoryIndex
 from cozy.model.settings import Settings
+from cozy.model.track import select_tracks_with_files, track_sort_order
 
 log = logging.getLogger("ui")
 
+REBASE_CHUNK_SIZE = 500
+BOOK_QUERY_CHUNK_SIZE = 500
+
 
 def split_strings_to_set(set_to_split: set[str]) -> set[str]:
     return {entry.strip() for item in set_to_split for entry in re.split(",|;|/|&", item)}
 
 
+class ChapterRecord:
+    """Lightweight summary of a chapter. Lengths and positions are in nanoseconds like in `Track`."""
+
+    __slots__ = ("book_id", "file", "file_id", "id", "length", "start_position")
+
+    def __init__(
+        self, id: int, book_id: int, file_id: int, file: str | None, start_position: int, length: int
+    ):
+        self.id = id
+        self.book_id = book_id
+        self.file_id = file_id
+        self.file = file
+        self.start_position = start_position
+        self.length = length
+
+
+class ChapterIndex:
+    """All chapters of the library as `ChapterRecord`s, sorted like the chapters of a book.
+    It is loaded with two queries and full `Track` objects are only created on demand."""
+
+    def __init__(self, records: list[ChapterRecord]):
+        self._by_id: dict[int, ChapterRecord] = {}
+        self._by_book: dict[int, list[ChapterRecord]] = defaultdict(list)
+
+        for record in records:
+            self._by_id[record.id] = record
+            self._by_book[record.book_id].append(record)
+
+    @classmethod
+    def load(cls) -> "ChapterIndex":
+        files = dict(File.select(File.id, File.path).tuples())
+        query = (
+            TrackModel.select(
+                TrackModel.id, TrackModel.book, TrackToFile.file, TrackToFile.start_at, TrackModel.length
+            )
+            .join(TrackToFile, on=(TrackToFile.track == TrackModel.id))
+            .order_by(TrackModel.book, *track_sort_order())
+            .tuples()
+        )
+
+        return cls([
+            ChapterRecord(id, book_id, file_id, files.get(file_id), start_at, int(length * Gst.SECOND))
+            for id, book_id, file_id, start_at, length in query
+        ])
+
+    @property
+    def records(self) -> list[ChapterRecord]:
+        return list(self._by_id.values())
+
+    @property
+    def files(self) -> set[str]:
+        return {record.file for record in self._by_id.values() if record.file}
+
+    def for_book(self, book_id: int) -> list[ChapterRecord]:
+        return self._by_book.get(book_id, [])
+
+    def book_ids_for_files(self, files: set[str]) -> set[int]:
+        return {record.book_id for record in self._by_id.values() if record.file in files}
+
+    def remove(self, chapter_id: int):
+        record = self._by_id.pop(chapter_id, None)
+        if record:
+            self._by_book[record.book_id].remove(record)
+
+    def remove_many(self, chapter_ids: list[int]):
+        """Removes the chapters and rebuilds the chapter list of each affected book only once."""
+        removed_ids = set()
+        book_ids = set()
+
+        for chapter_id in chapter_ids:
+            if record := self._by_id.pop(chapter_id, None):
+                removed_ids.add(chapter_id)
+                book_ids.add(record.book_id)
+
+        for book_id in book_ids:
+            self._by_book[book_id] = [record for record in self._by_book[book_id] if record.id not in removed_ids]
+
+
+class ChangedBook:
+    """Summary of a book that was added or updated by an import. Unlike the `Book` objects,
+    which are only changed on the main thread, it can be used by the thread that imported the files."""
+
+    __slots__ = ("cover_hash", "first_file", "id", "name")
+
+    def __init__(self, book: BookModel, chapter_records: list[ChapterRecord]):
+        self.id = book.id
+        self.name = book.name
+        self.cover_hash = book.cover_hash
+        self.first_file = chapter_records[0].file
+
+
+class LibraryChanges:
+    """Books of the library that were added, updated or removed by an import."""
+
+    def __init__(self):
+        self.added: list[Book] = []
+        self.updated: list[Book] = []
+        self.removed: list[Book] = []
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+
 class Library(EventSender):
     _db = cache = inject.attr(SqliteDatabase)
     _settings: Settings = inject.attr(Settings)
@@ -27,6 +144,8 @@ class Library(EventSender):
     _books: list[Book] = []
     _chapters: set[Chapter] = set()
     _files: set[str] = set()
+    _chapter_index: ChapterIndex | None = None
+    _removed_chapter_ids: list[int] | None = None
 
     def __init__(self):
         super().__init__()
@@ -64,6 +183,13 @@ class Library(EventSender):
 
         return self._files
 
+    @property
+    def chapter_index(self) -> ChapterIndex:
+        if self._chapter_index is None:
+            self._chapter_index = ChapterIndex.load()
+
+        return self._chapter_index
+
     @property
     def last_played_book(self) -> Optional[Book]:
         if not self._settings.last_played_book:
@@ -91,33 +217,219 @@ class Library(EventSender):
 
         self._chapters = set()
         self._files = set()
+        self._chapter_index = None
+
+    def batch(self):
+        """Context manager that saves all model changes made by this thread inside of it
+        in a single transaction when it exits."""
+        return batch(self._db)
+
+    @contextmanager
+    def removing_chapters(self):
+        """Context manager for deleting many chapters at once. The chapter index is updated
+        a single time when it exits instead of once for every deleted chapter."""
+        self._removed_chapter_ids = []
+
+        try:
+            yield
+        finally:
+            chapter_ids, self._removed_chapter_ids = self._removed_chapter_ids, None
+            if self._chapter_index:
+                self._chapter_index.remove_many(chapter_ids)
+
+    @timing
+    def apply_changed_files(self, files: set[str]) -> list[ChangedBook]:
+        """Updates only the books that contained or now contain one of the given files
+        and emits the changes as `books-changed` instead of reloading the whole library.
+
+        The chapters and books are loaded from the database on the calling thread. The books
+        are changed on the main thread afterwards, because the UI reads them there.
+        Returns the books that were added or updated."""
+        chapter_index = ChapterIndex.load()
+
+        if self._books:
+            book_ids = chapter_index.book_ids_for_files(files)
+        else:
+            book_ids = {record.book_id for record in chapter_index.records}
+
+        book_db_objects = self._get_book_db_objects(book_ids)
+        GLib.MainContext.default().invoke_full(
+            GLib.PRIORITY_DEFAULT_IDLE, self._apply_changes, (files, chapter_index, book_db_objects)
+        )
+
+        return [
+            ChangedBook(book_db_obj, records)
+            for book_id, book_db_obj in book_db_objects.items()
+            if (records := chapter_index.for_book(book_id))
+        ]
+
+    def _apply_changes(self, data: tuple[set[str], ChapterIndex, dict[int, BookModel]]):
+        files, chapter_index, book_db_objects = data
+        changes = LibraryChanges()
+
+        if not self._books:
+            self.invalidate()
+            self._chapter_index = chapter_index
+            changes.added = list(self.books)
+            if changes:
+                self.emit_event("books-changed", changes)
+            return
+
+        old_book_ids = self.chapter_index.book_ids_for_files(files)
+        self._chapter_index = chapter_index
+        self._files = set()
+
+        books = {book.id: book for book in self._books}
+
+        for book_id in sorted(old_book_ids | book_db_objects.keys()):
+            book = books.get(book_id)
+            book_db_obj = book_db_objects.get(book_id)
+            records = chapter_index.for_book(book_id) if book_db_obj else []
+
+            if book:
+                if self._chapters:
+                    self._chapters.difference_update(book.chapters)
+
+                if records:
+                    book.reload(book_db_obj, records)
+                    changes.updated.append(book)
+                else:
+                    self._books.remove(book)
+                    book.destroy_listeners()
+                    changes.removed.append(book)
+            elif records:
+                book = Book(self._db, book_db_obj, records)
+                book.add_listener(self._on_book_event)
+                self._books.append(book)
+                changes.added.append(book)
+
+            if book and records and self._chapters:
+                for chapter in book.chapters:
+                    chapter.add_listener(self._on_chapter_event)
+                    self._chapters.add(chapter)
+
+        if changes:
+            self.emit_event("books-changed", changes)
+
+    @staticmethod
+    def _get_book_db_objects(book_ids: set[int]) -> dict[int, BookModel]:
+        book_ids = sorted(book_ids)
+        book_db_objects = {}
+
+        for index in range(0, len(book_ids), BOOK_QUERY_CHUNK_SIZE):
+            chunk = book_ids[index:index + BOOK_QUERY_CHUNK_SIZE]
+            book_db_objects.update((book.id, book) for book in BookModel.select().where(BookModel.id << chunk))
+
+        return book_db_objects
 
     @timing
     def rebase_path(self, old_path: str, new_path: str):
+        """Replaces the path prefix of all files below `old_path` with set-based updates
+        in a single transaction. Files whose new path is already in the database are merged into
+        the existing file. Afterwards, only the affected books are reloaded."""
         self.emit_event_main_thread("rebase-started")
 
-        chapter_count = len(self.chapters)
-        for progress, chapter in enumerate(self.chapters, 1):
-            if chapter.file.startswith(old_path):
-                chapter.file = chapter.file.replace(old_path, new_path)
-                self.emit_event_main_thread("rebase-progress", progress / chapter_count)
-
+        old_path = old_path.rstrip(os.sep)
+        new_path = new_path.rstrip(os.sep)
+        old_prefix = old_path + os.sep
+
+        files = dict(
+            File.select(File.id, File.path)
+            .where((File.path == old_path) | (fn.substr(File.path, 1, len(old_prefix)) == old_prefix))
+            .tuples()
+        )
+        new_paths = {file_id: new_path + path[len(old_path):] for file_id, path in files.items()}
+        merged_files = self._get_existing_files(new_paths, exclude=files.keys())
+        renamed_files = [file_id for file_id in files if file_id not in merged_files]
+        # If the new path is below the old one, a file can get the current path of another one
+        nested = not set(files.values()).isdisjoint(new_paths[file_id] for file_id in renamed_files)
+
+        with transaction(self._db):
+            self._merge_files(merged_files)
+
+            if nested:
+                # Move the files out of the way first, so that no new path is taken while they are updated
+                temp_prefix = f"rebase-{uuid4().hex}:"
+                self._update_paths(renamed_files, Value(temp_prefix).concat(File.path))
+                old_path = temp_prefix + old_path
+
+            new_path_expression = Value(new_path).concat(fn.substr(File.path, len(old_path) + 1))
+            self._update_paths(renamed_files, new_path_expression, emit_progress=True)
+
+        self.apply_changed_files(set(files.values()) | set(new_paths.values()))
         self.emit_event_main_thread("rebase-finished")
 
+    @staticmethod
+    def _merge_files(merged_files: dict[int, int]):
+        """Moves the chapters and offline copies of the files to the existing files with the same path
+        and deletes them. Offline copies are dropped if the existing file already has one."""
+        existing_file_ids = list(merged_files.values())
+        cached_file_ids = set()
+        for index in range(0, len(existing_file_ids), REBASE_CHUNK_SIZE):
+            chunk = existing_file_ids[index:index + REBASE_CHUNK_SIZE]
+            query = OfflineCache.select(OfflineCache.original_file).where(OfflineCache.original_file << chunk)
+            cached_file_ids.update(file_id for file_id, in query.tuples())
+
+        for file_id, existing_file_id in merged_files.items():
+            TrackToFile.update(file=existing_file_id).where(TrackToFile.file == file_id).execute()
+
+            if existing_file_id in cached_file_ids:
+                OfflineCache.delete().where(OfflineCache.original_file == file_id).execute()
+            else:
+                OfflineCache.update(original_file=existing_file_id).where(OfflineCache.original_file == file_id).execute()
+
+        merged_file_ids = list(merged_files)
+        for index in range(0, len(merged_file_ids), REBASE_CHUNK_SIZE):
+            chunk = merged_file_ids[index:index + REBASE_CHUNK_SIZE]
+            File.delete().where(File.id << chunk).execute()
+
+    def _update_paths(self, file_ids: list[int], path_expression, emit_progress: bool = False):
+        for index in range(0, len(file_ids), REBASE_CHUNK_SIZE):
+            chunk = file_ids[index:index + REBASE_CHUNK_SIZE]
+            File.update(path=path_expression).where(File.id << chunk).execute()
+
+            if emit_progress:
+                self.emit_event_main_thread("rebase-progress", (index + len(chunk)) / len(file_ids))
+
+    @staticmethod
+    def _get_existing_files(new_paths: dict[int, str], exclude) -> dict[int, int]:
+        """Returns the ids of already existing files for the new paths, keyed by the old file id."""
+        paths = list(new_paths.values())
+        existing_files = {}
+
+        for index in range(0, len(paths), REBASE_CHUNK_SIZE):
+            chunk = paths[index:index + REBASE_CHUNK_SIZE]
+            existing_files.update(File.select(File.path, File.id).where(File.path << chunk).tuples())
+
+        return {
+            file_id: existing_files[path]
+            for file_id, path in new_paths.items()
+            if path in existing_files and existing_files[path] not in exclude
+        }
+
     @staticmethod
     def reset_modified_date_for_all():
         File.update(modified=0).execute()
+        DirectoryIndex.clear()
 
+    @timing
     def _load_all_books(self):
         for book_db_obj in BookModel.select():
             try:
-                book = Book(self._db, book_db_obj)
+                book = Book(self._db, book_db_obj, self.chapter_index.for_book(book_db_obj.id))
                 book.add_listener(self._on_book_event)
                 self._books.append(book)
             except BookIsEmpty:
                 pass
 
     def _load_all_chapters(self):
+        tracks = defaultdict(list)
+        for track in select_tracks_with_files().order_by(TrackModel.book, *track_sort_order()):
+            tracks[track.book_id].append(track)
+
+        for book in self.books:
+            book.prefetch_chapters(tracks.get(book.id, []))
+
         self._chapters = {chapter
                           for book_chapters
                           in [book.chapters for book in self.books]
@@ -128,12 +440,15 @@ class Library(EventSender):
             chapter.add_listener(self._on_chapter_event)
 
     def _load_all_files(self):
-        self._files = {chapter.file
-                       for chapter
-                       in self.chapters}
+        self._files = self.chapter_index.files
 
     def _on_chapter_event(self, event: str, chapter: Chapter):
         if event == "chapter-deleted":
+            if self._removed_chapter_ids is not None:
+                self._removed_chapter_ids.append(chapter.id)
+            elif self._chapter_index:
+                self._chapter_index.remove(chapter.id)
+
             try:
                 self.chapters.remove(chapter)
             except KeyError:
@@ -0,0 +1,48 @@
+import logging
+import threading
+import time
+
+from peewee import DatabaseError
+from playhouse.sqliteq import ResultTimeout, WriterPaused
+
+from cozy.model.chapter import Chapter
+
+log = logging.getLogger("position_store")
+
+
+class PositionStore:
+    """Keeps the playback position in memory and writes it to the database
+    at most once per interval. Pending positions are written on `flush`."""
+
+    def __init__(self, interval: float):
+        self._interval: float = interval
+        self._chapter: Chapter | None = None
+        self._last_save: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, chapter: Chapter, position: int):
+        with self._lock:
+            if self._chapter is not None and self._chapter is not chapter:
+                self._save()
+
+            chapter.update_position(position)
+            self._chapter = chapter
+
+            if time.monotonic() - self._last_save >= self._interval:
+                self._save()
+
+    def flush(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if self._chapter is None:
+            return
+
+        try:
+            self._chapter.save_position()
+        except (DatabaseError, ResultTimeout, WriterPaused) as e:
+            log.warning("Could not save position: %s", e)
+
+        self._chapter = None
+        self._last_save = time.monotonic()
@@ -2,6 +2,7 @@ from pathlib import Path
 
 from peewee import SqliteDatabase
 
+from cozy.db.model_base import save_dirty_fields
 from cozy.db.storage import Storage as StorageModel
 
 
@@ -38,7 +39,7 @@ class Storage:
             raise InvalidPath
 
         self._db_object.path = path
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def location_type(self):
@@ -47,7 +48,7 @@ class Storage:
     @location_type.setter
     def location_type(self, new_location_type: int):
         self._db_object.location_type = new_location_type
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def default(self):
@@ -56,7 +57,7 @@ class Storage:
     @default.setter
     def default(self, new_default: bool):
         self._db_object.default = new_default
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def external(self):
@@ -65,7 +66,7 @@ class Storage:
     @external.setter
     def external(self, new_external: bool):
         self._db_object.external = new_external
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     def delete(self):
         self._db_object.delete_instance(recursive=True, delete_nullable=False)
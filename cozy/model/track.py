@@ -1,9 +1,11 @@
 import logging
 
 from gi.repository import Gst
-from peewee import DoesNotExist, SqliteDatabase
+from peewee import JOIN, DoesNotExist, ModelSelect, SqliteDatabase
 
+from cozy.db.collation import collate_natural, natural_sort_key
 from cozy.db.file import File
+from cozy.db.model_base import WritePriority, save_dirty_fields, write_priority
 from cozy.db.track import Track as TrackModel
 from cozy.db.track_to_file import TrackToFile
 from cozy.model.chapter import Chapter
@@ -15,15 +17,43 @@ class TrackInconsistentData(Exception):
     pass
 
 
+def select_tracks_with_files() -> ModelSelect:
+    """Selects tracks together with their TrackToFile and File objects in a single query.
+    The TrackToFile object of each track is available as `prefetched_track_to_file`."""
+    return (
+        TrackModel.select(TrackModel, TrackToFile, File)
+        .join(TrackToFile, JOIN.LEFT_OUTER, on=(TrackToFile.track == TrackModel.id),
+              attr="prefetched_track_to_file")
+        .join(File, JOIN.LEFT_OUTER, on=(TrackToFile.file == File.id), attr="file")
+    )
+
+
+def track_sort_order() -> tuple:
+    """The natural sort key of the name is precomputed when importing.
+    The Python collation is only consulted for tracks with equal keys."""
+    return (
+        TrackModel.disk,
+        TrackModel.number,
+        TrackModel.natural_sort_key,
+        collate_natural.collation(TrackModel.name),
+    )
+
+
 class Track(Chapter):
-    def __init__(self, db: SqliteDatabase, track: TrackModel):
+    def __init__(self, db: SqliteDatabase, track: TrackModel, prefetched: bool = False):
         super().__init__()
         self._db: SqliteDatabase = db
         self.id: int = track.id
 
         self._db_object: TrackModel = track
         try:
-            self._track_to_file_db_object: TrackToFile = track.track_to_file.get()
+            if prefetched:
+                # peewee 3 does not set the attribute at all if the outer join has no match
+                self._track_to_file_db_object: TrackToFile = getattr(track, "prefetched_track_to_file", None)
+                if not self._track_to_file_db_object:
+                    raise DoesNotExist
+            else:
+                self._track_to_file_db_object: TrackToFile = track.track_to_file.get()
         except DoesNotExist:
             log.error("Inconsistent DB, TrackToFile object is missing. Deleting this track.")
             self._db_object.delete_instance(recursive=True, delete_nullable=False)
@@ -39,7 +69,8 @@ class Track(Chapter):
     @name.setter
     def name(self, new_name: str):
         self._db_object.name = new_name
-        self._db_object.save(only=self._db_object.dirty_fields)
+        self._db_object.natural_sort_key = natural_sort_key(new_name)
+        save_dirty_fields(self._db_object)
 
     @property
     def number(self):
@@ -48,7 +79,7 @@ class Track(Chapter):
     @number.setter
     def number(self, new_number: int):
         self._db_object.number = new_number
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def disk(self):
@@ -57,7 +88,7 @@ class Track(Chapter):
     @disk.setter
     def disk(self, new_disk: int):
         self._db_object.disk = new_disk
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
 
     @property
     def position(self):
@@ -65,8 +96,16 @@ class Track(Chapter):
 
     @position.setter
     def position(self, new_position: int):
+        self.update_position(new_position)
+        self.save_position()
+
+    def update_position(self, new_position: int):
         self._db_object.position = new_position
-        self._db_object.save(only=self._db_object.dirty_fields)
+
+    def save_position(self):
+        if self._db_object.dirty_fields:
+            with write_priority(WritePriority.HIGH):
+                save_dirty_fields(self._db_object)
 
     @property
     def start_position(self) -> int:
@@ -100,7 +139,8 @@ class Track(Chapter):
     @length.setter
     def length(self, new_length: float):
         self._db_object.length = new_length / Gst.SECOND
-        self._db_object.save(only=self._db_object.dirty_fields)
+        save_dirty_fields(self._db_object)
+        self.emit_event("chapter-length-changed", self)
 
     @property
     def modified(self):
@@ -110,7 +150,7 @@ class Track(Chapter):
     def modified(self, new_modified: int):
         file = self._track_to_file_db_object.file
         file.modified = new_modified
-        file.save(only=file.dirty_fields)
+        save_dirty_fields(file)
 
     def delete(self):
         file_id = self.file_id
@@ -133,4 +173,4 @@ class Track(Chapter):
     def _create_new_file(self, new_file: str):
         file = self._track_to_file_db_object.file
         file.path = new_file
-        file.save(only=file.dirty_fields)
+        save_dirty_fields(file)
@@ -133,3 +133,27 @@ class ApplicationSettings(EventSender):
     @window_maximize.setter
     def window_maximize(self, new_value: bool):
         self._settings.set_boolean("window-maximize", new_value)
+
+    @property
+    def import_workers(self) -> int:
+        return self._settings.get_int("import-workers")
+
+    @import_workers.setter
+    def import_workers(self, new_value: int):
+        self._settings.set_int("import-workers", new_value)
+
+    @property
+    def pregenerate_thumbnails(self) -> bool:
+        return self._settings.get_boolean("pregenerate-thumbnails")
+
+    @property
+    def thumbnail_format(self) -> str:
+        return self._settings.get_string("thumbnail-format")
+
+    @property
+    def thumbnail_quality(self) -> int:
+        return self._settings.get_int("thumbnail-quality")
+
+    @property
+    def position_save_interval(self) -> int:
+        return self._settings.get_int("position-save-interval")
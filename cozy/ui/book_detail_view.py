@@ -4,7 +4,7 @@ from threading import Event, Thread
 from typing import Callable, Final
 
 import inject
-from gi.repository import Adw, Gio, GLib, GObject, Gtk
+from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
 
 from cozy.control.artwork_cache import ArtworkCache
 from cozy.model.book import Book
@@ -284,11 +284,16 @@ class BookDetailView(Adw.NavigationPage):
             self.available_offline_action.handler_unblock_by_func(self._download_switch_changed)
 
     def _set_cover_image(self, book: Book):
-
-        paintable = self._artwork_cache.get_cover_paintable(
-            book, self.get_scale_factor(), ALBUM_ART_SIZE
+        self.album_art_container.set_visible_child(self.fallback_icon)
+        self._artwork_cache.get_cover_paintable_async(
+            book, self.get_scale_factor(), ALBUM_ART_SIZE,
+            lambda paintable: self._on_cover_loaded(book, paintable)
         )
 
+    def _on_cover_loaded(self, book: Book, paintable: Gdk.Texture | None):
+        if book is not self._view_model.book:
+            return
+
         if paintable:
             self.album_art.set_paintable(paintable)
             self.album_art.set_overflow(True)
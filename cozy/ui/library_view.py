@@ -71,6 +71,7 @@ class LibraryView:
         self._view_model.bind_to("current_book_in_playback", self._current_book_in_playback)
         self._view_model.bind_to("playing", self._playing)
         self._view_model.bind_to("book-progress", self._on_book_progress_changed)
+        self._view_model.add_listener(self._on_view_model_event)
 
     def _on_sort_stack_changed(self, widget, _):
         page = widget.props.visible_child_name
@@ -91,10 +92,36 @@ class LibraryView:
             self._book_box.remove(child)
 
         for book in self._view_model.books:
-            book_card = BookCard(book)
-            book_card.connect("play-pause-clicked", self._play_book_clicked)
-            book_card.connect("open-book-overview", self._open_book_overview_clicked)
-            self._book_box.append(book_card)
+            self._add_book_card(book)
+
+    def _add_book_card(self, book):
+        book_card = BookCard(book)
+        book_card.connect("play-pause-clicked", self._play_book_clicked)
+        book_card.connect("open-book-overview", self._open_book_overview_clicked)
+        self._book_box.append(book_card)
+
+    def _remove_book_card(self, book):
+        index = 0
+        while book_card := self._book_box.get_child_at_index(index):
+            if book_card.book is book:
+                book_card.disconnect_book()
+                self._book_box.remove(book_card)
+                return
+            index += 1
+
+    def _on_view_model_event(self, event: str, book):
+        if event == "book-added":
+            self._add_book_card(book)
+        elif event == "book-updated":
+            self._remove_book_card(book)
+            self._add_book_card(book)
+        elif event == "book-removed":
+            self._remove_book_card(book)
+        else:
+            return
+
+        self._current_book_in_playback()
+        self._playing()
 
     def populate_author(self):
         self._author_box.populate(self._view_model.authors)
@@ -325,6 +325,7 @@ class CozyUI(EventSender, metaclass=Singleton):
         self.fs_monitor.close()
         self._save_window_size()
         self._player.destroy()
+        self._importer.close()
         close_db()
         report.close()
         log.info("Saving settings.")
@@ -95,9 +95,15 @@ class MediaController(Adw.BreakpointBin):
         self.cover_img.set_cursor(Gdk.Cursor.new_from_name("pointer"))
 
     def _set_cover_image(self, book: Book):
-        paintable = self._artwork_cache.get_cover_paintable(
-            book, self.get_scale_factor(), COVER_SIZE
+        self._artwork_cache.get_cover_paintable_async(
+            book, self.get_scale_factor(), COVER_SIZE,
+            lambda paintable: self._on_cover_loaded(book, paintable)
         )
+
+    def _on_cover_loaded(self, book: Book, paintable: Gdk.Texture | None):
+        if book is not self._playback_control_view_model.book:
+            return
+
         if paintable:
             self.cover_img.set_from_paintable(paintable)
         else:
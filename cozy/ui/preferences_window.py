@@ -1,6 +1,7 @@
 import inject
-from gi.repository import Adw, Gio, Gtk
+from gi.repository import Adw, Gio, GLib, Gtk
 
+from cozy.db.maintenance import DatabaseStats
 from cozy.ui.widgets.error_reporting import ErrorReporting
 from cozy.ui.widgets.storages import StorageLocations
 from cozy.view_model.settings_view_model import SettingsViewModel
@@ -20,6 +21,9 @@ class PreferencesWindow(Adw.PreferencesDialog):
     replay_switch: Adw.SwitchRow = Gtk.Template.Child()
     artwork_prefer_external_switch: Adw.SwitchRow = Gtk.Template.Child()
 
+    database_size_row: Adw.ActionRow = Gtk.Template.Child()
+    database_fragmentation_row: Adw.ActionRow = Gtk.Template.Child()
+
     rewind_duration_adjustment: Gtk.Adjustment = Gtk.Template.Child()
     forward_duration_adjustment: Gtk.Adjustment = Gtk.Template.Child()
 
@@ -34,6 +38,7 @@ class PreferencesWindow(Adw.PreferencesDialog):
 
         self._view_model.bind_to("lock_ui", self._on_lock_ui_changed)
         self._bind_settings()
+        self._view_model.load_database_stats(self._show_database_stats)
 
     def _bind_settings(self) -> None:
         bind_settings = lambda setting, widget, property: self._glib_settings.bind(
@@ -46,6 +51,12 @@ class PreferencesWindow(Adw.PreferencesDialog):
         bind_settings("forward-duration", self.forward_duration_adjustment, "value")
         bind_settings("prefer-external-cover", self.artwork_prefer_external_switch, "active")
 
+    def _show_database_stats(self, stats: DatabaseStats) -> None:
+        self.database_size_row.set_subtitle(GLib.format_size(stats.size))
+        self.database_fragmentation_row.set_subtitle(
+            _("{percent} % unused").format(percent=round(stats.fragmentation * 100))
+        )
+
     def _on_lock_ui_changed(self) -> None:
         self.storage_locations_view.set_sensitive(not self._view_model.lock_ui)
 
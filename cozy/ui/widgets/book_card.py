@@ -84,18 +84,12 @@ class BookCard(Gtk.FlowBoxChild):
         self.title = book.name
         self.author = book.author
 
-        paintable = self.artwork_cache.get_cover_paintable(
-            book, self.get_scale_factor(), ALBUM_ART_SIZE
+        self.fallback_icon.set_from_icon_name("cozy.book-open-symbolic")
+        self.stack.set_visible_child(self.fallback_icon)
+        self.artwork_cache.get_cover_paintable_async(
+            book, self.get_scale_factor(), ALBUM_ART_SIZE, self._set_cover_paintable
         )
 
-        if paintable:
-            self.artwork.set_paintable(paintable)
-            self.artwork.set_size_request(ALBUM_ART_SIZE, ALBUM_ART_SIZE)
-            self.stack.set_visible_child(self.artwork)
-        else:
-            self.fallback_icon.set_from_icon_name("cozy.book-open-symbolic")
-            self.stack.set_visible_child(self.fallback_icon)
-
         self.menu_button.connect("notify::active", self._on_leave)
         self.set_cursor(Gdk.Cursor.new_from_name("pointer"))
 
@@ -105,6 +99,12 @@ class BookCard(Gtk.FlowBoxChild):
 
         self._setup_menu()
 
+    def _set_cover_paintable(self, paintable: Gdk.Texture | None):
+        if paintable:
+            self.artwork.set_paintable(paintable)
+            self.artwork.set_size_request(ALBUM_ART_SIZE, ALBUM_ART_SIZE)
+            self.stack.set_visible_child(self.artwork)
+
     def _setup_menu(self):
         remove_recents_item = Gio.MenuItem.new(_("Remove from Recents"))
         open_in_files_item = Gio.MenuItem.new(_("Open in Files"))
@@ -174,6 +174,10 @@ class BookCard(Gtk.FlowBoxChild):
         if device and device.get_source() == Gdk.InputSource.TOUCHSCREEN:
             self.menu_button.emit("activate")
 
+    def disconnect_book(self) -> None:
+        """Stops following the changes of the book. Call it before the card is removed."""
+        self.book.remove_bind("position", self._on_position_updated)
+
     def update_progress(self):
         if self.book.duration:
             self.play_button.progress = self.book.progress / self.book.duration
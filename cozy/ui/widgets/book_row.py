@@ -1,7 +1,7 @@
 from typing import Callable
 
 import inject
-from gi.repository import Adw, Gtk
+from gi.repository import Adw, Gdk, Gtk
 
 from cozy.control.artwork_cache import ArtworkCache
 from cozy.model.book import Book
@@ -24,22 +24,28 @@ class BookRow(Adw.ActionRow):
             self.set_activatable(True)
             self.set_tooltip_text(_("Play this book"))
 
-        paintable = self._artwork_cache.get_cover_paintable(
-            book, self.get_scale_factor(), BOOK_ICON_SIZE
+        fallback_icon = Gtk.Image.new_from_icon_name("cozy.book-open-symbolic")
+        fallback_icon.set_pixel_size(BOOK_ICON_SIZE)
+
+        self._clamp = Adw.Clamp(maximum_size=BOOK_ICON_SIZE)
+        self._set_album_art(fallback_icon)
+        self.add_prefix(self._clamp)
+
+        self._artwork_cache.get_cover_paintable_async(
+            book, self.get_scale_factor(), BOOK_ICON_SIZE, self._set_cover_paintable
         )
-        if paintable:
-            album_art = Gtk.Picture.new_for_paintable(paintable)
-            album_art.add_css_class("round-6")
-            album_art.set_overflow(True)
-        else:
-            album_art = Gtk.Image.new_from_icon_name("cozy.book-open-symbolic")
-            album_art.set_pixel_size(BOOK_ICON_SIZE)
 
+    def _set_cover_paintable(self, paintable: Gdk.Texture | None) -> None:
+        if not paintable:
+            return
+
+        album_art = Gtk.Picture.new_for_paintable(paintable)
+        album_art.add_css_class("round-6")
+        album_art.set_overflow(True)
+        self._set_album_art(album_art)
+
+    def _set_album_art(self, album_art: Gtk.Widget) -> None:
         album_art.set_size_request(BOOK_ICON_SIZE, BOOK_ICON_SIZE)
         album_art.set_margin_top(6)
         album_art.set_margin_bottom(6)
-
-        clamp = Adw.Clamp(maximum_size=BOOK_ICON_SIZE)
-        clamp.set_child(album_art)
-
-        self.add_prefix(clamp)
+        self._clamp.set_child(album_art)
@@ -8,6 +8,7 @@ from gi.repository import Gio, Gtk
 
 from cozy.architecture.event_sender import EventSender
 from cozy.architecture.observable import Observable
+from cozy.control.artwork_cache import ArtworkCache
 from cozy.control.filesystem_monitor import FilesystemMonitor
 from cozy.enums import OpenView
 from cozy.media.importer import Importer, ScanStatus
@@ -32,6 +33,7 @@ class LibraryViewMode(Enum):
 
 class LibraryViewModel(Observable, EventSender):
     _application_settings: ApplicationSettings = inject.attr(ApplicationSettings)
+    _artwork_cache: ArtworkCache = inject.attr(ArtworkCache)
     _fs_monitor: FilesystemMonitor = inject.attr("FilesystemMonitor")
     _model = inject.attr(Library)
     _importer: Importer = inject.attr(Importer)
@@ -209,7 +211,6 @@ class LibraryViewModel(Observable, EventSender):
         if event == "scan" and message == ScanStatus.SUCCESS:
             self._notify("authors")
             self._notify("readers")
-            self._notify("books")
             self._notify("books-filter")
             self._notify("library_view_mode")
         elif event == "import-failed":
@@ -246,6 +247,15 @@ class LibraryViewModel(Observable, EventSender):
     def _on_model_event(self, event: str, message):
         if event == "rebase-finished":
             self.emit_event("work-done")
+        elif event == "books-changed":
+            self._artwork_cache.invalidate_books(message.removed + message.updated)
+
+            for book in message.removed:
+                self.emit_event("book-removed", book)
+            for book in message.updated:
+                self.emit_event("book-updated", book)
+            for book in message.added:
+                self.emit_event("book-added", book)
 
     def open_book_detail(self, book: Book):
         self.emit_event(OpenView.BOOK, book)
@@ -1,9 +1,15 @@
 import logging
+import sqlite3
+from collections.abc import Callable
+from threading import Thread
 
 import inject
+from gi.repository import GLib
+from peewee import SqliteDatabase
 
 from cozy.architecture.event_sender import EventSender
 from cozy.architecture.observable import Observable
+from cozy.db.maintenance import DatabaseStats, get_database_stats
 from cozy.media.importer import Importer
 from cozy.model.settings import Settings
 from cozy.settings import ApplicationSettings
@@ -15,6 +21,7 @@ class SettingsViewModel(Observable, EventSender):
     _importer: Importer = inject.attr(Importer)
     _model: Settings = inject.attr(Settings)
     _app_settings: ApplicationSettings = inject.attr(ApplicationSettings)
+    _db: SqliteDatabase = inject.attr(SqliteDatabase)
 
     def __init__(self):
         super().__init__()
@@ -30,3 +37,16 @@ class SettingsViewModel(Observable, EventSender):
     def lock_ui(self, new_value: bool):
         self._lock_ui = new_value
         self._notify("lock_ui")
+
+    def load_database_stats(self, callback: Callable[[DatabaseStats], None]):
+        """Reads the database stats on a background thread and calls callback with them on the main thread."""
+        Thread(target=self._load_database_stats, args=(callback,), name="DatabaseStatsThread", daemon=True).start()
+
+    def _load_database_stats(self, callback: Callable[[DatabaseStats], None]):
+        try:
+            stats = get_database_stats(self._db)
+        except (sqlite3.Error, OSError) as e:
+            log.warning("Could not read the database stats: %s", e)
+            return
+
+        GLib.MainContext.default().invoke_full(GLib.PRIORITY_DEFAULT_IDLE, callback, stats)
@@ -9,6 +9,7 @@ from cozy.architecture.event_sender import EventSender
 from cozy.architecture.observable import Observable
 from cozy.control.filesystem_monitor import FilesystemMonitor
 from cozy.media.importer import Importer
+from cozy.model.directory_index import DirectoryIndex
 from cozy.model.library import Library
 from cozy.model.settings import Settings
 from cozy.model.storage import Storage
@@ -64,6 +65,7 @@ class StoragesViewModel(Observable, EventSender):
         old_path = model.path
         model.path = new_path
         model.external = self._fs_monitor.is_external(new_path)
+        DirectoryIndex.forget(old_path)
 
         self._rebase_storage_location(model, old_path)
         self._notify("storage_attributes")
@@ -96,10 +98,12 @@ class StoragesViewModel(Observable, EventSender):
         for book in self._library.books:
             chapters_to_remove.extend([c for c in book.chapters if c.file.startswith(storage_path)])
 
-        for chapter in set(chapters_to_remove):
-            chapter.delete()
+        with self._library.removing_chapters():
+            for chapter in set(chapters_to_remove):
+                chapter.delete()
 
         model.delete()
+        DirectoryIndex.forget(storage_path)
         self._model.invalidate()
 
         self.emit_event("storage-removed", model)
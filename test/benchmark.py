@@ -0,0 +1,250 @@
+"""Benchmarks for the import, library loading, chapter and thumbnail code paths.
+
+The datasets are generated, so the numbers are only comparable between
+code versions on the same machine. Run them from the repository root:
+
+    python -m test.benchmark
+    python -m test.benchmark library --books 2000 --chapters 25
+"""
+import argparse
+import gettext
+import io
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('Gdk', '4.0')
+gi.require_version('Adw', '1')
+gi.require_version('Gst', '1.0')
+gi.require_version('GstPbutils', '1.0')
+
+import inject
+from peewee import SqliteDatabase
+from PIL import Image, ImageDraw
+
+from cozy.control.thumbnails import THUMBNAIL_FORMATS, ThumbnailFormat
+from cozy.db.book import Book as BookModel
+from cozy.db.collation import collate_natural, natural_sort_key
+from cozy.db.file import File
+from cozy.db.model_base import CozyQueueDatabase, transaction
+from cozy.db.settings import Settings as SettingsModel
+from cozy.db.track import Track
+from cozy.db.track_to_file import TrackToFile
+from cozy.media.chapter import Chapter
+from cozy.media.media_file import MediaFile
+from cozy.model.settings import Settings
+from cozy.settings import ApplicationSettings
+from test.conftest import chunks, get_models
+from test.cozy.mocks import ApplicationSettingsMock
+
+INSERT_CHUNK_SIZE = 100
+
+
+@contextmanager
+def temporary_database():
+    """A database file behind the write queue of Cozy, like the one the application uses."""
+    models = get_models()
+    previous_db = models[0]._meta.database
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = CozyQueueDatabase(os.path.join(directory, "cozy.db"), pragmas=[("journal_mode", "wal")])
+        db.bind(models, bind_refs=False, bind_backrefs=False)
+        db.register_collation(collate_natural)
+        db.create_tables(models)
+        SettingsModel.create(path="")
+
+        inject.clear_and_configure(lambda binder: binder.bind(SqliteDatabase, db)
+                                   .bind_to_constructor(Settings, Settings)
+                                   .bind_to_constructor(ApplicationSettings, ApplicationSettingsMock))
+        try:
+            yield db
+        finally:
+            inject.clear()
+            db.stop()
+            db.close()
+            previous_db.bind(models, bind_refs=False, bind_backrefs=False)
+
+
+def generate_library(db, books: int, chapters: int, chapter_names=None):
+    """Inserts books with one file per chapter. The chapter names default to "Chapter <number>"."""
+    book_rows, track_rows, file_rows, track_to_file_rows = [], [], [], []
+
+    for book_id in range(1, books + 1):
+        book_rows.append({"id": book_id, "name": f"Book {book_id}", "author": f"Author {book_id % 100}",
+                          "reader": f"Reader {book_id % 50}", "position": 0, "rating": 0})
+
+        names = chapter_names or [f"Chapter {number}" for number in range(chapters)]
+        for number, name in enumerate(names):
+            track_id = len(track_rows) + 1
+            track_rows.append({"id": track_id, "name": name, "number": 0 if chapter_names else number, "disk": 1,
+                               "position": 0, "book": book_id, "length": 600.0,
+                               "natural_sort_key": natural_sort_key(name)})
+            file_rows.append({"id": track_id, "path": f"/audiobooks/{book_id}/{number}.mp3", "modified": 1})
+            track_to_file_rows.append({"track": track_id, "file": track_id, "start_at": 0})
+
+    with transaction(db):
+        for model, rows in ((BookModel, book_rows), (Track, track_rows), (File, file_rows),
+                            (TrackToFile, track_to_file_rows)):
+            for chunk in chunks(rows, INSERT_CHUNK_SIZE):
+                model.insert_many(chunk).execute()
+
+
+def generate_media_files(files: int, chapters: int) -> list[MediaFile]:
+    """Single chapter files like the discovery returns them, `chapters` files per book."""
+    return [
+        MediaFile(book_name=f"Book {index // chapters}", author="Author", reader="Reader", disk=1, cover=None,
+                  path=f"/audiobooks/{index // chapters}/{index}.mp3", modified=1,
+                  chapters=[Chapter(f"Chapter {index % chapters}", 0, 600.0, index % chapters)])
+        for index in range(files)
+    ]
+
+
+def generate_covers(count: int, size: int = 800) -> list[Image.Image]:
+    """Noisy images with a gradient and blocks of color, which compress roughly like cover art."""
+    rng = random.Random(1)
+    gradient = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    covers = []
+
+    for _ in range(count):
+        cover = Image.blend(Image.effect_noise((size, size), 40).convert("RGB"), gradient, 0.6)
+        draw = ImageDraw.Draw(cover)
+        for _ in range(12):
+            x, y = rng.randrange(size), rng.randrange(size)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.rectangle((x, y, x + rng.randrange(20, size // 2), y + rng.randrange(20, size // 2)), fill=color)
+        covers.append(cover)
+
+    return covers
+
+
+def measure(function, number: int = 1) -> float:
+    """Returns the average duration of a call in seconds."""
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+
+    return (time.perf_counter() - start) / number
+
+
+def bench_import(args):
+    from cozy.media.importer import CHUNK_SIZE
+    from cozy.model.database_importer import DatabaseImporter
+
+    with temporary_database():
+        media_files = generate_media_files(args.files, args.chapters or 20)
+        importer = DatabaseImporter()
+
+        def insert_all():
+            for chunk in chunks(media_files, CHUNK_SIZE):
+                importer.insert_many(set(chunk))
+
+        for name in ("first import", "re-import"):
+            duration = measure(insert_all)
+            print(f"import: {name} of {args.files} files: {duration:.2f} s ({args.files / duration:.0f} files/s)")
+
+
+def bench_library(args):
+    from cozy.model.library import Library
+
+    with temporary_database() as db:
+        chapters = args.chapters or 25
+        generate_library(db, args.books, chapters)
+
+        def load():
+            library = Library()
+            library.invalidate()
+            return library.books, library.chapters, library.files
+
+        print(f"library: loading {args.books} books with {chapters} chapters each: {measure(load):.2f} s")
+
+
+def bench_book(args):
+    from cozy.model.book import Book
+
+    chapters = args.chapters or 500
+
+    with temporary_database() as db:
+        generate_library(db, 1, chapters)
+        book = Book(db, BookModel.get())
+        book.position = book.chapters[-1].id
+
+        for name in ("duration", "progress"):
+            duration = measure(lambda name=name: getattr(book, name), number=2000)
+            print(f"book: {name} of a book with {chapters} chapters: {duration * 1e6:.1f} us")
+
+
+def bench_chapters(args):
+    from cozy.model.track import select_tracks_with_files, track_sort_order
+
+    chapters = args.chapters or 2000
+    names = [f"Episode {number} - Part {number % 7}" for number in range(chapters)]
+    random.Random(1).shuffle(names)
+
+    with temporary_database() as db:
+        generate_library(db, 1, chapters, chapter_names=names)
+        query = select_tracks_with_files().where(Track.book == 1).order_by(*track_sort_order())
+
+        duration = measure(lambda: list(query.clone()), number=20)
+        print(f"chapters: sorted query of a book with {chapters} chapters: {duration * 1e3:.1f} ms")
+
+
+def bench_thumbnails(args):
+    thumbnails = []
+    for cover in generate_covers(args.covers):
+        cover.thumbnail((400, 400), Image.Resampling.LANCZOS)
+        thumbnails.append(cover)
+
+    for name in THUMBNAIL_FORMATS:
+        thumbnail_format = ThumbnailFormat(name)
+
+        start = time.perf_counter()
+        encoded = [thumbnail_format.encode(thumbnail) for thumbnail in thumbnails]
+        encode = (time.perf_counter() - start) / len(encoded)
+
+        start = time.perf_counter()
+        for data in encoded:
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+        decode = (time.perf_counter() - start) / len(encoded)
+
+        size = sum(len(data) for data in encoded) / len(encoded) / 1024
+        print(f"thumbnails: {name:4} encode {encode * 1e3:6.2f} ms, decode {decode * 1e3:5.2f} ms, "
+              f"{size:6.1f} KiB per 400px thumbnail")
+
+
+BENCHMARKS = {
+    "import": bench_import,
+    "library": bench_library,
+    "book": bench_book,
+    "chapters": bench_chapters,
+    "thumbnails": bench_thumbnails,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--books", type=int, default=2000, help="books of the generated library")
+    parser.add_argument("--chapters", type=int,
+                        help="chapters per book, for the import the files per book (default: depends on the benchmark)")
+    parser.add_argument("--files", type=int, default=10000, help="files of the import")
+    parser.add_argument("--covers", type=int, default=1000, help="covers of the thumbnail benchmark")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.benchmarks) - BENCHMARKS.keys()
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    gettext.install("cozy")
+
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
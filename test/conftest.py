@@ -25,6 +25,37 @@ def chunks(lst, n):
 
 @pytest.fixture(scope="function")
 def peewee_database():
+    db_path, models, test_db = prepare_db()
+    insert_test_data()
+
+    print("Provide database...")
+    yield test_db
+
+    teardown_db(db_path, models, test_db)
+
+
+@pytest.fixture(scope="function")
+def peewee_queue_database(tmp_path):
+    """The test data in a database file behind the write queue of Cozy."""
+    from cozy.db.collation import collate_natural
+    from cozy.db.model_base import CozyQueueDatabase
+
+    models = get_models()
+    previous_db = models[0]._meta.database
+    queue_db = CozyQueueDatabase(str(tmp_path / "cozy.db"), results_timeout=5.0)
+    queue_db.bind(models, bind_refs=False, bind_backrefs=False)
+    queue_db.register_collation(collate_natural)
+    queue_db.create_tables(models)
+    insert_test_data()
+
+    yield queue_db
+
+    queue_db.stop()
+    queue_db.close()
+    previous_db.bind(models, bind_refs=False, bind_backrefs=False)
+
+
+def insert_test_data():
     from cozy.db.book import Book
     from cozy.db.file import File
     from cozy.db.settings import Settings
@@ -33,8 +64,6 @@ def peewee_database():
     from cozy.db.track import Track
     from cozy.db.track_to_file import TrackToFile
 
-    db_path, models, test_db = prepare_db()
-
     path_of_test_folder = os.path.dirname(os.path.realpath(__file__)) + '/'
 
     with open(path_of_test_folder + 'books.json') as json_file:
@@ -68,11 +97,6 @@ def peewee_database():
     StorageBlackList.create(path="/path/to/replace/test1.mp3")
     StorageBlackList.create(path="/path/to/not/replace/test2.mp3")
 
-    print("Provide database...")
-    yield test_db
-
-    teardown_db(db_path, models, test_db)
-
 
 @pytest.fixture(scope="function")
 def peewee_database_storage():
@@ -103,12 +127,11 @@ def teardown_db(db_path, models, test_db):
     test_db.close()
 
 
-def prepare_db():
-    from playhouse.pool import PooledSqliteDatabase
-
+def get_models() -> list:
     from cozy.db.artwork_cache import ArtworkCache
     from cozy.db.book import Book
-    from cozy.db.collation import collate_natural
+    from cozy.db.cover import Cover
+    from cozy.db.directory import Directory
     from cozy.db.file import File
     from cozy.db.offline_cache import OfflineCache
     from cozy.db.settings import Settings
@@ -117,7 +140,16 @@ def prepare_db():
     from cozy.db.track import Track
     from cozy.db.track_to_file import TrackToFile
 
-    models = [Track, Book, File, TrackToFile, Settings, ArtworkCache, Storage, StorageBlackList, OfflineCache]
+    return [Track, Book, File, TrackToFile, Settings, ArtworkCache, Storage, StorageBlackList, OfflineCache,
+            Directory, Cover]
+
+
+def prepare_db():
+    from playhouse.pool import PooledSqliteDatabase
+
+    from cozy.db.collation import collate_natural
+
+    models = get_models()
 
     print("Setup database...")
 
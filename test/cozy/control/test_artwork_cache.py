@@ -0,0 +1,173 @@
+import io
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import inject
+import pytest
+
+from cozy.control.thumbnail_pack import ThumbnailPack
+from cozy.media.importer import Importer
+from cozy.settings import ApplicationSettings
+
+
+@pytest.fixture(autouse=True)
+def setup_inject(tmp_path):
+    inject.clear_and_configure(lambda binder: binder
+                               .bind(ThumbnailPack, ThumbnailPack(tmp_path / "thumbnails.pack"))
+                               .bind_to_constructor(Importer, MagicMock())
+                               .bind_to_constructor(ApplicationSettings, MagicMock()))
+
+    yield
+    inject.clear()
+
+
+def _texture(width: int, height: int):
+    return MagicMock(get_width=lambda: width, get_height=lambda: height)
+
+
+def test_texture_cache_removes_least_recently_used_textures():
+    from cozy.control.artwork_cache import TextureCache
+
+    cache = TextureCache(2 * 10 * 10 * 4)
+    first, second, third = _texture(10, 10), _texture(10, 10), _texture(10, 10)
+    cache.put((1, 10), first)
+    cache.put((2, 10), second)
+    cache.get((1, 10))
+    cache.put((3, 10), third)
+
+    assert cache.get((1, 10)) is first
+    assert cache.get((2, 10)) is None
+    assert cache.get((3, 10)) is third
+
+
+def test_get_cover_paintable_async_renders_each_cover_once(mocker):
+    from cozy.control.artwork_cache import ArtworkCache
+
+    texture = _texture(10, 10)
+    rendering = threading.Event()
+    render = mocker.patch.object(ArtworkCache, "_render_texture",
+                                 side_effect=lambda *_: rendering.wait(1) and texture)
+    artwork_cache = ArtworkCache()
+    book = MagicMock(id=1, cover_hash="cover", first_file="/book/1.mp3")
+    delivered = []
+
+    artwork_cache.get_cover_paintable_async(book, 2, 10, delivered.append)
+    artwork_cache.get_cover_paintable_async(book, 2, 10, delivered.append)
+    rendering.set()
+    artwork_cache._executor.shutdown()
+    artwork_cache.get_cover_paintable_async(book, 2, 10, delivered.append)
+
+    render.assert_called_once_with(1, "cover", "/book/1.mp3", 20)
+    assert delivered == [texture, texture, texture]
+
+
+def test_get_cover_paintable_async_reads_the_book_on_the_calling_thread(mocker):
+    from cozy.control.artwork_cache import ArtworkCache
+
+    class Book:
+        def __init__(self):
+            self.threads = set()
+
+        def __getattr__(self, name):
+            self.threads.add(threading.current_thread())
+            return {"id": 1, "cover_hash": None, "first_file": None}[name]
+
+    render = mocker.patch.object(ArtworkCache, "_render_texture", return_value=None)
+    artwork_cache = ArtworkCache()
+    book = Book()
+
+    artwork_cache.get_cover_paintable_async(book, 1, 10, lambda _: None)
+    artwork_cache._executor.shutdown()
+
+    render.assert_called_once_with(1, None, None, 10)
+    assert book.threads == {threading.current_thread()}
+
+
+def test_delete_artwork_cache_clears_textures_in_memory(mocker):
+    from cozy.control.artwork_cache import ArtworkCache
+
+    mocker.patch("cozy.control.thumbnail_pack.ArtworkCacheModel")
+    render = mocker.patch.object(ArtworkCache, "_render_texture", return_value=_texture(10, 10))
+    artwork_cache = ArtworkCache()
+    book = MagicMock(id=1)
+
+    artwork_cache.get_cover_paintable_async(book, 1, 10, lambda _: None)
+    artwork_cache._executor.shutdown()
+    artwork_cache.delete_artwork_cache()
+
+    assert artwork_cache._textures.get((1, 10)) is None
+    assert render.call_count == 1
+
+
+def _cover(color: str) -> str:
+    from PIL import Image
+
+    from cozy.model.cover_store import CoverStore
+
+    cover = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(cover, format="PNG")
+    return CoverStore.store(cover.getvalue())
+
+
+def test_render_texture_keeps_thumbnail_until_cover_changes(peewee_database, mocker):
+    from cozy.control.artwork_cache import ArtworkCache
+    from cozy.control.thumbnails import ThumbnailFormat
+    from cozy.db.artwork_cache import ArtworkCache as ArtworkCacheModel
+
+    app_settings = inject.instance(ApplicationSettings)
+    app_settings.prefer_external_cover = False
+    app_settings.thumbnail_format = "png"
+    thumbnails = inject.instance(ThumbnailPack)
+    artwork_cache = ArtworkCache()
+    cache_cover = mocker.spy(artwork_cache, "_cache_cover")
+    first_cover = _cover("red")
+    second_cover = _cover("blue")
+
+    artwork_cache._render_texture(1, first_cover, None, 10)
+    artwork_cache._render_texture(1, _cover("red"), None, 10)
+    assert cache_cover.call_count == 1
+
+    artwork_cache._render_texture(1, second_cover, None, 10)
+    assert cache_cover.call_count == 2
+    assert thumbnails.contains(second_cover, 10, ThumbnailFormat("png"))
+    assert ArtworkCacheModel.get(ArtworkCacheModel.book == 1).uuid == second_cover
+
+    thumbnails.delete_unused(ThumbnailFormat("png"))
+    assert not thumbnails.contains(first_cover, 10, ThumbnailFormat("png"))
+    assert thumbnails.contains(second_cover, 10, ThumbnailFormat("png"))
+
+
+def test_get_album_art_path_exports_the_thumbnail(peewee_database):
+    from cozy.control.artwork_cache import ArtworkCache
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    app_settings = inject.instance(ApplicationSettings)
+    app_settings.thumbnail_format = "jpeg"
+    app_settings.thumbnail_quality = 90
+    thumbnails = inject.instance(ThumbnailPack)
+    thumbnails.set_cover_key(1, "cover")
+    thumbnails.add("cover", ThumbnailFormat("jpeg"), {256: b"thumbnail"})
+    artwork_cache = ArtworkCache()
+
+    path = artwork_cache.get_album_art_path(MagicMock(id=1), 256)
+
+    assert path.endswith(".jpg")
+    assert Path(path).read_bytes() == b"thumbnail"
+    assert artwork_cache.get_album_art_path(MagicMock(id=2), 256) is None
+
+
+def test_scan_does_not_delete_the_artwork_cache():
+    from cozy.control.artwork_cache import ArtworkCache
+    from cozy.control.thumbnails import ThumbnailFormat
+    from cozy.media.importer import ScanStatus
+
+    thumbnails = inject.instance(ThumbnailPack)
+    thumbnails.add("cover", ThumbnailFormat(), {10: b"thumbnail"})
+    artwork_cache = ArtworkCache()
+    artwork_cache._textures.put((1, 10), _texture(10, 10))
+
+    artwork_cache._on_importer_event("scan", ScanStatus.STARTED)
+
+    assert thumbnails.contains("cover", 10, ThumbnailFormat())
+    assert artwork_cache._textures.get((1, 10)) is not None
@@ -0,0 +1,145 @@
+import pytest
+
+
+@pytest.fixture
+def pack_path(tmp_path):
+    return tmp_path / "artwork" / "thumbnails.pack"
+
+
+def test_thumbnails_are_found_after_reopening_the_pack(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    pack.add("first", ThumbnailFormat("jpeg"), {46: b"small", 200: b"large"})
+    pack.add("first", ThumbnailFormat("jpeg"), {46: b"replaced"})
+    pack.add("second", ThumbnailFormat("png"), {46: b"second"})
+    pack.remove("second", 46, ThumbnailFormat("png"))
+    pack.close()
+
+    pack = ThumbnailPack(pack_path)
+
+    assert pack.get("first", 46, ThumbnailFormat("jpeg")) == b"replaced"
+    assert pack.get("first", 200, ThumbnailFormat("jpeg")) == b"large"
+    assert pack.get("first", 46, ThumbnailFormat("png")) is None
+    assert pack.get("second", 46, ThumbnailFormat("png")) is None
+
+
+def test_truncated_record_is_dropped_when_opening_the_pack(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    pack.add("first", ThumbnailFormat(), {46: b"first"})
+    pack.add("second", ThumbnailFormat(), {46: b"second"})
+    pack.close()
+    pack_path.write_bytes(pack_path.read_bytes()[:-2])
+
+    pack = ThumbnailPack(pack_path)
+    pack.add("third", ThumbnailFormat(), {46: b"third"})
+
+    assert pack.get("first", 46, ThumbnailFormat()) == b"first"
+    assert pack.get("second", 46, ThumbnailFormat()) is None
+    assert pack.get("third", 46, ThumbnailFormat()) == b"third"
+
+
+def test_delete_unused_removes_unused_covers_and_other_formats(peewee_database, pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    pack.set_cover_key(1, "used")
+    pack.add("used", ThumbnailFormat("jpeg"), {46: b"jpeg"})
+    pack.add("used", ThumbnailFormat("png"), {46: b"png"})
+    pack.add("unused", ThumbnailFormat("jpeg"), {46: b"unused"})
+
+    pack.delete_unused(ThumbnailFormat("jpeg"))
+
+    assert pack.get("used", 46, ThumbnailFormat("jpeg")) == b"jpeg"
+    assert pack.get("used", 46, ThumbnailFormat("png")) is None
+    assert pack.get("unused", 46, ThumbnailFormat("jpeg")) is None
+    assert pack.get_cover_key(1) == "used"
+
+
+def test_set_cover_keys_stores_only_changed_keys_in_one_transaction(peewee_database, pack_path, mocker):
+    from cozy.control import thumbnail_pack
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.db.artwork_cache import ArtworkCache as ArtworkCacheModel
+
+    pack = ThumbnailPack(pack_path)
+    pack.set_cover_key(1, "first")
+    transaction = mocker.spy(thumbnail_pack, "transaction")
+
+    pack.set_cover_keys({1: "first", 2: "second", 3: "third"})
+    pack.set_cover_keys({1: "first", 2: "second"})
+    pack.set_cover_keys({2: "replaced"})
+
+    assert transaction.call_count == 2
+    assert dict(ArtworkCacheModel.select(ArtworkCacheModel.book, ArtworkCacheModel.uuid).tuples()) == {
+        1: "first", 2: "replaced", 3: "third"
+    }
+    assert ThumbnailPack(pack_path).get_cover_key(2) == "replaced"
+
+
+def test_compact_keeps_current_thumbnails_only(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    for index in range(10):
+        pack.add("cover", ThumbnailFormat(), {46: bytes([index]) * 1000})
+    size = pack_path.stat().st_size
+    assert pack.fragmentation > 0.8
+
+    pack.compact()
+
+    assert pack_path.stat().st_size < size / 5
+    assert pack.fragmentation == 0
+    assert pack.get("cover", 46, ThumbnailFormat()) == bytes([9]) * 1000
+
+
+def test_opening_the_pack_removes_thumbnail_directories_of_earlier_versions(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    (pack_path.parent / "cover").mkdir(parents=True)
+    (pack_path.parent / "cover" / "46.png").write_bytes(b"")
+
+    ThumbnailPack(pack_path).contains("cover", 46, ThumbnailFormat())
+
+    assert [path.name for path in pack_path.parent.iterdir()] == ["thumbnails.pack"]
+
+
+def test_thumbnail_directories_are_only_removed_when_the_pack_is_created(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    pack.add("cover", ThumbnailFormat(), {46: b"thumbnail"})
+    pack.close()
+    (pack_path.parent / "other").mkdir()
+
+    pack = ThumbnailPack(pack_path)
+    pack.compact()
+
+    assert (pack_path.parent / "other").is_dir()
+    assert pack.get("cover", 46, ThumbnailFormat()) == b"thumbnail"
+
+
+def test_export_replaces_only_the_earlier_exported_thumbnail(pack_path):
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    pack = ThumbnailPack(pack_path)
+    pack.add("first", ThumbnailFormat(), {256: b"first"})
+    pack.add("second", ThumbnailFormat(), {256: b"second"})
+
+    first_path = pack.export("first", 256, ThumbnailFormat())
+    export_directory = first_path.parent.stat()
+    second_path = pack.export("second", 256, ThumbnailFormat())
+
+    assert not first_path.exists()
+    assert second_path.read_bytes() == b"second"
+    assert list(second_path.parent.iterdir()) == [second_path]
+    assert second_path.parent.stat().st_ino == export_directory.st_ino
+    assert pack.export("second", 256, ThumbnailFormat()) == second_path
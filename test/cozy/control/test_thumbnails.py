@@ -0,0 +1,51 @@
+import io
+
+from PIL import Image
+
+
+def test_encode_thumbnail_writes_jpeg_without_alpha_channel():
+    from cozy.control.thumbnails import ThumbnailFormat, encode_thumbnail
+
+    data = encode_thumbnail(Image.new("RGBA", (100, 50)), 20, ThumbnailFormat("jpeg", 80))
+
+    with Image.open(io.BytesIO(data)) as thumbnail:
+        assert thumbnail.format == "JPEG"
+        assert thumbnail.size == (20, 10)
+
+
+def test_unknown_thumbnail_format_falls_back_to_png():
+    from cozy.control.thumbnails import ThumbnailFormat
+
+    assert ThumbnailFormat("bmp").extension == ".png"
+
+
+
+def test_cover_file_is_only_searched_without_embedded_cover(tmp_path, mocker):
+    from cozy.control import thumbnails
+
+    (tmp_path / "cover.jpg").write_bytes(b"cover")
+    glob = mocker.spy(thumbnails.Path, "glob")
+
+    sources = thumbnails.get_cover_sources("hash", str(tmp_path / "1.mp3"), prefer_external_cover=False)
+
+    assert next(sources).key == "hash"
+    assert glob.call_count == 0
+    assert next(sources).path == tmp_path / "cover.jpg"
+    assert glob.call_count == 1
+
+
+def test_cover_file_is_preferred_if_configured(tmp_path):
+    from cozy.control.thumbnails import get_cover_sources
+
+    (tmp_path / "cover.png").write_bytes(b"cover")
+
+    sources = list(get_cover_sources("hash", str(tmp_path / "1.mp3"), prefer_external_cover=True))
+
+    assert [source.path for source in sources] == [tmp_path / "cover.png", None]
+
+
+def test_book_without_covers_has_no_cover_sources(tmp_path):
+    from cozy.control.thumbnails import get_cover_sources
+
+    assert list(get_cover_sources(None, str(tmp_path / "1.mp3"), prefer_external_cover=False)) == []
+    assert list(get_cover_sources(None, None, prefer_external_cover=True)) == []
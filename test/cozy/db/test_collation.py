@@ -0,0 +1,17 @@
+from functools import cmp_to_key
+
+from cozy.db.collation import collate_natural, natural_sort_key
+
+NAMES = [
+    "Chapter 10", "chapter 2", "Chapter 1", "Chapter 1a", "Chapter 1 b", "Chapter", "10", "9",
+    "Part 2 Chapter 10", "Part 2 Chapter 9", "Part 10 Chapter 1", "Épilogue", "epilogue", "a", "",
+    "Track 007", "Track 8", "Track 0", "1.10", "1.9", "x99999999999999999999", "x100",
+]
+
+
+def test_natural_sort_key_orders_like_collate_natural():
+    assert sorted(NAMES, key=natural_sort_key) == sorted(NAMES, key=cmp_to_key(collate_natural))
+
+
+def test_natural_sort_key_ignores_leading_zeros_and_case():
+    assert natural_sort_key("Track 007") == natural_sort_key("track 7")
@@ -0,0 +1,49 @@
+import pytest
+from peewee import fn
+
+
+def _query_plan(db, query) -> str:
+    sql, params = query.sql()
+    return " ".join(row[3] for row in db.execute_sql("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def test_tracks_of_a_book_are_searched_by_index(peewee_database):
+    from cozy.db.track import Track
+    from cozy.model.track import select_tracks_with_files, track_sort_order
+
+    query = select_tracks_with_files().where(Track.book == 1).order_by(*track_sort_order())
+
+    assert "USING INDEX track_book_id_disk_number_natural_sort_key" in _query_plan(peewee_database, query)
+
+
+def test_track_to_file_is_searched_by_file(peewee_database):
+    from cozy.db.track_to_file import TrackToFile
+
+    query = TrackToFile.select(TrackToFile.track).where(TrackToFile.file << [1, 2])
+
+    assert "USING INDEX tracktofile_file_id" in _query_plan(peewee_database, query)
+
+
+def test_file_is_searched_by_path(peewee_database):
+    from cozy.db.file import File
+
+    query = File.select().where(File.path == "/a/b.mp3")
+
+    assert "USING INDEX file_path" in _query_plan(peewee_database, query)
+
+
+def test_offline_cache_is_searched_by_original_file(peewee_database):
+    from cozy.db.offline_cache import OfflineCache
+
+    query = OfflineCache.select().where(OfflineCache.original_file == 1)
+
+    assert "USING INDEX offlinecache_original_file_id" in _query_plan(peewee_database, query)
+
+
+@pytest.mark.parametrize("names", [["book"], ["a", "b"]])
+def test_books_are_searched_case_insensitive_by_index(peewee_database, names):
+    from cozy.db.book import Book
+
+    query = Book.select().where(fn.Lower(Book.name) << names)
+
+    assert "USING INDEX book_name_lower" in _query_plan(peewee_database, query)
@@ -0,0 +1,64 @@
+import pytest
+from peewee import SqliteDatabase
+
+
+@pytest.fixture
+def fragmented_database(tmp_path):
+    db = SqliteDatabase(str(tmp_path / "cozy.db"), pragmas=[('journal_mode', 'wal')])
+    db.execute_sql("CREATE TABLE blob (data BLOB)")
+    db.execute_sql("INSERT INTO blob SELECT randomblob(1000) FROM "
+                   "(WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT 2000) SELECT i FROM n)")
+    db.execute_sql("DELETE FROM blob")
+
+    yield db
+
+    db.close()
+
+
+def test_run_maintenance_converts_fragmented_database_to_incremental_vacuum(fragmented_database):
+    from cozy.db.maintenance import AUTO_VACUUM_INCREMENTAL, get_database_stats, run_maintenance
+
+    assert get_database_stats(fragmented_database).fragmentation > 0.5
+
+    run_maintenance(fragmented_database)
+
+    assert get_database_stats(fragmented_database).free_pages == 0
+    assert fragmented_database.execute_sql("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+
+def test_run_maintenance_frees_pages_incrementally(fragmented_database, mocker):
+    from cozy.db.maintenance import get_database_stats, run_maintenance
+
+    mocker.patch("cozy.db.maintenance.INCREMENTAL_VACUUM_PAGES", 100)
+    run_maintenance(fragmented_database)
+    fragmented_database.execute_sql("INSERT INTO blob SELECT randomblob(1000) FROM "
+                                    "(WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT 500) "
+                                    "SELECT i FROM n)")
+    fragmented_database.execute_sql("DELETE FROM blob")
+    free_pages = get_database_stats(fragmented_database).free_pages
+
+    run_maintenance(fragmented_database)
+
+    assert get_database_stats(fragmented_database).free_pages == free_pages - 100
+
+
+def test_get_database_stats_reads_the_database_file_while_it_is_written(fragmented_database, tmp_path):
+    from cozy.db.maintenance import get_database_stats
+
+    fragmented_database.execute_sql("BEGIN IMMEDIATE")
+    fragmented_database.execute_sql("INSERT INTO blob VALUES (randomblob(1000))")
+    stats = get_database_stats(fragmented_database)
+    fragmented_database.execute_sql("ROLLBACK")
+
+    files = [tmp_path / name for name in ("cozy.db", "cozy.db-wal", "cozy.db-shm")]
+    assert stats.size == sum(file.stat().st_size for file in files)
+    assert stats.free_pages > 0
+
+
+def test_get_database_stats_of_a_database_in_memory():
+    from cozy.db.maintenance import get_database_stats
+
+    stats = get_database_stats(SqliteDatabase(":memory:"))
+
+    assert stats.size == 0
+    assert stats.fragmentation == 0
@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+from peewee import OperationalError
+from playhouse.sqliteq import QUERY
+
+
+@pytest.fixture
+def queue_database(tmp_path):
+    from cozy.db.model_base import CozyQueueDatabase
+
+    db = CozyQueueDatabase(str(tmp_path / "cozy.db"), results_timeout=5.0)
+    db.execute_sql("CREATE TABLE entry (name TEXT)").fetchall()
+
+    yield db
+
+    db.stop()
+    db.close()
+
+
+def _insert(db, name: str):
+    db.execute_sql("INSERT INTO entry VALUES (?)", (name,)).fetchall()
+
+
+def _names(db) -> list[str]:
+    return sorted(name for name, in db.execute_sql("SELECT name FROM entry"))
+
+
+def _start_thread(target, errors: list) -> threading.Thread:
+    def run():
+        try:
+            target()
+        except (OperationalError, ValueError) as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _run_in_open_transaction(db, in_transaction: threading.Event, release: threading.Event, fail: bool):
+    from cozy.db.model_base import transaction
+
+    with transaction(db):
+        _insert(db, "import")
+        in_transaction.set()
+        release.wait(5)
+        if fail:
+            raise ValueError("import failed")
+
+
+def test_priority_write_queue_returns_high_priority_writes_first():
+    from cozy.db.model_base import PriorityWriteQueue, WritePriority, WriteStats
+
+    queue = PriorityWriteQueue(0, WriteStats())
+    queue.put((QUERY, "import 1"))
+    queue.put((QUERY, "import 2"))
+    queue.put((QUERY, "position"), WritePriority.HIGH)
+
+    assert [queue.get()[1] for _ in range(3)] == ["position", "import 1", "import 2"]
+    assert queue.empty()
+
+
+def test_priority_write_queue_does_not_block_high_priority_writes_when_full():
+    from cozy.db.model_base import PriorityWriteQueue, WritePriority, WriteStats
+
+    queue = PriorityWriteQueue(1, WriteStats())
+    queue.put((QUERY, "import"))
+
+    writer = threading.Thread(target=queue.put, args=((QUERY, "position"), WritePriority.HIGH))
+    writer.start()
+    writer.join(timeout=1)
+
+    assert not writer.is_alive()
+    assert queue.qsize() == 2
+
+
+def test_priority_write_queue_records_queries_in_stats():
+    from cozy.db.model_base import PriorityWriteQueue, WriteStats
+
+    stats = WriteStats()
+    queue = PriorityWriteQueue(0, stats)
+    queue.put((QUERY, "first"))
+    queue.put((QUERY, "second"))
+    queue.put((object(), None))
+
+    for _ in range(3):
+        queue.get()
+
+    assert stats.count == 2
+    assert stats.max_depth == 2
+    assert stats.max_wait >= 0
+
+
+def test_write_priority_is_restored_after_block():
+    from cozy.db.model_base import WritePriority, _current_write_priority, write_priority
+
+    with write_priority(WritePriority.HIGH):
+        assert _current_write_priority() == WritePriority.HIGH
+
+    assert _current_write_priority() == WritePriority.NORMAL
+
+
+def test_transactions_of_two_threads_are_executed_one_after_another(queue_database):
+    from cozy.db.model_base import transaction
+
+    in_transaction, release, errors = threading.Event(), threading.Event(), []
+    importer = _start_thread(lambda: _run_in_open_transaction(queue_database, in_transaction, release, False), errors)
+    in_transaction.wait(5)
+
+    def batch():
+        with transaction(queue_database):
+            _insert(queue_database, "library")
+
+    library = _start_thread(batch, errors)
+    time.sleep(0.1)
+    assert _names(queue_database) == []
+
+    release.set()
+    importer.join(5)
+    library.join(5)
+
+    assert errors == []
+    assert _names(queue_database) == ["import", "library"]
+
+
+def test_nested_transactions_join_the_outer_one(queue_database):
+    from cozy.db.model_base import transaction
+
+    with pytest.raises(ValueError), transaction(queue_database):
+        with transaction(queue_database):
+            _insert(queue_database, "nested")
+        raise ValueError
+
+    assert _names(queue_database) == []
+
+
+def test_high_priority_writes_are_not_rolled_back_with_a_failed_transaction_of_another_thread(queue_database):
+    from cozy.db.model_base import WritePriority, write_priority
+
+    in_transaction, release, errors = threading.Event(), threading.Event(), []
+    importer = _start_thread(lambda: _run_in_open_transaction(queue_database, in_transaction, release, True), errors)
+    in_transaction.wait(5)
+
+    def save_position():
+        with write_priority(WritePriority.HIGH):
+            _insert(queue_database, "position")
+
+    player = _start_thread(save_position, errors)
+    time.sleep(0.1)
+    release.set()
+    importer.join(5)
+    player.join(5)
+
+    assert [str(error) for error in errors] == ["import failed"]
+    assert _names(queue_database) == ["position"]
+
+
+def test_direct_database_takes_the_write_lock_when_a_transaction_begins(tmp_path):
+    import sqlite3
+
+    from cozy.db.model_base import CozyDirectDatabase, transaction
+
+    path = tmp_path / "cozy.db"
+    db = CozyDirectDatabase(str(path), timeout=5.0, pragmas=[("journal_mode", "wal")])
+    db.execute_sql("CREATE TABLE entry (name TEXT)")
+    other_connection = sqlite3.connect(path, timeout=0)
+
+    try:
+        with transaction(db):
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other_connection.execute("BEGIN IMMEDIATE")
+            _insert(db, "direct")
+
+        assert _names(db) == ["direct"]
+    finally:
+        other_connection.close()
+        db.close()
@@ -6,6 +6,8 @@ from peewee import SqliteDatabase
 
 from cozy.media.media_file import MediaFile
 from cozy.model.library import Library
+from cozy.settings import ApplicationSettings
+from test.cozy.mocks import ApplicationSettingsMock
 
 
 @pytest.fixture(autouse=True)
@@ -13,7 +15,8 @@ def setup_inject(peewee_database_storage):
     inject.clear_and_configure(lambda binder: binder
                                .bind(SqliteDatabase, peewee_database_storage)
                                .bind_to_constructor("FilesystemMonitor", MagicMock())
-                               .bind_to_constructor(Library, MagicMock()))
+                               .bind_to_constructor(Library, MagicMock())
+                               .bind_to_constructor(ApplicationSettings, ApplicationSettingsMock))
 
     yield
     inject.clear()
@@ -74,13 +77,64 @@ def test_import_file_returns_false_for_directory(mocker):
 
 
 def test_filter_unchanged_files_returns_only_new_or_changed_files(mocker):
+    from cozy.db.book import Book
+    from cozy.db.file import File
+    from cozy.db.track import Track
+    from cozy.db.track_to_file import TrackToFile
     from cozy.media.importer import Importer
 
+    book = Book.create(name="a", author="a", reader="a", position=0, rating=0)
+    for path, modified in [("unchanged.mp3", 100), ("changed.mp3", 50)]:
+        file = File.create(path=path, modified=modified)
+        track = Track.create(name="a", number=1, disk=1, position=0, book=book, length=1)
+        TrackToFile.create(track=track, file=file, start_at=0)
+    File.create(path="orphan.mp3", modified=100)
 
-    mocker.patch("cozy.model.library.Library.chapters")
     mocker.patch("os.path.getmtime", return_value=100)
 
-    Importer()
+    importer = Importer()
+    files = importer._filter_unchanged_files(["unchanged.mp3", "changed.mp3", "orphan.mp3", "new.mp3"])
+
+    assert list(files) == ["changed.mp3", "orphan.mp3", "new.mp3"]
+
+
+def _import_files(count: int) -> list[str]:
+    from cozy.db.file import File
+    from cozy.db.track_to_file import TrackToFile
+
+    File.delete().execute()
+    TrackToFile.delete().execute()
+    files = [{"id": index, "path": f"/library/{index}.mp3", "modified": 100} for index in range(1, count + 1)]
+    for index in range(0, count, 100):
+        File.insert_many(files[index:index + 100]).execute()
+        TrackToFile.insert_many([{"track": file["id"], "file": file["id"], "start_at": 0}
+                                 for file in files[index:index + 100]]).execute()
+
+    return [file["path"] for file in files]
+
+
+def test_filter_unchanged_files_scales_linearly_with_the_number_of_files(mocker):
+    import time
+
+    from cozy.media.importer import Importer
+
+    mocker.patch("os.path.getmtime", return_value=100)
+    importer = Importer()
+
+    def measure(count: int) -> float:
+        paths = _import_files(count) + [f"/library/new/{index}.mp3" for index in range(count)]
+        durations = []
+        for _ in range(3):
+            start = time.perf_counter()
+            assert len(list(importer._filter_unchanged_files(paths))) == count
+            durations.append(time.perf_counter() - start)
+
+        return min(durations)
+
+    small, large = measure(1_000), measure(10_000)
+
+    # Ten times the files take about ten times as long, a quadratic filter would take a hundred times as long
+    assert large < small * 30
 
 
 def test_scan_emits_start_event(mocker):
@@ -98,12 +152,7 @@ def test_scan_returns_file_names_that_could_not_be_imported(mocker):
 
     files = {"1", "2"}
 
-    class Mock:
-        def get(self):
-            return {"1", "2"}
-
-    mocker.patch("multiprocessing.pool.Pool.map_async", return_value=Mock())
-    mocker.patch("cozy.media.importer.Importer._wait_for_job_to_complete")
+    mocker.patch("multiprocessing.pool.Pool.imap_unordered", return_value=iter(["1", "2"]))
     mocker.patch("cozy.model.database_importer.DatabaseImporter.insert_many")
 
     importer = Importer()
@@ -115,18 +164,7 @@ def test_scan_returns_file_names_that_could_not_be_imported(mocker):
 def test_scan_returns_none_for_non_audio_files(mocker):
     from cozy.media.importer import Importer
 
-    class Mock:
-        def get(self):
-            return self.iterator()
-
-        def iterator(self):
-            for item in [None, None]:
-                yield item
-
-
-
-    mocker.patch("multiprocessing.pool.Pool.map_async", return_value=Mock())
-    mocker.patch("cozy.media.importer.Importer._wait_for_job_to_complete")
+    mocker.patch("multiprocessing.pool.Pool.imap_unordered", return_value=iter([None, None]))
     mocker.patch("cozy.model.database_importer.DatabaseImporter.insert_many")
 
     importer = Importer()
@@ -138,18 +176,10 @@ def test_scan_returns_none_for_non_audio_files(mocker):
 def test_scan_processes_all_files_even_if_many_are_not_audio_files(mocker):
     from cozy.media.importer import Importer
 
-    class Mock:
-        def get(self):
-            return self.iterator()
-
-        def iterator(self):
-            items = [None] * 200
-            items.append("test")
-            for item in items:
-                yield item
+    items = [None] * 200
+    items.append("test")
 
-    mocker.patch("multiprocessing.pool.Pool.map_async", return_value=Mock())
-    mocker.patch("cozy.media.importer.Importer._wait_for_job_to_complete")
+    mocker.patch("multiprocessing.pool.Pool.imap_unordered", return_value=iter(items))
     mocker.patch("cozy.model.database_importer.DatabaseImporter.insert_many")
 
     importer = Importer()
@@ -184,19 +214,139 @@ def test_execute_import_returns_list_of_imported_files(mocker):
         chapters=[]
     )
 
-    class Mock:
-        def get(self):
-            return self.iterator()
-
-        def iterator(self):
-            for item in [media_file1, media_file2, None]:
-                yield item
-
-    mocker.patch("multiprocessing.pool.Pool.map_async", return_value=Mock())
-    mocker.patch("cozy.media.importer.Importer._wait_for_job_to_complete")
+    mocker.patch("multiprocessing.pool.Pool.imap_unordered",
+                 return_value=iter([media_file1, media_file2, None]))
     mocker.patch("cozy.model.database_importer.DatabaseImporter.insert_many")
 
     importer = Importer()
     imported, _ = importer._execute_import(["a", "b"])
 
-    assert all(a == b for a, b in zip(imported, ["path", "path2"]))
+    assert imported == {"path", "path2"}
+
+
+def test_execute_import_inserts_discovered_files_in_batches(mocker):
+    from cozy.media.importer import CHUNK_SIZE, Importer
+
+    media_files = [
+        MediaFile(book_name="a", author="a", reader="a", disk=1, cover=b"", path=str(i), modified=1,
+                  chapters=[])
+        for i in range(CHUNK_SIZE + 1)
+    ]
+
+    mocker.patch("multiprocessing.pool.Pool.imap_unordered", return_value=iter(media_files))
+    insert_many = mocker.patch("cozy.model.database_importer.DatabaseImporter.insert_many")
+
+    importer = Importer()
+    imported, _ = importer._execute_import([file.path for file in media_files])
+
+    assert len(imported) == CHUNK_SIZE + 1
+    assert [len(call.args[0]) for call in insert_many.call_args_list] == [CHUNK_SIZE, 1]
+
+
+def test_worker_pool_is_reused_across_imports(mocker):
+    from cozy.media.importer import Importer
+
+    pool = mocker.patch("cozy.media.importer.Pool")
+
+    importer = Importer()
+    first_pool = importer._get_pool()
+    second_pool = importer._get_pool()
+
+    assert first_pool is second_pool
+    pool.assert_called_once()
+
+
+def test_generate_thumbnails_renders_all_missing_sizes_of_a_cover(mocker, tmp_path):
+    import io
+
+    from PIL import Image
+
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat, get_thumbnail_sizes
+    from cozy.db.artwork_cache import ArtworkCache
+    from cozy.media.importer import Importer
+    from cozy.model.cover_store import CoverStore
+
+    cover = io.BytesIO()
+    Image.new("RGB", (600, 600), "red").save(cover, format="PNG")
+    cover_hash = CoverStore.store(cover.getvalue())
+    thumbnails = ThumbnailPack(tmp_path / "thumbnails.pack")
+    thumbnails.add(cover_hash, ThumbnailFormat("jpeg"), {46: b"existing"})
+
+    mocker.patch.object(Importer, "_thumbnails", thumbnails)
+    pool = mocker.patch("cozy.media.importer.Pool").return_value
+    pool.imap_unordered.side_effect = lambda function, jobs: map(function, jobs)
+
+    importer = Importer()
+    books = [MagicMock(id=1, cover_hash=cover_hash, first_file=None), MagicMock(id=2, cover_hash=None, first_file=None)]
+    importer._generate_thumbnails(books)
+
+    assert all(thumbnails.contains(cover_hash, size, ThumbnailFormat("jpeg")) for size in get_thumbnail_sizes())
+    assert thumbnails.get(cover_hash, 46, ThumbnailFormat("jpeg")) == b"existing"
+    assert ArtworkCache.get(ArtworkCache.book == 1).uuid == cover_hash
+
+
+def test_generate_thumbnails_progress_counts_books_without_missing_thumbnails(mocker, tmp_path):
+    import io
+
+    from PIL import Image
+
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.media.importer import THUMBNAILS_PROGRESS_END, Importer
+    from cozy.model.cover_store import CoverStore
+
+    cover = io.BytesIO()
+    Image.new("RGB", (600, 600), "red").save(cover, format="PNG")
+    cover_hash = CoverStore.store(cover.getvalue())
+
+    mocker.patch.object(Importer, "_thumbnails", ThumbnailPack(tmp_path / "thumbnails.pack"))
+    pool = mocker.patch("cozy.media.importer.Pool").return_value
+    pool.imap_unordered.side_effect = lambda function, jobs: map(function, jobs)
+
+    importer = Importer()
+    emit = mocker.patch.object(importer, "emit_event_main_thread")
+    books = [MagicMock(id=1, cover_hash=None, first_file=None), MagicMock(id=2, cover_hash=cover_hash, first_file=None)]
+    importer._generate_thumbnails(books)
+
+    assert emit.call_args.args == ("scan-progress", THUMBNAILS_PROGRESS_END)
+
+
+def test_generate_thumbnails_skips_covers_that_cannot_be_read(mocker, tmp_path, caplog):
+    import io
+
+    from peewee import OperationalError
+    from PIL import Image
+
+    from cozy.control.thumbnail_pack import ThumbnailPack
+    from cozy.control.thumbnails import ThumbnailFormat, get_thumbnail_sizes
+    from cozy.media.importer import Importer
+    from cozy.model.cover_store import CoverStore
+
+    cover_hashes = []
+    for color in ("red", "blue"):
+        cover = io.BytesIO()
+        Image.new("RGB", (600, 600), color).save(cover, format="PNG")
+        cover_hashes.append(CoverStore.store(cover.getvalue()))
+    broken_hash, cover_hash = cover_hashes
+
+    load_cover = CoverStore.load
+
+    def load(cover_hash):
+        if cover_hash == broken_hash:
+            raise OperationalError("database is locked")
+        return load_cover(cover_hash)
+
+    mocker.patch.object(CoverStore, "load", side_effect=load)
+    thumbnails = ThumbnailPack(tmp_path / "thumbnails.pack")
+    mocker.patch.object(Importer, "_thumbnails", thumbnails)
+    pool = mocker.patch("cozy.media.importer.Pool").return_value
+    pool.imap_unordered.side_effect = lambda function, jobs: map(function, jobs)
+
+    importer = Importer()
+    books = [MagicMock(id=1, cover_hash=broken_hash, first_file=None),
+             MagicMock(id=2, cover_hash=cover_hash, first_file=None)]
+    importer._generate_thumbnails(books)
+
+    assert not any(thumbnails.contains(broken_hash, size, ThumbnailFormat("jpeg")) for size in get_thumbnail_sizes())
+    assert all(thumbnails.contains(cover_hash, size, ThumbnailFormat("jpeg")) for size in get_thumbnail_sizes())
+    assert f"Could not read cover {broken_hash}" in caplog.text
@@ -0,0 +1,103 @@
+import struct
+
+import pytest
+
+SAMPLE_RATE = 44100
+
+
+@pytest.fixture
+def flac_file(tmp_path):
+    path = tmp_path / "My Book" / "01 a nice file.flac"
+    path.parent.mkdir()
+
+    # An empty FLAC stream that only consists of the STREAMINFO block with a length of 10 seconds
+    stream_info = struct.pack(">HH", 4096, 4096) + bytes(6)
+    sample_info = (SAMPLE_RATE << 44) | (1 << 41) | (15 << 36) | (SAMPLE_RATE * 10)
+    stream_info += sample_info.to_bytes(8, "big")
+    stream_info += bytes(16)
+    path.write_bytes(b"fLaC" + bytes([0x80, 0, 0, len(stream_info)]) + stream_info)
+
+    return path
+
+
+def _read_tags(path):
+    from mutagen import File
+
+    from cozy.media.mutagen_tag_reader import MutagenTagReader
+
+    return MutagenTagReader(path.as_uri(), File(path)).get_tags()
+
+
+def test_flac_tags_are_read_without_discoverer(flac_file):
+    from mutagen.flac import FLAC
+
+    file = FLAC(flac_file)
+    file["album"] = "Book"
+    file["composer"] = ["Author 1", "Author 2"]
+    file["artist"] = "Reader"
+    file["discnumber"] = "2/3"
+    file["tracknumber"] = "7"
+    file["title"] = "Chapter"
+    file.save()
+
+    media_file = _read_tags(flac_file)
+
+    assert media_file.book_name == "Book"
+    assert media_file.author == "Author 1; Author 2"
+    assert media_file.reader == "Reader"
+    assert media_file.disk == 2
+    assert len(media_file.chapters) == 1
+    assert media_file.chapters[0].name == "Chapter"
+    assert media_file.chapters[0].number == 7
+    assert media_file.chapters[0].length == 10
+    assert media_file.cover is None
+
+
+def test_missing_tags_fall_back_to_path(flac_file):
+    media_file = _read_tags(flac_file)
+
+    assert media_file.book_name == "My Book"
+    assert media_file.chapters[0].name == "01 a nice file"
+    assert media_file.chapters[0].number == 0
+    assert media_file.disk == 1
+
+
+def test_front_cover_is_preferred(flac_file):
+    from mutagen.flac import FLAC, Picture
+
+    file = FLAC(flac_file)
+    for picture_type, data in [(0, b"other"), (3, b"front")]:
+        picture = Picture()
+        picture.type = picture_type
+        picture.data = data
+        file.add_picture(picture)
+    file.save()
+
+    assert _read_tags(flac_file).cover == b"front"
+
+
+def test_mp4_files_that_may_contain_video_are_not_supported(mocker):
+    from mutagen.mp4 import MP4
+
+    from cozy.media.mutagen_tag_reader import MutagenTagReader
+
+    mp4_file = mocker.MagicMock(spec=MP4)
+    mp4_file.info.length = 10
+
+    mp4_file.filename = "/abc/book.m4b"
+    assert MutagenTagReader.supports(mp4_file)
+
+    mp4_file.filename = "/abc/video.mp4"
+    assert not MutagenTagReader.supports(mp4_file)
+
+
+def test_media_detector_uses_mutagen_for_supported_files(flac_file, mocker):
+    from cozy.media.media_detector import MediaDetector
+
+    media_detector = MediaDetector(str(flac_file))
+    discover_uri = mocker.patch.object(media_detector.discoverer, "discover_uri")
+
+    media_file = media_detector.get_media_data()
+
+    assert media_file.path == str(flac_file)
+    discover_uri.assert_not_called()
@@ -16,7 +16,7 @@ def setup_inject(peewee_database):
                                .bind(SqliteDatabase, peewee_database)
                                .bind_to_constructor("FilesystemMonitor", MagicMock())
                                .bind_to_constructor(GstPlayer, MagicMock())
-                               .bind_to_constructor(ApplicationSettings, MagicMock())
+                               .bind_to_constructor(ApplicationSettings, lambda: MagicMock(position_save_interval=15))
                                .bind_to_constructor(Library, lambda: Library())
                                .bind_to_constructor(Settings, lambda: Settings()))
 
@@ -217,3 +217,46 @@ def test_should_jump_to_chapter_position_returns_false_for_less_than_one_second_
     jump = player._should_jump_to_chapter_position(1.9 * 10 ** 9)
 
     assert not jump
+
+
+def test_next_chapter_saves_positions_while_another_thread_has_a_transaction_open(peewee_queue_database, mocker):
+    import threading
+
+    from cozy.db.book import Book as BookModel
+    from cozy.db.model_base import transaction
+    from cozy.db.track import Track as TrackModel
+    from cozy.media.player import Player
+
+    inject.clear_and_configure(lambda binder: binder
+                               .bind(SqliteDatabase, peewee_queue_database)
+                               .bind_to_constructor("FilesystemMonitor", MagicMock())
+                               .bind_to_constructor(GstPlayer, MagicMock())
+                               .bind_to_constructor(ApplicationSettings, lambda: MagicMock(position_save_interval=15))
+                               .bind_to_constructor(Library, lambda: Library())
+                               .bind_to_constructor(Settings, lambda: Settings()))
+    mocker.patch("cozy.media.player.Player._rewind_in_book")
+    library = inject.instance(Library)
+    book = next(book for book in library.books if book.current_chapter_index + 1 < len(book.chapters))
+    player = Player()
+    player._continue_book(book)
+    next_chapter = book.chapters[book.current_chapter_index + 1]
+
+    in_transaction, release = threading.Event(), threading.Event()
+
+    def import_batch():
+        with transaction(peewee_queue_database):
+            BookModel.update(rating=5).where(BookModel.id == book.id).execute()
+            in_transaction.set()
+            release.wait(5)
+
+    importer = threading.Thread(target=import_batch)
+    importer.start()
+    in_transaction.wait(5)
+    threading.Timer(0.1, release.set).start()
+
+    player._next_chapter()
+    importer.join(5)
+
+    assert BookModel.get_by_id(book.id).position == next_chapter.id
+    assert BookModel.get_by_id(book.id).rating == 5
+    assert TrackModel.get_by_id(next_chapter.id).position == next_chapter.start_position
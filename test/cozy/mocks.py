@@ -2,3 +2,23 @@ class ApplicationSettingsMock:
     @property
     def swap_author_reader(self):
         return False
+
+    @property
+    def import_workers(self):
+        return 1
+
+    @property
+    def pregenerate_thumbnails(self):
+        return False
+
+    @property
+    def prefer_external_cover(self):
+        return False
+
+    @property
+    def thumbnail_format(self):
+        return "jpeg"
+
+    @property
+    def thumbnail_quality(self):
+        return 90
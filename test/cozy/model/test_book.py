@@ -132,12 +132,14 @@ def test_cover_returns_default_value(peewee_database):
 
 def test_setting_cover_updates_in_book_object_and_database(peewee_database):
     from cozy.db.book import Book as BookDB
+    from cozy.db.cover import Cover
     from cozy.model.book import Book
 
     book = Book(peewee_database, BookDB.get(1))
     book.cover = b"42"
     assert book.cover == b"42"
-    assert BookDB.get_by_id(1).cover == b"42"
+    assert BookDB.get_by_id(1).cover_hash == book.cover_hash
+    assert Cover.get(Cover.hash == book.cover_hash).data == b"42"
 
 
 def test_playback_speed_returns_default_value(peewee_database):
@@ -241,6 +243,20 @@ def test_current_track_is_actually_current_track(peewee_database):
     assert book.current_chapter.id == BookDB.get_by_id(9).position
 
 
+def test_current_chapter_index_follows_position_changes(peewee_database):
+    from cozy.db.book import Book as BookDB
+    from cozy.model.book import Book
+
+    book = Book(peewee_database, BookDB.get(3))
+
+    book.position = book.chapters[5].id
+    assert book.current_chapter_index == 5
+    assert book.current_chapter is book.chapters[5]
+
+    book.position = 0
+    assert book.current_chapter_index == 0
+
+
 def test_try_to_init_empty_book_should_throw_exception(peewee_database):
     from cozy.db.book import Book as BookDB
     from cozy.model.book import Book, BookIsEmpty
@@ -328,6 +344,42 @@ def test_progress_should_be_100_for_finished_book(peewee_database):
     assert book.progress == book.duration
 
 
+def test_progress_of_later_chapter_includes_previous_chapters(peewee_database):
+    from cozy.db.book import Book as BookDB
+    from cozy.model.book import Book
+
+    book = Book(peewee_database, BookDB.get(3))
+    chapter = book.chapters[-1]
+    chapter.position = chapter.start_position + 42
+    book.position = chapter.id
+
+    assert book.progress == sum(c.length for c in book.chapters[:-1]) + 42
+
+
+def test_duration_is_updated_when_chapter_length_changes(peewee_database):
+    from cozy.db.book import Book as BookDB
+    from cozy.model.book import Book
+
+    book = Book(peewee_database, BookDB.get(1))
+    duration = book.duration
+    book.chapters[0].length += 1000000000
+
+    assert book.duration == duration + 1000000000
+
+
+def test_chapter_at_returns_chapter_and_progress_inside_of_it(peewee_database):
+    from cozy.db.book import Book as BookDB
+    from cozy.model.book import Book
+
+    book = Book(peewee_database, BookDB.get(3))
+    first, second = book.chapters[:2]
+
+    assert book.chapter_at(0) == (first, 0)
+    assert book.chapter_at(first.length - 1) == (first, first.length - 1)
+    assert book.chapter_at(first.length + 5) == (second, 5)
+    assert book.chapter_at(book.duration) is None
+
+
 def test_removing_book_removes_all_traces_in_db(peewee_database):
     from cozy.db.book import Book as BookDB
     from cozy.model.book import Book
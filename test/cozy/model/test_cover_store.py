@@ -0,0 +1,55 @@
+import inject
+import pytest
+from peewee import SqliteDatabase
+
+
+@pytest.fixture(autouse=True)
+def setup_inject(peewee_database):
+    inject.clear_and_configure(lambda binder: binder.bind(SqliteDatabase, peewee_database))
+    yield
+    inject.clear()
+
+
+def test_store_returns_none_for_missing_cover():
+    from cozy.db.cover import Cover
+    from cozy.model.cover_store import CoverStore
+
+    assert CoverStore.store(None) is None
+    assert CoverStore.store(b"") is None
+    assert Cover.select().count() == 0
+
+
+def test_store_deduplicates_covers_by_content():
+    from cozy.db.cover import Cover
+    from cozy.model.cover_store import CoverStore
+
+    first_hash = CoverStore.store(b"cover")
+    second_hash = CoverStore.store(b"cover")
+
+    assert first_hash == second_hash
+    assert Cover.select().count() == 1
+    assert CoverStore.load(first_hash) == b"cover"
+
+
+def test_store_many_skips_existing_covers():
+    from cozy.db.cover import Cover
+    from cozy.model.cover_store import CoverStore
+
+    existing_hash = CoverStore.store(b"existing")
+    CoverStore.store_many({existing_hash: b"existing", CoverStore.get_hash(b"new"): b"new"})
+
+    assert Cover.select().count() == 2
+
+
+def test_delete_unused_keeps_referenced_covers():
+    from cozy.db.book import Book
+    from cozy.db.cover import Cover
+    from cozy.model.cover_store import CoverStore
+
+    used_hash = CoverStore.store(b"used")
+    CoverStore.store(b"unused")
+    Book.update(cover_hash=used_hash).where(Book.id == 1).execute()
+
+    CoverStore.delete_unused()
+
+    assert [cover.hash for cover in Cover.select()] == [used_hash]
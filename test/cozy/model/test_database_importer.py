@@ -11,92 +11,76 @@ def setup_inject(peewee_database):
     inject.clear()
 
 
-def test_prepare_files_db_objects_skips_existing_files():
+def _media_file(path="New File", book_name="Test Book", chapters=None, author="New Author", modified=1234567):
+    from cozy.media.chapter import Chapter
     from cozy.media.media_file import MediaFile
+
+    return MediaFile(book_name=book_name,
+                     author=author,
+                     reader="New Reader",
+                     disk=999,
+                     cover=b"cover",
+                     path=path,
+                     modified=modified,
+                     chapters=chapters if chapters is not None else [Chapter("New Chapter", 0, 1234567, 999)])
+
+
+def test_get_unique_media_files_skips_none_and_duplicate_files():
     from cozy.model.database_importer import DatabaseImporter
 
-    media_file = MediaFile(book_name="New Book Name",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=1234567,
-                           chapters=[None])
+    media_file = _media_file()
 
-    database_importer = DatabaseImporter()
-    file_objects = database_importer._prepare_files_db_objects([media_file])
-    assert len(file_objects) == 0
+    assert DatabaseImporter._get_unique_media_files([None, media_file, media_file, None]) == [media_file]
 
 
-def test_prepare_files_db_objects_skips_duplicate_file():
-    from cozy.media.media_file import MediaFile
+def test_insert_many_does_nothing_for_empty_batch():
+    from cozy.db.track import Track
     from cozy.model.database_importer import DatabaseImporter
 
-    media_file = MediaFile(book_name="New Book Name",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="i_m_a_new_file.mp3",
-                           modified=1234567,
-                           chapters=[None])
+    track_count = Track.select().count()
+    DatabaseImporter().insert_many([None, None, None])
 
-    database_importer = DatabaseImporter()
-    file_objects = database_importer._prepare_files_db_objects([media_file, media_file])
-    assert len(file_objects) == 1
-    assert file_objects[0]["path"] == "i_m_a_new_file.mp3"
+    assert Track.select().count() == track_count
 
 
-def test_update_files_db_objects_updates_modified_field():
-    from cozy.db.file import File
-    from cozy.media.media_file import MediaFile
+def test_prepare_files_db_objects_reuses_id_of_existing_file():
     from cozy.model.database_importer import DatabaseImporter
 
-    media_file = MediaFile(book_name="New Book Name",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=12345678,
-                           chapters=[None])
+    media_file = _media_file(path="test.mp3")
+    file_ids = DatabaseImporter._get_file_ids([media_file])
 
-    database_importer = DatabaseImporter()
-    file = File.select().where(File.path == "test.mp3").get()
-    database_importer._update_files_in_db(file, media_file)
+    file_objects = DatabaseImporter._prepare_files_db_objects([media_file], file_ids)
 
-    assert File.select().where(File.path == "test.mp3").get().modified == 12345678
+    assert file_objects == [{"id": 0, "path": "test.mp3", "modified": 1234567}]
 
 
-def test_prepare_files_db_objects_returns_object_for_new_file():
-    from cozy.media.media_file import MediaFile
+def test_prepare_files_db_objects_assigns_new_id_for_new_file():
+    from cozy.db.file import File
     from cozy.model.database_importer import DatabaseImporter
 
-    media_file = MediaFile(book_name="New Book Name",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="i_m_a_new_file.mp3",
-                           modified=1234567,
-                           chapters=[None])
+    media_file = _media_file(path="i_m_a_new_file.mp3")
+    file_ids = DatabaseImporter._get_file_ids([media_file])
+
+    file_objects = DatabaseImporter._prepare_files_db_objects([media_file], file_ids)
 
-    database_importer = DatabaseImporter()
-    file_objects = database_importer._prepare_files_db_objects([media_file])
     assert len(file_objects) == 1
     assert file_objects[0]["path"] == "i_m_a_new_file.mp3"
+    assert file_objects[0]["id"] == File.select().order_by(File.id.desc()).get().id + 1
+    assert file_ids["i_m_a_new_file.mp3"] == file_objects[0]["id"]
 
 
-def test_prepare_db_objects_skips_none():
+def test_insert_many_updates_modified_field_of_existing_file():
+    from cozy.db.file import File
     from cozy.model.database_importer import DatabaseImporter
-    database_importer = DatabaseImporter()
 
-    database_importer._prepare_track_db_objects([None, None, None])
+    DatabaseImporter().insert_many([_media_file(path="test.mp3", modified=12345678)])
+
+    assert File.select().where(File.path == "test.mp3").get().modified == 12345678
 
 
 def test_create_track_db_object_creates_object():
     from cozy.db.book import Book
+    from cozy.db.collation import natural_sort_key
     from cozy.media.chapter import Chapter
     from cozy.media.media_file import MediaFile
     from cozy.model.database_importer import DatabaseImporter
@@ -118,6 +102,7 @@ def test_create_track_db_object_creates_object():
     res_dict = database_importer._get_track_list_for_db(media_file, book)[0]
 
     assert res_dict["name"] == "New Chapter"
+    assert res_dict["natural_sort_key"] == natural_sort_key("New Chapter")
     assert res_dict["disk"] == 999
     assert res_dict["number"] == 999
     assert res_dict["book"] == book
@@ -125,377 +110,199 @@ def test_create_track_db_object_creates_object():
     assert res_dict["position"] == 0
 
 
-def test_update_book_db_object_updates_object():
+def test_insert_many_updates_existing_book():
     from cozy.db.book import Book
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
+    from cozy.db.cover import Cover
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    database_importer._update_book_db_object(media_file)
+    DatabaseImporter().insert_many([_media_file(path="test.mp3", book_name="Test Book")])
 
-    book_in_db: Book = Book.select().where(Book.name == "Test Book").get()
+    book_in_db: Book = Book.get_by_id(1)
 
     assert book_in_db.name == "Test Book"
     assert book_in_db.author == "New Author"
     assert book_in_db.reader == "New Reader"
-    assert book_in_db.cover == b"cover"
+    assert Cover.get(Cover.hash == book_in_db.cover_hash).data == b"cover"
 
 
-def test_update_book_db_object_updates_object_regardless_of_book_spelling():
+def test_insert_many_updates_existing_book_regardless_of_book_spelling():
     from cozy.db.book import Book
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
+    book_count = Book.select().count()
+    DatabaseImporter().insert_many([_media_file(path="test.mp3", book_name="TEST BOOK")])
 
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="TEST BOOK",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    database_importer._update_book_db_object(media_file)
-
-    book_in_db: Book = Book.select().where(Book.name == "TEST BOOK").get()
+    book_in_db: Book = Book.get_by_id(1)
 
+    assert Book.select().count() == book_count
     assert book_in_db.name == "TEST BOOK"
     assert book_in_db.author == "New Author"
-    assert book_in_db.reader == "New Reader"
-    assert book_in_db.cover == b"cover"
 
 
-def test_create_book_db_object_creates_object():
+def test_insert_many_creates_new_book():
     from cozy.db.book import Book
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
+    from cozy.db.cover import Cover
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="New Book",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    database_importer._create_book_db_object(media_file)
+    DatabaseImporter().insert_many([_media_file(book_name="New Book")])
 
     book_in_db: Book = Book.select().where(Book.name == "New Book").get()
 
-    assert book_in_db.name == "New Book"
     assert book_in_db.author == "New Author"
     assert book_in_db.reader == "New Reader"
-    assert book_in_db.cover == b"cover"
+    assert Cover.get(Cover.hash == book_in_db.cover_hash).data == b"cover"
     assert book_in_db.position == 0
     assert book_in_db.rating == -1
 
 
-def test_prepare_db_objects_recreates_existing_track(mocker):
-    from cozy.db.file import File
-    from cozy.db.track_to_file import TrackToFile
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
+def test_insert_many_stores_each_distinct_cover_once():
+    from cozy.db.book import Book
+    from cozy.db.cover import Cover
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="test.mp3",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    res = database_importer._prepare_track_db_objects([media_file])
-    res_list = list(res)
-    request = res_list[0]
-
-    assert TrackToFile.select().join(File).where(File.path == "test.mp3").count() == 0
+    media_files = [_media_file(path=str(i), book_name=f"Book {i % 2}") for i in range(4)]
+    DatabaseImporter().insert_many(media_files)
+    DatabaseImporter().insert_many([_media_file(path="5", book_name="Book 2")])
 
-    assert len(res_list) == 1
-    assert request.file.path == "test.mp3"
-    assert request.start_at == 0
-    assert request.track_data["name"] == "New Chapter"
-    assert request.track_data["number"] == 999
-    assert request.track_data["disk"] == 999
-    assert request.track_data["book"].id == 1
-    assert request.track_data["length"] == 1234567
-    assert request.track_data["position"] == 0
+    books = Book.select().where(Book.name.startswith("Book "))
+    assert len({book.cover_hash for book in books}) == 1
+    assert Cover.select().count() == 1
 
 
-def test_prepare_db_objects_skips_if_file_object_not_present(mocker):
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
+def test_prepare_book_db_objects_uses_one_book_regardless_of_spelling():
     from cozy.model.database_importer import DatabaseImporter
 
     database_importer = DatabaseImporter()
+    media_files = [
+        _media_file(path="New test File", book_name="TeSt bOOk", author="New Author2"),
+        _media_file(path="Another test File", book_name="TEST BOOK"),
+    ]
 
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="New test File",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    res_dict = database_importer._prepare_track_db_objects([media_file])
+    book_rows, book_ids, covers = database_importer._prepare_book_db_objects(
+        media_files, database_importer._get_books(media_files))
 
-    assert len(list(res_dict)) == 0
+    assert len(book_rows) == 1
+    assert book_rows[0]["id"] == 1
+    assert book_rows[0]["author"] == "New Author2"
+    assert book_ids == {"test book": 1}
+    assert list(covers.values()) == [b"cover"]
 
 
-def test_prepare_db_objects_creates_new_track(mocker):
+def test_insert_many_recreates_existing_track():
     from cozy.db.file import File
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
-    from cozy.model.database_importer import DatabaseImporter
-
-    database_importer = DatabaseImporter()
-    spy = mocker.spy(database_importer, "_get_track_list_for_db")
-
-    File.create(path="New File", modified=1234567)
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book",
-                           author="New Author",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="New File",
-                           modified=1234567,
-                           chapters=[chapter])
-
-    res_dict = database_importer._prepare_track_db_objects([media_file])
-
-    assert len(list(res_dict)) == 1
-    spy.assert_called_once()
-
-
-def test_prepare_db_objects_updates_existing_book(mocker):
-    from cozy.db.file import File
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
+    from cozy.db.track import Track
+    from cozy.db.track_to_file import TrackToFile
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-    spy = mocker.spy(database_importer, "_update_book_db_object")
+    DatabaseImporter().insert_many([_media_file(path="test.mp3")])
 
-    File.create(path="New test File", modified=1234567)
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="New test File",
-                           modified=1234567,
-                           chapters=[chapter])
+    track_to_file_query = TrackToFile.select().join(File).where(File.path == "test.mp3")
+    assert track_to_file_query.count() == 1
+    assert not Track.select().where(Track.id == 1).exists()
 
-    res_dict = database_importer._prepare_track_db_objects([media_file])
+    track_to_file: TrackToFile = track_to_file_query.get()
 
-    assert len(list(res_dict)) == 1
-    spy.assert_called_once()
+    assert track_to_file.start_at == 0
+    assert track_to_file.track.name == "New Chapter"
+    assert track_to_file.track.number == 999
+    assert track_to_file.track.disk == 999
+    assert track_to_file.track.book.id == 1
+    assert track_to_file.track.length == 1234567
+    assert track_to_file.track.position == 0
 
 
-def test_prepare_db_objects_updates_existing_book_regardless_of_spelling(mocker):
+def test_insert_many_creates_file_and_tracks_for_new_file():
     from cozy.db.file import File
+    from cozy.db.track_to_file import TrackToFile
     from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-    spy = mocker.spy(database_importer, "_update_book_db_object")
+    chapters = [Chapter("Chapter 1", 0, 10, 1), Chapter("Chapter 2", 10000000000, 20, 2)]
+    DatabaseImporter().insert_many([_media_file(path="New File", chapters=chapters)])
 
-    File.create(path="New test File", modified=1234567)
-    File.create(path="Another test File", modified=1234568)
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    another_chapter = Chapter("Another Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="TeSt bOOk",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="New test File",
-                           modified=1234567,
-                           chapters=[chapter])
-    another_media_file = MediaFile(book_name="TEST BOOK",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="Another test File",
-                           modified=1234568,
-                           chapters=[another_chapter])
-
-    res_dict = database_importer._prepare_track_db_objects([media_file, another_media_file])
+    track_to_files = list(TrackToFile.select().join(File).where(File.path == "New File")
+                          .order_by(TrackToFile.start_at))
 
-    assert len(list(res_dict)) == 2
-    spy.assert_called_once()
+    assert [t.track.name for t in track_to_files] == ["Chapter 1", "Chapter 2"]
+    assert [t.start_at for t in track_to_files] == [0, 10000000000]
+    assert File.get(File.path == "New File").modified == 1234567
 
 
-def test_prepare_db_objects_creates_new_book(mocker):
+def test_insert_many_restores_position_of_started_book():
+    from cozy.db.book import Book
     from cozy.db.file import File
+    from cozy.db.track_to_file import TrackToFile
     from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
     from cozy.model.database_importer import DatabaseImporter
 
-    database_importer = DatabaseImporter()
-    spy = mocker.spy(database_importer, "_create_book_db_object")
-
-    File.create(path="New test File", modified=1234567)
-    chapter = Chapter("New Chapter", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book New",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="New test File",
-                           modified=1234567,
-                           chapters=[chapter])
+    path = "20.000 Meilen unter dem Meer/2-02 Unter der Erde hindurch.m4a"
+    chapter = Chapter("Unter der Erde hindurch", 0, 586.8666666666667, 2)
+    media_file = _media_file(path=path, book_name="20.000 Meilen unter den Meeren", chapters=[chapter])
+    media_file.disk = 2
 
-    res_dict = database_importer._prepare_track_db_objects([media_file])
+    DatabaseImporter().insert_many([media_file])
 
-    assert len(list(res_dict)) == 1
-    spy.assert_called_once()
+    new_track = TrackToFile.select().join(File).where(File.path == path).get().track
+    assert new_track.id != 222
+    assert Book.get_by_id(9).position == new_track.id
 
 
-def test_delete_all_tracks_from_db_does_as_it_says():
+def test_delete_tracks_from_db_does_as_it_says():
     from cozy.db.file import File
     from cozy.db.track import Track
     from cozy.db.track_to_file import TrackToFile
-    from cozy.media.chapter import Chapter
-    from cozy.media.media_file import MediaFile
     from cozy.model.database_importer import DatabaseImporter
 
     database_importer = DatabaseImporter()
-
-    chapter = Chapter("Ohne Aussicht auf Freiheit", 0, 1234567, 999)
-    media_file = MediaFile(book_name="Test Book New",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="20.000 Meilen unter dem Meer/2-10 Ohne Aussicht auf Freiheit.m4a",
-                           modified=1234567,
-                           chapters=[chapter])
+    path = "20.000 Meilen unter dem Meer/2-10 Ohne Aussicht auf Freiheit.m4a"
+    file_id = File.get(File.path == path).id
 
     assert Track.select().where(Track.name == "Ohne Aussicht auf Freiheit").count() == 1
-    assert TrackToFile.select().join(File).where(TrackToFile.file.path == media_file.path).count() == 1
+    assert TrackToFile.select().where(TrackToFile.file == file_id).count() == 1
 
-    database_importer._delete_tracks_from_db(media_file)
+    database_importer._delete_tracks_from_db(database_importer._get_track_ids([file_id]))
     assert Track.select().where(Track.name == "Ohne Aussicht auf Freiheit").count() == 0
-    assert TrackToFile.select().join(File).where(TrackToFile.file.path == media_file.path).count() == 0
-    assert File.select().where(File.path == media_file.path).count() == 1
+    assert TrackToFile.select().where(TrackToFile.file == file_id).count() == 0
+    assert File.select().where(File.path == path).count() == 1
 
 
-def test_delete_all_tracks_from_db_does_nothing_if_no_tracks_are_present():
-    from cozy.media.media_file import MediaFile
+def test_delete_tracks_from_db_does_nothing_if_no_tracks_are_present():
     from cozy.model.database_importer import DatabaseImporter
 
     database_importer = DatabaseImporter()
 
-    media_file = MediaFile(book_name="Test Book New",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="file_not_present",
-                           modified=1234567,
-                           chapters=[])
-
-    database_importer._delete_tracks_from_db(media_file)
-
-
-def test_is_chapter_count_in_db_different_returns_true_for_non_existent_file():
-    from cozy.media.media_file import MediaFile
-    from cozy.model.database_importer import DatabaseImporter
-
-    database_importer = DatabaseImporter()
-
-    media_file = MediaFile(book_name="Test Book New",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="file_not_present",
-                           modified=1234567,
-                           chapters=["Chapter 1"])
-
-    assert database_importer._is_chapter_count_in_db_different(media_file)
-
-
-def test_is_chapter_count_in_db_different_returns_false_for_equal_chapter_count():
-    from cozy.media.media_file import MediaFile
-    from cozy.model.database_importer import DatabaseImporter
-
-    database_importer = DatabaseImporter()
-
-    media_file = MediaFile(book_name="Test Book New",
-                           author="New Author2",
-                           reader="New Reader",
-                           disk=999,
-                           cover=b"cover",
-                           path="20.000 Meilen unter dem Meer/2-10 Ohne Aussicht auf Freiheit.m4a",
-                           modified=1234567,
-                           chapters=[None])
+    database_importer._delete_tracks_from_db(database_importer._get_track_ids([]))
 
-    assert not database_importer._is_chapter_count_in_db_different(media_file)
 
-
-def test_insert_track_inserts_all_rows_expected():
+def test_insert_tracks_inserts_all_rows_expected():
     from cozy.db.book import Book
     from cozy.db.file import File
     from cozy.db.track_to_file import TrackToFile
-    from cozy.model.database_importer import DatabaseImporter, TrackInsertRequest
-
-    database_importer = DatabaseImporter()
+    from cozy.model.database_importer import DatabaseImporter
 
     file = File.create(path="New File", modified=1234567)
+    book = Book.select().where(Book.name == "Test Book").get()
     track_data = {
+        "id": 1000,
         "name": "Test",
         "number": 2,
         "disk": 2,
-        "book": Book.select().where(Book.name == "Test Book").get(),
+        "book": book.id,
         "length": 123,
         "position": 0
     }
 
-    track = TrackInsertRequest(track_data, file, 1234)
-
-    database_importer._insert_tracks([track])
+    DatabaseImporter._insert_tracks([track_data], [{"track": 1000, "file": file.id, "start_at": 1234}])
     track_to_file_query = TrackToFile.select().join(File).where(TrackToFile.file == file.id)
     assert track_to_file_query.count() == 1
 
     track_to_file: TrackToFile = track_to_file_query.get()
 
+    assert track_to_file.start_at == 1234
     assert track_to_file.track.name == track_data["name"]
     assert track_to_file.track.number == track_data["number"]
     assert track_to_file.track.disk == track_data["disk"]
-    assert track_to_file.track.book.id == Book.select().where(Book.name == "Test Book").get().id
+    assert track_to_file.track.book.id == book.id
     assert track_to_file.track.length == track_data["length"]
     assert track_to_file.track.position == track_data["position"]
 
@@ -554,3 +361,65 @@ def test_update_book_position_resets_position_if_it_is_longer_than_the_duration(
 
     book = Book.get_by_id(11)
     assert book.position == 0
+
+
+
+def test_insert_many_reads_outside_of_short_transactions_per_chunk(peewee_database, mocker):
+    from contextlib import contextmanager
+
+    from cozy.db.book import Book
+    from cozy.model import database_importer
+    from cozy.model.database_importer import DatabaseImporter
+
+    transactions = []
+    reads_in_transaction = []
+    execute_sql = peewee_database.execute_sql
+
+    @contextmanager
+    def transaction(db):
+        transactions.append([])
+        yield
+        transactions[-1] = None
+
+    def record_sql(sql, *args, **kwargs):
+        if transactions and transactions[-1] is not None and sql.lower().startswith("select"):
+            reads_in_transaction.append(sql)
+        return execute_sql(sql, *args, **kwargs)
+
+    mocker.patch.object(database_importer, "transaction", transaction)
+    mocker.patch.object(database_importer, "TRANSACTION_CHUNK_SIZE", 2)
+    mocker.patch.object(peewee_database, "execute_sql", side_effect=record_sql)
+
+    DatabaseImporter().insert_many([_media_file(path=str(index), book_name=f"Book {index % 2}") for index in range(5)])
+
+    assert len(transactions) == 3
+    assert reads_in_transaction == []
+    assert Book.select().where(Book.name << ["Book 0", "Book 1"]).count() == 2
+
+
+def test_insert_many_does_not_hold_back_position_saves_while_it_reads(peewee_queue_database, mocker):
+    import threading
+
+    from cozy.db.book import Book
+    from cozy.db.model_base import WritePriority, write_priority
+    from cozy.model.database_importer import DatabaseImporter
+
+    saved = threading.Event()
+
+    def save_position():
+        with write_priority(WritePriority.HIGH):
+            Book.update(position=1).where(Book.id == 1).execute()
+        saved.set()
+
+    def prepare_files(*args):
+        threading.Thread(target=save_position).start()
+        assert saved.wait(2)
+        return prepare_files_db_objects(*args)
+
+    prepare_files_db_objects = DatabaseImporter._prepare_files_db_objects
+    mocker.patch.object(DatabaseImporter, "_db", peewee_queue_database)
+    mocker.patch.object(DatabaseImporter, "_prepare_files_db_objects", side_effect=prepare_files)
+
+    DatabaseImporter().insert_many([_media_file(path="test.mp3")])
+
+    assert Book.get_by_id(1).position == 1
@@ -0,0 +1,123 @@
+import os
+
+import inject
+import pytest
+from peewee import SqliteDatabase
+
+
+@pytest.fixture(autouse=True)
+def setup_inject(peewee_database_storage):
+    inject.clear_and_configure(lambda binder: binder.bind(SqliteDatabase, peewee_database_storage))
+    yield
+    inject.clear()
+
+
+@pytest.fixture
+def library_dir(tmp_path):
+    (tmp_path / "book a").mkdir()
+    (tmp_path / "book a" / "01.mp3").touch()
+    (tmp_path / "book a" / "cover.jpg").touch()
+    (tmp_path / "book b" / "cd 1").mkdir(parents=True)
+    (tmp_path / "book b" / "cd 1" / "01.M4B").touch()
+
+    return tmp_path
+
+
+def _walk(index, root):
+    return sorted(index.walk([str(root)], {".mp3", ".m4b"}))
+
+
+def test_walk_returns_all_audio_files_on_first_scan(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    files = _walk(DirectoryIndex(), library_dir)
+
+    assert files == [
+        str(library_dir / "book a" / "01.mp3"),
+        str(library_dir / "book b" / "cd 1" / "01.M4B"),
+    ]
+
+
+def test_walk_skips_unchanged_directories_after_commit(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit()
+
+    assert _walk(DirectoryIndex(), library_dir) == []
+
+
+def test_walk_does_not_skip_directories_without_commit(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+
+    assert len(_walk(index, library_dir)) == 2
+
+
+def test_walk_descends_into_changed_nested_directory(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit()
+
+    nested = library_dir / "book b" / "cd 1"
+    (nested / "02.mp3").touch()
+    os.utime(nested, ns=(1, 1))
+
+    assert _walk(index, library_dir) == [str(nested / "01.M4B"), str(nested / "02.mp3")]
+
+
+def test_commit_removes_deleted_directories(library_dir):
+    from cozy.db.directory import Directory
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit()
+
+    os.remove(library_dir / "book a" / "01.mp3")
+    os.remove(library_dir / "book a" / "cover.jpg")
+    os.rmdir(library_dir / "book a")
+    _walk(index, library_dir)
+    index.commit()
+
+    assert not Directory.select().where(Directory.path == str(library_dir / "book a")).exists()
+    assert Directory.select().where(Directory.path == str(library_dir / "book b")).exists()
+
+
+def test_forget_removes_directory_and_subdirectories(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit()
+
+    DirectoryIndex.forget(str(library_dir / "book b"))
+
+    assert _walk(index, library_dir) == [str(library_dir / "book b" / "cd 1" / "01.M4B")]
+
+
+def test_walk_returns_imported_files_of_unchanged_directories(library_dir):
+    from cozy.db.file import File
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit()
+    File.create(path=str(library_dir / "book a" / "01.mp3"), modified=1)
+
+    assert _walk(index, library_dir) == [str(library_dir / "book a" / "01.mp3")]
+
+
+def test_commit_does_not_store_directories_of_failed_files(library_dir):
+    from cozy.model.directory_index import DirectoryIndex
+
+    index = DirectoryIndex()
+    _walk(index, library_dir)
+    index.commit([str(library_dir / "book b" / "cd 1" / "01.M4B")])
+
+    assert _walk(index, library_dir) == [str(library_dir / "book b" / "cd 1" / "01.M4B")]
@@ -1,3 +1,4 @@
+import os
 from test.cozy.mocks import ApplicationSettingsMock
 
 import inject
@@ -87,6 +88,99 @@ def test_rebase_path():
     library.rebase_path("20.000 Meilen unter dem Meer", "new path")
 
 
+def test_rebase_path_updates_files_and_loaded_chapters(mocker):
+    from cozy.db.file import File
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    mocker.patch.object(library, "emit_event_main_thread")
+    chapter = next(iter(library.chapters))
+    old_path = chapter.file
+    prefix = os.path.dirname(old_path)
+
+    library.rebase_path(prefix, "/rebased/")
+
+    new_path = "/rebased" + old_path[len(prefix):]
+    assert File.get_or_none(File.path == old_path) is None
+    assert File.get_or_none(File.path == new_path)
+    assert new_path in {chapter.file for chapter in library.chapters}
+    assert new_path in library.files
+
+
+def test_rebase_path_merges_files_that_already_exist(mocker):
+    from cozy.db.file import File
+    from cozy.db.track_to_file import TrackToFile
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    mocker.patch.object(library, "emit_event_main_thread")
+    existing_file = File.create(path="/rebased/existing.mp3", modified=1)
+    moved_file = File.create(path="/old/existing.mp3", modified=1)
+    TrackToFile.update(file=moved_file).where(TrackToFile.track == 1).execute()
+
+    library.rebase_path("/old/", "/rebased/")
+
+    assert File.get_or_none(File.id == moved_file.id) is None
+    assert TrackToFile.get(TrackToFile.track == 1).file.id == existing_file.id
+
+
+def test_rebase_path_keeps_files_of_sibling_directories_with_the_same_prefix(mocker):
+    from cozy.db.file import File
+    from cozy.model.library import Library
+
+    library = Library()
+    mocker.patch.object(library, "emit_event_main_thread")
+    moved_file = File.create(path="/media/books/a.mp3", modified=1)
+    sibling_file = File.create(path="/media/books2/a.mp3", modified=1)
+
+    library.rebase_path("/media/books", "/mnt/books")
+
+    assert File.get_by_id(moved_file.id).path == "/mnt/books/a.mp3"
+    assert File.get_by_id(sibling_file.id).path == "/media/books2/a.mp3"
+
+
+def test_rebase_path_to_a_subdirectory_of_the_old_path(mocker):
+    from cozy.db.file import File
+    from cozy.model.library import REBASE_CHUNK_SIZE, Library
+
+    library = Library()
+    mocker.patch.object(library, "emit_event_main_thread")
+    paths = ["/books/a.mp3", "/books/books/a.mp3", "/books/books/books/a.mp3"]
+    # Fill the first chunks with other files, so that the conflicting files are updated in different chunks
+    files = [File.create(path=path, modified=1) for path in paths[:1]]
+    files += [File.create(path=f"/books/other/{index}.mp3", modified=1) for index in range(REBASE_CHUNK_SIZE)]
+    files += [File.create(path=path, modified=1) for path in paths[1:]]
+
+    library.rebase_path("/books", "/books/books")
+
+    assert [File.get_by_id(file.id).path for file in files if file.path in paths] == [
+        "/books/books/a.mp3", "/books/books/books/a.mp3", "/books/books/books/books/a.mp3"
+    ]
+
+
+def test_rebase_path_moves_offline_copies_of_merged_files(mocker):
+    from cozy.db.file import File
+    from cozy.db.offline_cache import OfflineCache
+    from cozy.model.library import Library
+
+    library = Library()
+    mocker.patch.object(library, "emit_event_main_thread")
+    existing_file = File.create(path="/rebased/a.mp3", modified=1)
+    cached_existing_file = File.create(path="/rebased/b.mp3", modified=1)
+    moved_file = File.create(path="/old/a.mp3", modified=1)
+    moved_cached_file = File.create(path="/old/b.mp3", modified=1)
+    moved_copy = OfflineCache.create(original_file=moved_file, cached_file="a")
+    OfflineCache.create(original_file=moved_cached_file, cached_file="b")
+    existing_copy = OfflineCache.create(original_file=cached_existing_file, cached_file="c")
+
+    library.rebase_path("/old", "/rebased")
+
+    assert OfflineCache.get_by_id(moved_copy.id).original_file.id == existing_file.id
+    assert [copy.id for copy in OfflineCache.select()] == [moved_copy.id, existing_copy.id]
+
+
 def test_empty_last_book_returns_none():
     from cozy.model.library import Library
 
@@ -103,3 +197,217 @@ def test_library_last_book_returns_the_book_it_was_set_to():
     library._settings.last_played_book = library.books[0]
 
     assert library.last_played_book is library.books[0]
+
+
+def test_library_loads_all_chapters_with_a_constant_number_of_queries(peewee_database, mocker):
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    execute_sql = mocker.spy(peewee_database, "execute_sql")
+
+    files = {chapter.file for chapter in library.chapters}
+
+    assert len(files) > 100
+    assert execute_sql.call_count == 4
+
+
+def test_library_loads_books_without_creating_chapters(peewee_database, mocker):
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    execute_sql = mocker.spy(peewee_database, "execute_sql")
+
+    books = library.books
+
+    assert len(books) > 0
+    assert all(book._chapters is None for book in books)
+    assert execute_sql.call_count == 3
+
+
+def test_book_duration_and_progress_from_chapter_index_match_chapters(peewee_database):
+    from cozy.model.book import Book
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+
+    for book in library.books:
+        loaded_book = Book(peewee_database, book._db_object)
+        assert book.duration == loaded_book.duration
+        assert book.progress == loaded_book.progress
+
+
+def test_chapter_index_files_match_chapter_files():
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+
+    assert library.files == {chapter.file for chapter in library.chapters}
+
+
+def test_chapter_index_remove_only_changes_the_chapters_of_the_book():
+    from cozy.model.library import ChapterIndex, ChapterRecord
+
+    records = [ChapterRecord(id, id // 10, id, f"/{id}.mp3", 0, 1) for id in (10, 11, 20, 21)]
+    chapter_index = ChapterIndex(records)
+    other_book_records = chapter_index.for_book(2)
+
+    chapter_index.remove(11)
+    chapter_index.remove(99)
+
+    assert [record.id for record in chapter_index.records] == [10, 20, 21]
+    assert [record.id for record in chapter_index.for_book(1)] == [10]
+    assert chapter_index.for_book(2) is other_book_records
+
+
+def test_chapter_index_remove_many_removes_chapters_of_several_books():
+    from cozy.model.library import ChapterIndex, ChapterRecord
+
+    records = [ChapterRecord(id, id // 10, id, f"/{id}.mp3", 0, 1) for id in (10, 11, 20, 21, 30)]
+    chapter_index = ChapterIndex(records)
+
+    chapter_index.remove_many([11, 20, 21, 99])
+
+    assert [record.id for record in chapter_index.records] == [10, 30]
+    assert [record.id for record in chapter_index.for_book(1)] == [10]
+    assert chapter_index.for_book(2) == []
+    assert chapter_index.files == {"/10.mp3", "/30.mp3"}
+
+
+def test_removing_chapters_updates_the_chapter_index_once(mocker):
+    from cozy.model.library import ChapterIndex, Library
+
+    library = Library()
+    library.invalidate()
+    chapters = list(library.books[0].chapters)
+    remove = mocker.spy(ChapterIndex, "remove")
+    remove_many = mocker.spy(ChapterIndex, "remove_many")
+
+    with library.removing_chapters():
+        for chapter in chapters:
+            library._on_chapter_event("chapter-deleted", chapter)
+
+    remove.assert_not_called()
+    remove_many.assert_called_once_with(library.chapter_index, [chapter.id for chapter in chapters])
+    assert not {chapter.id for chapter in chapters} & {record.id for record in library.chapter_index.records}
+
+
+def test_library_chapters_are_ordered_like_single_book_chapters(peewee_database):
+    from cozy.model.book import Book
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+
+    for book in library.books:
+        single_book = Book(peewee_database, book._db_object)
+        assert [chapter.id for chapter in book.chapters] == [c.id for c in single_book.chapters]
+
+
+def test_apply_changed_files_only_updates_affected_books(mocker):
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    books = list(library.books)
+    book = books[0]
+    emit = mocker.patch.object(library, "emit_event")
+
+    changed_books = library.apply_changed_files({book.chapters[0].file})
+
+    assert [changed_book.id for changed_book in changed_books] == [book.id]
+    changes = emit.call_args.args[1]
+    assert emit.call_args.args[0] == "books-changed"
+    assert changes.updated == [book]
+    assert not changes.added and not changes.removed
+    assert library.books == books
+    assert book._chapters is None
+
+
+def test_apply_changed_files_adds_new_and_removes_empty_books(mocker):
+    from cozy.db.book import Book as BookModel
+    from cozy.db.file import File
+    from cozy.db.track import Track as TrackModel
+    from cozy.db.track_to_file import TrackToFile
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    removed_book = library.books[0]
+    removed_files = {chapter.file for chapter in removed_book.chapters}
+    emit = mocker.patch.object(library, "emit_event")
+
+    new_book = BookModel.create(name="New", author="a", reader="a", position=0, rating=0)
+    file = File.create(path="/new/file.mp3", modified=1)
+    track = TrackModel.create(name="a", number=1, disk=1, position=0, book=new_book, length=1)
+    TrackToFile.create(track=track, file=file, start_at=0)
+    for chapter in removed_book.chapters:
+        TrackToFile.delete().where(TrackToFile.track == chapter.id).execute()
+
+    library.apply_changed_files(removed_files | {file.path})
+
+    changes = emit.call_args.args[1]
+    assert changes.removed == [removed_book]
+    assert [book.id for book in changes.added] == [new_book.id]
+    assert removed_book not in library.books
+    assert new_book.id in {book.id for book in library.books}
+    assert file.path in library.files
+
+
+def test_apply_changed_files_changes_books_on_the_main_thread(mocker):
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    book = library.books[0]
+    chapters = book.chapters
+    invoke = mocker.patch("cozy.model.library.GLib.MainContext.default").return_value.invoke_full
+    emit = mocker.patch.object(library, "emit_event")
+
+    library.apply_changed_files({chapters[0].file})
+
+    assert book._chapters is chapters
+    emit.assert_not_called()
+
+    _, apply_changes, data = invoke.call_args.args
+    apply_changes(data)
+
+    assert book._chapters is None
+    assert emit.call_args.args[1].updated == [book]
+
+
+def test_batch_saves_model_changes_when_it_exits():
+    from cozy.db.book import Book as BookModel
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    book = library.books[0]
+
+    with library.batch():
+        book.name = "Batched"
+        with library.batch():
+            book.rating = 4
+
+        assert BookModel.get_by_id(book.id).name != "Batched"
+
+    assert BookModel.get_by_id(book.id).name == "Batched"
+    assert BookModel.get_by_id(book.id).rating == 4
+
+
+def test_batch_saves_model_changes_when_an_exception_is_raised():
+    from cozy.db.book import Book as BookModel
+    from cozy.model.library import Library
+
+    library = Library()
+    library.invalidate()
+    book = library.books[0]
+
+    with pytest.raises(ValueError), library.batch():
+        book.name = "Batched"
+        raise ValueError
+
+    assert BookModel.get_by_id(book.id).name == "Batched"
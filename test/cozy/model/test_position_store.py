@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+from cozy.model.chapter import Chapter
+from cozy.model.position_store import PositionStore
+
+
+def test_update_keeps_position_in_memory_until_interval_passed():
+    chapter = MagicMock(spec=Chapter)
+    store = PositionStore(60)
+
+    store.update(chapter, 42)
+
+    chapter.update_position.assert_called_once_with(42)
+    chapter.save_position.assert_not_called()
+
+
+def test_update_saves_position_after_interval():
+    chapter = MagicMock(spec=Chapter)
+    store = PositionStore(0)
+
+    store.update(chapter, 42)
+
+    chapter.save_position.assert_called_once()
+
+
+def test_update_saves_previous_chapter_when_chapter_changes():
+    old_chapter = MagicMock(spec=Chapter)
+    new_chapter = MagicMock(spec=Chapter)
+    store = PositionStore(60)
+
+    store.update(old_chapter, 1)
+    store.update(new_chapter, 2)
+
+    old_chapter.save_position.assert_called_once()
+    new_chapter.save_position.assert_not_called()
+
+
+def test_flush_saves_pending_position_once():
+    chapter = MagicMock(spec=Chapter)
+    store = PositionStore(60)
+
+    store.update(chapter, 42)
+    store.flush()
+    store.flush()
+
+    chapter.save_position.assert_called_once()
+
@@ -209,6 +209,33 @@ def test_track_to_file_not_present_throws_exception_and_deletes_track_instance(p
     assert not TrackDB.get_or_none(1)
 
 
+def test_prefetched_track_to_file_not_present_throws_exception_and_deletes_track_instance(peewee_database):
+    from cozy.db.track import Track as TrackDB
+    from cozy.db.track_to_file import TrackToFile
+    from cozy.model.track import Track, TrackInconsistentData, select_tracks_with_files
+
+    TrackToFile.delete().where(TrackToFile.track == 1).execute()
+    with pytest.raises(TrackInconsistentData):
+        Track(peewee_database, select_tracks_with_files().where(TrackDB.id == 1).get(), prefetched=True)
+
+    assert not TrackDB.get_or_none(1)
+
+
+def test_prefetched_track_does_not_query_the_database(peewee_database, mocker):
+    from cozy.db.track import Track as TrackDB
+    from cozy.model.track import Track, select_tracks_with_files
+
+    track_db = select_tracks_with_files().where(TrackDB.id == 1).get()
+    execute_sql = mocker.spy(peewee_database, "execute_sql")
+
+    track = Track(peewee_database, track_db, prefetched=True)
+
+    assert track.file == "test.mp3"
+    assert track.modified == 123456
+    assert track.start_position == 0
+    execute_sql.assert_not_called()
+
+
 def test_delete_removes_file_object_if_not_used_elsewhere(peewee_database):
     from cozy.db.file import File
     from cozy.db.track import Track as TrackDB
@@ -231,3 +258,17 @@ def test_delete_keeps_file_object_if_used_elsewhere(peewee_database):
     track.delete()
 
     assert File.get_or_none(file_id)
+
+
+def test_track_update_position_is_written_on_save(peewee_database):
+    from cozy.db.track import Track as TrackDB
+    from cozy.model.track import Track
+
+    track = Track(peewee_database, TrackDB.get(1))
+
+    track.update_position(42)
+    assert track.position == 42
+    assert TrackDB.get(1).position != 42
+
+    track.save_position()
+    assert TrackDB.get(1).position == 42
@@ -0,0 +1,7 @@
+def test_benchmarks_run_on_small_datasets(capsys):
+    from test.benchmark import BENCHMARKS, main
+
+    main(["--books", "2", "--chapters", "3", "--files", "6", "--covers", "2"])
+
+    output = capsys.readouterr().out
+    assert all(f"{name}:" in output for name in BENCHMARKS)